@@ -0,0 +1,82 @@
+"""
+Maintenance commands.
+
+    python -m app.admin archive-purge --older-than 90
+    python -m app.admin archive-refetch --older-than 30 [--limit 500] [--concurrency 4] [--dry-run]
+
+archive-purge deletes archived transcripts fetched more than N days ago.
+archive-refetch fetches them again from YouTube, refreshing Redis and the archive.
+"""
+import argparse
+import asyncio
+
+from app.database import Base, engine
+from app.exceptions import TranscriptError
+from app.services import archive
+from app.services.archive import archive_writer
+from app.services.fetch_pool import fetch_pool
+from app.services.transcript_service import refetch_transcript
+from app.logger import logger
+
+
+def purge(days: int, dry_run: bool) -> None:
+    if dry_run:
+        print(f"Would delete {len(archive.list_older_than(days))} archived transcripts older than {days} days")
+        return
+    deleted = archive.purge_older_than(days)
+    logger.info("Purged %s archived transcripts older than %s days", deleted, days)
+    print(f"Deleted {deleted} archived transcripts older than {days} days")
+
+
+async def refetch(days: int, limit: int, concurrency: int, dry_run: bool) -> None:
+    stale = await asyncio.to_thread(archive.list_older_than, days, limit)
+    print(f"{len(stale)} archived transcripts older than {days} days")
+    if dry_run or not stale:
+        return
+
+    archive_writer.start()
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    outcomes = {"refetched": 0, "failed": 0}
+
+    async def _one(video_id: str, language_code: str):
+        async with semaphore:
+            try:
+                await refetch_transcript(video_id, language_code)
+                outcomes["refetched"] += 1
+            except TranscriptError as e:
+                # Keep the archived copy; the video may have gone away upstream
+                outcomes["failed"] += 1
+                logger.warning("Re-fetch failed for video_id=%s, language=%s: %s", video_id, language_code, e.message)
+
+    try:
+        await asyncio.gather(*(_one(video_id, code) for video_id, code in stale))
+    finally:
+        await archive_writer.close()
+        fetch_pool.shutdown()
+    print(f"Re-fetched {outcomes['refetched']}, failed {outcomes['failed']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Transcript API maintenance")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    purge_cmd = commands.add_parser("archive-purge", help="Delete archived transcripts older than N days")
+    purge_cmd.add_argument("--older-than", type=int, required=True, metavar="DAYS")
+    purge_cmd.add_argument("--dry-run", action="store_true")
+
+    refetch_cmd = commands.add_parser("archive-refetch", help="Re-fetch archived transcripts older than N days")
+    refetch_cmd.add_argument("--older-than", type=int, required=True, metavar="DAYS")
+    refetch_cmd.add_argument("--limit", type=int, default=None, help="At most this many (oldest first)")
+    refetch_cmd.add_argument("--concurrency", type=int, default=4)
+    refetch_cmd.add_argument("--dry-run", action="store_true")
+
+    args = parser.parse_args()
+    Base.metadata.create_all(bind=engine)
+    if args.command == "archive-purge":
+        purge(args.older_than, args.dry_run)
+    else:
+        asyncio.run(refetch(args.older_than, args.limit, args.concurrency, args.dry_run))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,13 @@
 import secrets
+from typing import Optional, Tuple
+
 from passlib.context import CryptContext
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from app.config import BCRYPT_ROUNDS
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+# These are CPU-bound (by design); request handlers call them through app.services.password_pool
 
 def hash_password(password: str) -> str:
     return pwd_context.hash(password)
@@ -9,5 +15,9 @@ def hash_password(password: str) -> str:
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
+def verify_and_update(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify, and return a new hash if the stored one uses a different work factor."""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
 def generate_api_key() -> str:
     return secrets.token_hex(16)  # 32-char hex string
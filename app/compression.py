@@ -0,0 +1,55 @@
+"""
+Content negotiation and compression for transcript responses.
+
+Bodies are compressed once per transcript, representation and encoding, then
+cached (see transcript_service.get_transcript_encoded), so the levels here can
+be higher than a per-request middleware could afford. Brotli is optional:
+without the `brotli` package only gzip is offered.
+"""
+import gzip
+from typing import Optional
+
+from app.config import BROTLI_QUALITY, GZIP_LEVEL, RESPONSE_COMPRESSION
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+# Server preference, best first
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negotiate(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    The encoding to use for an Accept-Encoding header, or None for identity.
+    Honors q-values (q=0 refuses a coding) and "*"; ties go to the server's preference.
+    """
+    if not RESPONSE_COMPRESSION or not accept_encoding:
+        return None
+    accepted = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding.strip().lower()] = q
+    best, best_q = None, 0.0
+    for encoding in ENCODINGS:
+        q = accepted.get(encoding, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    if encoding == "gzip":
+        # mtime=0: identical input gives identical bytes in every worker (ETags stay valid)
+        return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+    raise ValueError(f"Unsupported encoding {encoding!r}")
@@ -0,0 +1,124 @@
+"""
+Application settings, read from the environment (and .env) once at import.
+Rate limiting and API key resolution have their own module: app/limiting/config.py.
+"""
+import os
+from typing import Dict
+
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+# Transcript single-flight (coalesces concurrent cache misses per key)
+SINGLEFLIGHT_LOCK_TTL_MS = _env_int("SINGLEFLIGHT_LOCK_TTL_MS", 30000)
+SINGLEFLIGHT_POLL_INTERVAL = _env_float("SINGLEFLIGHT_POLL_INTERVAL", 0.1)
+SINGLEFLIGHT_WAIT_TIMEOUT = _env_float("SINGLEFLIGHT_WAIT_TIMEOUT", 30.0)
+
+# In-process L1 transcript cache (per worker, in front of Redis)
+L1_CACHE_MAX_BYTES = _env_int("L1_CACHE_MAX_BYTES", 64 * 1024 * 1024)  # 64MB
+L1_CACHE_TTL = _env_int("L1_CACHE_TTL", 300)  # 5 min
+
+# Batch transcript endpoint
+BATCH_MAX_ITEMS = _env_int("BATCH_MAX_ITEMS", 500)
+BATCH_FETCH_CONCURRENCY = _env_int("BATCH_FETCH_CONCURRENCY", 8)  # parallel upstream fetches per batch
+
+# Upstream (YouTube) fetch pool
+FETCH_POOL_WORKERS = _env_int("FETCH_POOL_WORKERS", 16)  # concurrent blocking fetches per worker process
+FETCH_POOL_MAX_QUEUE = _env_int("FETCH_POOL_MAX_QUEUE", 64)  # waiting fetches before we shed load with 503
+FETCH_POOL_RETRY_AFTER = _env_int("FETCH_POOL_RETRY_AFTER", 5)  # seconds, sent as Retry-After
+FETCH_HTTP_POOL_SIZE = _env_int("FETCH_HTTP_POOL_SIZE", 4)  # keep-alive connections per fetch thread
+
+# Transcript cache freshness (stale-while-revalidate + refresh-ahead)
+CACHE_HARD_TTL = _env_int("CACHE_HARD_TTL", 60 * 60 * 24)  # Redis TTL; entry is gone after this
+CACHE_SOFT_TTL = _env_int("CACHE_SOFT_TTL", 60 * 60 * 22)  # after this, serve stale and refresh in background
+REFRESH_AHEAD_SECONDS = _env_int("REFRESH_AHEAD_SECONDS", 60 * 60)  # hot entries refresh this long before soft expiry
+REFRESH_AHEAD_MIN_HITS = _env_int("REFRESH_AHEAD_MIN_HITS", 10)  # per-worker hits that make an entry "hot"
+REFRESH_RETRY_SECONDS = _env_int("REFRESH_RETRY_SECONDS", 60)  # lock TTL / backoff between refresh attempts
+
+# Negative cache: how long a permanent-looking upstream failure is remembered, per error class.
+# Transient failures (blocked IP, request errors, busy pool) are never cached; 0 disables a class.
+NEGATIVE_CACHE_TTLS: Dict[str, int] = {
+    "VideoUnavailableError": _env_int("NEG_TTL_VIDEO_UNAVAILABLE", 6 * 60 * 60),  # deleted / invalid IDs
+    "VideoPrivateError": _env_int("NEG_TTL_VIDEO_PRIVATE", 60 * 60),  # transcripts disabled, private, age-gated
+    "LanguageNotSupportedError": _env_int("NEG_TTL_LANGUAGE", 30 * 60),  # captions may still be added
+}
+
+# Per-video transcript catalog (available languages, manual vs generated)
+CATALOG_TTL = _env_int("CATALOG_TTL", 6 * 60 * 60)  # new caption tracks show up after at most this long
+# Languages tried, in order, when a request doesn't name one (same as youtube-transcript-api's default)
+TRANSCRIPT_DEFAULT_LANGUAGES = [
+    code.strip() for code in os.getenv("TRANSCRIPT_DEFAULT_LANGUAGES", "en").split(",") if code.strip()
+]
+
+# Async transcript jobs (POST /v1/transcripts/jobs, consumed by `python -m app.worker`)
+JOB_TTL = _env_int("JOB_TTL", 24 * 60 * 60)  # job status/results are kept this long
+JOB_VISIBILITY_TIMEOUT = _env_int("JOB_VISIBILITY_TIMEOUT", 60)  # un-acked jobs are re-queued after this
+JOB_MAX_ATTEMPTS = _env_int("JOB_MAX_ATTEMPTS", 3)
+JOB_WORKER_CONCURRENCY = _env_int("JOB_WORKER_CONCURRENCY", 8)  # jobs processed at once per worker process
+JOB_POLL_INTERVAL = _env_float("JOB_POLL_INTERVAL", 0.5)  # idle sleep between empty queue checks
+JOB_WEBHOOK_TIMEOUT = _env_float("JOB_WEBHOOK_TIMEOUT", 5.0)
+JOB_WEBHOOK_RETRIES = _env_int("JOB_WEBHOOK_RETRIES", 3)
+# Signs webhook bodies (X-Webhook-Signature: sha256=<hex HMAC>) when set
+JOB_WEBHOOK_SECRET = os.getenv("JOB_WEBHOOK_SECRET", "")
+# Webhooks may only reach public addresses; "1" lifts that for local development
+JOB_WEBHOOK_ALLOW_PRIVATE = os.getenv("JOB_WEBHOOK_ALLOW_PRIVATE", "0").lower() in ("1", "true", "yes")
+
+# Durable Postgres transcript archive (behind Redis, before YouTube)
+ARCHIVE_ENABLED = os.getenv("ARCHIVE_ENABLED", "1").lower() in ("1", "true", "yes")
+ARCHIVE_BATCH_SIZE = _env_int("ARCHIVE_BATCH_SIZE", 100)  # rows per upsert statement
+ARCHIVE_FLUSH_INTERVAL = _env_float("ARCHIVE_FLUSH_INTERVAL", 2.0)  # seconds between background flushes
+ARCHIVE_MAX_PENDING = _env_int("ARCHIVE_MAX_PENDING", 10000)  # buffered writes before new ones are dropped
+ARCHIVE_MAX_ATTEMPTS = _env_int("ARCHIVE_MAX_ATTEMPTS", 5)  # failed upserts are retried on later flushes, then dropped
+
+# Database connection pools (per worker process; sizes apply to the sync and the async engine each)
+DB_POOL_SIZE = _env_int("DB_POOL_SIZE", 10)  # connections kept open
+DB_MAX_OVERFLOW = _env_int("DB_MAX_OVERFLOW", 10)  # extra connections allowed during bursts
+DB_POOL_TIMEOUT = _env_float("DB_POOL_TIMEOUT", 5.0)  # seconds to wait for a free connection before failing
+DB_POOL_RECYCLE = _env_int("DB_POOL_RECYCLE", 30 * 60)  # reopen connections older than this
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1").lower() in ("1", "true", "yes")  # drop dead connections
+DB_STATEMENT_TIMEOUT_MS = _env_int("DB_STATEMENT_TIMEOUT_MS", 5000)  # Postgres statement_timeout; 0 disables
+
+# Password hashing (bcrypt on a per-worker process pool, off the event loop and the GIL)
+BCRYPT_ROUNDS = _env_int("BCRYPT_ROUNDS", 12)  # work factor (cost doubles per step); existing hashes are upgraded on login
+PASSWORD_POOL_WORKERS = _env_int("PASSWORD_POOL_WORKERS", 2)  # hashing processes per worker process
+PASSWORD_POOL_MAX_QUEUE = _env_int("PASSWORD_POOL_MAX_QUEUE", 16)  # waiting hashes before register/login return 503
+PASSWORD_POOL_RETRY_AFTER = _env_int("PASSWORD_POOL_RETRY_AFTER", 2)  # seconds, sent as Retry-After
+
+# Logging (app/logger.py)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_JSON = os.getenv("LOG_JSON", "0").lower() in ("1", "true", "yes")  # one JSON object per line, with request_id
+LOG_CACHE_HIT_SAMPLE_RATE = _env_float("LOG_CACHE_HIT_SAMPLE_RATE", 1.0)  # fraction of cache-hit lines logged
+LOG_FILE_MAX_BYTES = _env_int("LOG_FILE_MAX_BYTES", 5 * 1024 * 1024)
+LOG_FILE_BACKUPS = _env_int("LOG_FILE_BACKUPS", 5)
+
+# Conditional GET for /v1/transcripts (ETag from the cached content hash)
+# Shared caches may store transcripts but must revalidate, so every request still reaches auth and rate limits
+TRANSCRIPT_CACHE_CONTROL = os.getenv("TRANSCRIPT_CACHE_CONTROL", "public, no-cache")
+NOT_MODIFIED_CONSUMES_TOKEN = os.getenv("NOT_MODIFIED_CONSUMES_TOKEN", "1").lower() in ("1", "true", "yes")
+
+# Response compression for /v1/transcripts (each variant compressed once, then cached)
+RESPONSE_COMPRESSION = os.getenv("RESPONSE_COMPRESSION", "1").lower() in ("1", "true", "yes")
+GZIP_LEVEL = _env_int("GZIP_LEVEL", 6)
+BROTLI_QUALITY = _env_int("BROTLI_QUALITY", 8)  # 11 compresses best but takes seconds on long transcripts
+
+# /metrics is served to requests with this bearer token, or (without a token) to these client networks only
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+METRICS_ALLOWED_NETWORKS = [
+    n.strip() for n in os.getenv("METRICS_ALLOWED_NETWORKS", "127.0.0.0/8,::1/128").split(",") if n.strip()
+]
@@ -1,18 +1,67 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
 
+from app.config import (
+    DB_POOL_SIZE,
+    DB_MAX_OVERFLOW,
+    DB_POOL_TIMEOUT,
+    DB_POOL_RECYCLE,
+    DB_POOL_PRE_PING,
+    DB_STATEMENT_TIMEOUT_MS,
+)
+
 POSTGRES_URL = os.getenv("POSTGRES_URL")
 
-engine = create_engine(POSTGRES_URL)
+# Async drivers for the same database: asyncpg for Postgres, aiosqlite for local SQLite runs
+_ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+
+def _async_url(url: str):
+    parsed = make_url(url)
+    return parsed.set(drivername=_ASYNC_DRIVERS.get(parsed.get_backend_name(), parsed.drivername))
+
+
+def _pool_options(url: str) -> dict:
+    if make_url(url).get_backend_name() == "sqlite":
+        return {}  # SQLite picks its own pool; sizes and timeouts don't apply
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+def _connect_args(url: str, is_async: bool) -> dict:
+    if make_url(url).get_backend_name() != "postgresql" or not DB_STATEMENT_TIMEOUT_MS:
+        return {}
+    if is_async:
+        # asyncpg: server-side statement_timeout, plus a client-side guard a little above it
+        return {
+            "server_settings": {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)},
+            "command_timeout": DB_STATEMENT_TIMEOUT_MS / 1000 + 1,
+        }
+    return {"options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"}
+
+
+# Sync engine: table creation, admin commands and archive work running in threads
+engine = create_engine(POSTGRES_URL, connect_args=_connect_args(POSTGRES_URL, False), **_pool_options(POSTGRES_URL))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# Async engine: everything on the request path (users, API key lookups)
+async_engine = create_async_engine(
+    _async_url(POSTGRES_URL), connect_args=_connect_args(POSTGRES_URL, True), **_pool_options(POSTGRES_URL)
+)
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+
 # Dependency
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
@@ -30,3 +30,10 @@ class TranscriptFetchError(TranscriptError):
     """Generic transcript fetch failure"""
     def __init__(self, message="Failed to fetch transcript"):
         super().__init__(message, code=500)
+
+
+class UpstreamBusyError(TranscriptError):
+    """Too many upstream fetches already queued; client should retry later"""
+    def __init__(self, message="Transcript service is busy, try again shortly", retry_after: int = 5):
+        super().__init__(message, code=503)
+        self.retry_after = retry_after
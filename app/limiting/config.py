@@ -35,20 +35,31 @@ def _env_int(name: str, default: int) -> int:
 
 TIER_LIMITS: Dict[str, Dict[str, int]] = {
     # daily quotas by default; tune via env
+    # "lease": 1 lets each worker reserve blocks of tokens locally (see limiting/leasing.py)
     "free": {
         "limit": _env_int("RL_FREE_LIMIT", 100),
         "period": _env_int("RL_FREE_PERIOD", 86400),  # 24h
+        "lease": _env_int("RL_FREE_LEASE", 0),
     },
     "pro": {
         "limit": _env_int("RL_PRO_LIMIT", 5000),
         "period": _env_int("RL_PRO_PERIOD", 86400),
+        "lease": _env_int("RL_PRO_LEASE", 0),
     },
     "enterprise": {
         "limit": _env_int("RL_ENT_LIMIT", 50000),
         "period": _env_int("RL_ENT_PERIOD", 86400),
+        "lease": _env_int("RL_ENT_LEASE", 0),
     },
 }
 
+# Token leasing (only for tiers with "lease": 1)
+LEASE_MIN_TOKENS = _env_int("RL_LEASE_MIN_TOKENS", 5)
+LEASE_MAX_TOKENS = _env_int("RL_LEASE_MAX_TOKENS", 500)
+LEASE_MAX_FRACTION = 0.02  # never lease more than 2% of a bucket to one worker
+LEASE_TARGET_SECONDS = _env_int("RL_LEASE_TARGET_SECONDS", 5)  # size a lease to last ~this long
+LEASE_IDLE_SECONDS = _env_int("RL_LEASE_IDLE_SECONDS", 10)  # unused leases are returned after this
+
 DEFAULT_TIER = os.getenv("RL_DEFAULT_TIER", "free")
 VALID_TIERS = set(TIER_LIMITS.keys())
 
@@ -71,3 +82,9 @@ def _parse_test_keys(env_val: str | None):
     return mapping
 
 TEST_KEY_TIER_MAP = _parse_test_keys(os.getenv("RL_TEST_KEYS"))
+
+# API key -> (user id, tier) principal cache
+PRINCIPAL_LOCAL_TTL = _env_int("PRINCIPAL_LOCAL_TTL", 30)  # per-worker cache
+PRINCIPAL_REDIS_TTL = _env_int("PRINCIPAL_REDIS_TTL", 600)  # shared Redis hash
+PRINCIPAL_NEGATIVE_TTL = _env_int("PRINCIPAL_NEGATIVE_TTL", 60)  # unknown keys
+PRINCIPAL_LOCAL_MAX_ENTRIES = _env_int("PRINCIPAL_LOCAL_MAX_ENTRIES", 100000)
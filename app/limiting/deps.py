@@ -1,9 +1,11 @@
 from fastapi import Request, HTTPException
 import time
+from app import metrics
 from .memory import InMemoryLimiter
 from .persistent import RedisLimiter, TokenBucketLimiter, TieredTokenBucketLimiter
+from .leasing import LeasingTokenBucketLimiter
 from .config import TIER_LIMITS
-from .tier_service import get_tier, validate_api_key
+from .tier_service import authenticate
 
 # Configure limiters
 limiter = InMemoryLimiter(max_per_window=3, window_seconds=60)
@@ -15,6 +17,9 @@ token_bucket = TokenBucketLimiter(limit=3, period_seconds=86400)
 # Tiered Token Bucket Limiter
 tiered_bucket = TieredTokenBucketLimiter(TIER_LIMITS)
 
+# Tiers opted into leasing ("lease": 1) consume locally reserved token blocks
+leased_bucket = LeasingTokenBucketLimiter(tiered_bucket)
+
 # In-memory rate limiter dependency
 def rate_limit_dependency():
     async def _dep(request: Request):
@@ -89,34 +94,50 @@ def token_bucket_dependency():
     return _dep
 
 
-def tiered_token_bucket_dependency():
-    async def _dep(request: Request):
-        api_key = request.headers.get("x-api-key")
-        if not api_key:
-            raise HTTPException(status_code=401, detail="API key required")
-
-        # ✅ Validate API key exists in DB
-        validate_api_key(api_key)
+async def charge_tiered_tokens(request: Request, cost: int = 1) -> str:
+    """
+    Validate the API key and take `cost` tokens from its tiered bucket in one step.
+    Sets rate-limit headers on request.state and raises 401/429 on failure.
+    Returns the resolved tier.
+    """
+    api_key = request.headers.get("x-api-key")
+    if not api_key:
+        raise HTTPException(status_code=401, detail="API key required")
+
+    # ✅ Resolve key -> (user, tier) in one cached lookup; 401 if unknown
+    principal = await authenticate(api_key)
+    tier = principal.tier
+    request.state.user_id = principal.user_id
+
+    # ✅ Check token bucket
+    started = time.perf_counter()
+    allowed, limit, remaining, reset_ts = await leased_bucket.check(api_key, tier, cost)
+    metrics.observe_limiter(tier, time.perf_counter() - started, allowed)
+    reset_in = max(0, reset_ts - int(time.time()))
+
+    # Attach rate-limit headers (plus tier)
+    request.state.rate_limit_headers = {
+        "X-RateLimit-Tier": tier,
+        "X-RateLimit-Limit": str(limit),
+        "X-RateLimit-Remaining": str(remaining),
+        "X-RateLimit-Reset": str(reset_ts),
+    }
+
+    if not allowed:
+        if cost > 1:
+            detail = (
+                f"Not enough tokens left for '{tier}' tier: {cost} requested, "
+                f"{remaining} remaining. Refill in {reset_in} seconds."
+            )
+        else:
+            detail = f"No tokens left for '{tier}' tier. Refill in {reset_in} seconds."
+        raise HTTPException(status_code=429, detail=detail)
 
-        # ✅ Get tier from Redis / test map / default
-        tier = await get_tier(api_key)
+    return tier
 
-        # ✅ Check token bucket
-        allowed, limit, remaining, reset_ts = await tiered_bucket.check(api_key, tier)
-        reset_in = max(0, reset_ts - int(time.time()))
 
-        # Attach rate-limit headers (plus tier)
-        request.state.rate_limit_headers = {
-            "X-RateLimit-Tier": tier,
-            "X-RateLimit-Limit": str(limit),
-            "X-RateLimit-Remaining": str(remaining),
-            "X-RateLimit-Reset": str(reset_ts),
-        }
-
-        if not allowed:
-            raise HTTPException(
-                status_code=429,
-                detail=f"No tokens left for '{tier}' tier. Refill in {reset_in} seconds."
-            )
+def tiered_token_bucket_dependency():
+    async def _dep(request: Request):
+        await charge_tiered_tokens(request)
 
     return _dep
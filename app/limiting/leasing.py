@@ -0,0 +1,200 @@
+import asyncio
+import time
+from typing import Dict, Optional, Tuple
+
+from .redis_client import r
+from .persistent import TieredTokenBucketLimiter
+from .config import (
+    LEASE_MIN_TOKENS,
+    LEASE_MAX_TOKENS,
+    LEASE_MAX_FRACTION,
+    LEASE_TARGET_SECONDS,
+    LEASE_IDLE_SECONDS,
+)
+from app.logger import logger
+
+# Reserve up to ARGV[3] tokens from a (possibly new) bucket in one step.
+# KEYS[1] = bucket key, ARGV = limit, period (seconds), wanted.
+# Returns {granted, remaining, ttl}.
+LEASE_LUA = """
+local limit = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local wanted = tonumber(ARGV[3])
+local tokens = redis.call("GET", KEYS[1])
+if not tokens then
+    redis.call("SET", KEYS[1], limit, "EX", period)
+    tokens = limit
+else
+    tokens = tonumber(tokens)
+end
+local ttl = redis.call("TTL", KEYS[1])
+if ttl < 0 then
+    redis.call("EXPIRE", KEYS[1], period)
+    ttl = period
+end
+local granted = math.min(math.max(tokens, 0), wanted)
+if granted > 0 then
+    tokens = redis.call("DECRBY", KEYS[1], granted)
+end
+return {granted, tokens, ttl}
+"""
+
+# Give unused tokens back, but only to the bucket they came from (never to a new period).
+RETURN_LUA = """
+if redis.call("EXISTS", KEYS[1]) == 1 then
+    return redis.call("INCRBY", KEYS[1], ARGV[1])
+end
+return -1
+"""
+
+
+class _Lease:
+    __slots__ = ("bucket_key", "tokens", "granted", "granted_at", "last_used", "remaining", "reset_ts")
+
+    def __init__(self, bucket_key: str, tokens: int, remaining: int, reset_ts: int):
+        now = time.monotonic()
+        self.bucket_key = bucket_key
+        self.tokens = tokens  # still available locally
+        self.granted = tokens  # size of the block taken from Redis
+        self.granted_at = now
+        self.last_used = now
+        self.remaining = remaining  # tokens left in Redis when the lease was taken
+        self.reset_ts = reset_ts
+
+
+class LeasingTokenBucketLimiter:
+    """
+    Tiered token bucket that, for tiers with "lease": 1, reserves blocks of tokens
+    from the shared Redis bucket and spends them locally, so most requests cost no
+    Redis round trip. Tiers without leasing go straight to the wrapped limiter.
+
+    - Lease size adapts to each key's observed request rate (enough for
+      ~LEASE_TARGET_SECONDS), clamped to [LEASE_MIN_TOKENS, LEASE_MAX_TOKENS].
+    - Unused tokens are returned to Redis when a lease goes idle, when the period
+      rolls over (they are dropped, since the old bucket expired) and on shutdown.
+    """
+
+    def __init__(self, bucket: TieredTokenBucketLimiter):
+        self.bucket = bucket
+        self._leases: Dict[Tuple[str, str], _Lease] = {}
+        self._locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+        self._lease_script = r.register_script(LEASE_LUA)
+        self._return_script = r.register_script(RETURN_LUA)
+        self._sweeper: Optional[asyncio.Task] = None
+        self.stats = {"local": 0, "refills": 0, "returned_tokens": 0}
+
+    def _leasing_enabled(self, tier: str) -> bool:
+        cfg = self.bucket.tier_limits.get(tier)
+        return bool(cfg and cfg.get("lease"))
+
+    async def check(self, api_key: str, tier: str, cost: int = 1) -> Tuple[bool, int, int, int]:
+        """
+        Same contract as TieredTokenBucketLimiter.check:
+        returns (allowed, limit, remaining, reset_ts).
+        """
+        if not self._leasing_enabled(tier):
+            return await self.bucket.check(api_key, tier, cost)
+
+        cfg = self.bucket.tier_limits[tier]
+        limit = int(cfg["limit"])
+        period = int(cfg["period"])
+        now = int(time.time())
+        bucket_key = self.bucket._bucket_key(api_key, tier, now - (now % period))
+        lease_id = (api_key, tier)
+
+        lease = self._leases.get(lease_id)
+        if lease and lease.bucket_key == bucket_key and lease.tokens >= cost:
+            lease.tokens -= cost
+            lease.last_used = time.monotonic()
+            self.stats["local"] += 1
+            return True, limit, lease.remaining + lease.tokens, lease.reset_ts
+
+        lock = self._locks.setdefault(lease_id, asyncio.Lock())
+        async with lock:
+            # Another coroutine may have refilled while we waited
+            lease = self._leases.get(lease_id)
+            if lease and lease.bucket_key == bucket_key and lease.tokens >= cost:
+                lease.tokens -= cost
+                lease.last_used = time.monotonic()
+                self.stats["local"] += 1
+                return True, limit, lease.remaining + lease.tokens, lease.reset_ts
+
+            leftover = 0
+            if lease is not None and lease.bucket_key == bucket_key:
+                leftover = lease.tokens
+            wanted = self._next_lease_size(lease, limit) + cost - leftover
+
+            granted, remaining, ttl = await self._lease_script(
+                keys=[bucket_key], args=[limit, period, wanted]
+            )
+            self.stats["refills"] += 1
+            reset_ts = now + (ttl if ttl and ttl > 0 else period)
+            available = leftover + granted
+
+            if available < cost:
+                # Not enough for this request: keep accounting exact by handing everything back
+                self._leases.pop(lease_id, None)
+                if available:
+                    await self._give_back(bucket_key, available)
+                    remaining += available
+                return False, limit, max(0, remaining), reset_ts
+
+            new_lease = _Lease(bucket_key, available - cost, max(0, remaining), reset_ts)
+            self._leases[lease_id] = new_lease
+            return True, limit, new_lease.remaining + new_lease.tokens, reset_ts
+
+    def _next_lease_size(self, previous: Optional[_Lease], limit: int) -> int:
+        """Size the next lease from the rate at which the previous one was spent."""
+        size = LEASE_MIN_TOKENS
+        if previous is not None:
+            used = previous.granted - previous.tokens
+            # Floor at 1s so a short burst doesn't look like a sustained high rate
+            elapsed = max(time.monotonic() - previous.granted_at, 1.0)
+            size = int(used / elapsed * LEASE_TARGET_SECONDS)
+        cap = max(1, min(LEASE_MAX_TOKENS, int(limit * LEASE_MAX_FRACTION)))
+        return max(1, min(max(size, LEASE_MIN_TOKENS), cap))
+
+    async def _give_back(self, bucket_key: str, tokens: int) -> None:
+        try:
+            if await self._return_script(keys=[bucket_key], args=[tokens]) >= 0:
+                self.stats["returned_tokens"] += tokens
+        except Exception as e:
+            logger.error("Failed to return %s leased tokens to %s: %s", tokens, bucket_key, e)
+
+    async def release_idle(self, idle_seconds: float = LEASE_IDLE_SECONDS) -> None:
+        """Return tokens from leases that haven't been used for `idle_seconds`."""
+        cutoff = time.monotonic() - idle_seconds
+        for lease_id, lease in list(self._leases.items()):
+            if lease.last_used > cutoff:
+                continue
+            lock = self._locks.get(lease_id)
+            if lock is not None and lock.locked():
+                continue
+            self._leases.pop(lease_id, None)
+            self._locks.pop(lease_id, None)
+            if lease.tokens:
+                await self._give_back(lease.bucket_key, lease.tokens)
+
+    async def _sweep(self) -> None:
+        while True:
+            await asyncio.sleep(max(1, LEASE_IDLE_SECONDS / 2))
+            try:
+                await self.release_idle()
+            except Exception as e:
+                logger.error("Lease sweeper error: %s", e)
+
+    def start(self) -> None:
+        """Start the background task that returns idle leases (once per worker)."""
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = asyncio.ensure_future(self._sweep())
+
+    async def close(self) -> None:
+        """Stop the sweeper and return every outstanding lease."""
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            try:
+                await self._sweeper
+            except asyncio.CancelledError:
+                pass
+            self._sweeper = None
+        await self.release_idle(idle_seconds=-1)
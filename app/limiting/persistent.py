@@ -1,7 +1,46 @@
 import time
-from typing import Tuple, Dict
+from typing import Optional, Tuple, Dict
+import redis.asyncio as redis
 from .redis_client import r
 
+# Fixed-window counter: increment and arm the expiry in one atomic step.
+# Returns {count, ttl}.
+FIXED_WINDOW_LUA = """
+local current = redis.call("INCR", KEYS[1])
+local ttl = redis.call("TTL", KEYS[1])
+if ttl < 0 then
+    redis.call("EXPIRE", KEYS[1], ARGV[1])
+    ttl = tonumber(ARGV[1])
+end
+return {current, ttl}
+"""
+
+# Token bucket: create the bucket if missing, then take `cost` tokens all-or-nothing.
+# KEYS[1] = bucket key, ARGV = limit, period (seconds), cost.
+# Returns {allowed (1/0), remaining, ttl}.
+TOKEN_BUCKET_LUA = """
+local limit = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local tokens = redis.call("GET", KEYS[1])
+if not tokens then
+    redis.call("SET", KEYS[1], limit, "EX", period)
+    tokens = limit
+else
+    tokens = tonumber(tokens)
+end
+local ttl = redis.call("TTL", KEYS[1])
+if ttl < 0 then
+    redis.call("EXPIRE", KEYS[1], period)
+    ttl = period
+end
+if tokens >= cost then
+    return {1, redis.call("DECRBY", KEYS[1], cost), ttl}
+end
+return {0, tokens, ttl}
+"""
+
+
 class RedisLimiter:
     """
     Persistent rate limiter using Redis.
@@ -11,6 +50,7 @@ class RedisLimiter:
     def __init__(self, limit: int = 3, period_seconds: int = 86400):
         self.limit = limit
         self.period = period_seconds  # default 1 day
+        self._script = r.register_script(FIXED_WINDOW_LUA)
 
     def _key(self, api_key: str) -> str:
         return f"user:{api_key}:count"
@@ -22,37 +62,33 @@ class RedisLimiter:
         key = self._key(api_key)
         now = int(time.time())
 
-        # Increment the counter atomically
-        current = await r.incr(key)
-
-        # If key is new, set expiration
-        ttl = await r.ttl(key)
-        if ttl == -1:  # key exists but no TTL
-            await r.expire(key, self.period)
-        elif ttl == -2:  # key does not exist (race condition)
-            await r.expire(key, self.period)
+        # Increment + expiry in a single round trip (EVALSHA)
+        current, ttl = await self._script(keys=[key], args=[self.period])
 
         remaining = max(0, self.limit - current)
         reset_ts = now + (ttl if ttl > 0 else self.period)
 
         allowed = current <= self.limit
         return allowed, self.limit, remaining, reset_ts
-    
+
 class TokenBucketLimiter:
-    def __init__(self, limit: int, period_seconds: int, redis_url: str = "redis://redis:6379/0"):
+    def __init__(self, limit: int, period_seconds: int, redis_url: Optional[str] = None):
         """
         Token Bucket Limiter
         :param limit: Max tokens per period (e.g., 100/day).
         :param period_seconds: Reset interval (e.g., 86400 = 24h).
+        :param redis_url: Optional dedicated Redis; defaults to the shared client.
         """
         self.limit = limit
         self.period_seconds = period_seconds
         self.redis_url = redis_url
         self.redis = None
+        self._script = None
 
     async def init(self):
         if self.redis is None:
-            self.redis = await r.from_url(self.redis_url, decode_responses=True)
+            self.redis = redis.Redis.from_url(self.redis_url, decode_responses=True) if self.redis_url else r
+            self._script = self.redis.register_script(TOKEN_BUCKET_LUA)
 
     async def check(self, api_key: str) -> Tuple[bool, int, int, int]:
         """
@@ -67,35 +103,31 @@ class TokenBucketLimiter:
 
         bucket_key = f"bucket:{api_key}:{period_start}"
 
-        # Initialize tokens if not present
-        tokens = await self.redis.get(bucket_key)
-        if tokens is None:
-            tokens = self.limit
-            await self.redis.set(bucket_key, tokens, ex=self.period_seconds)
-        else:
-            tokens = int(tokens)
+        # Initialize + take a token atomically in one round trip
+        allowed, tokens, _ = await self._script(
+            keys=[bucket_key], args=[self.limit, self.period_seconds, 1]
+        )
+        return bool(allowed), self.limit, max(0, tokens), reset_ts
 
-        if tokens > 0:
-            await self.redis.decr(bucket_key)
-            tokens -= 1
-            return True, self.limit, tokens, reset_ts
-
-        return False, self.limit, 0, reset_ts
-    
-# ... keep your existing RedisLimiter and TokenBucketLimiter here ...
 
 class TieredTokenBucketLimiter:
     """
     Token Bucket with per-tier limits (free/pro/enterprise).
-    Uses Redis atomic ops. Keys auto-expire at period end.
+    Check-and-consume runs as one server-side Lua script (EVALSHA): a single
+    round trip, no compensating increments. Keys auto-expire at period end.
     """
     def __init__(self, tier_limits: Dict[str, Dict[str, int]]):
         self.tier_limits = tier_limits
+        self._script = r.register_script(TOKEN_BUCKET_LUA)
 
     def _bucket_key(self, api_key: str, tier: str, period_start: int) -> str:
         return f"user:{api_key}:bucket:{tier}:{period_start}"
 
-    async def check(self, api_key: str, tier: str) -> Tuple[bool, int, int, int]:
+    async def check(self, api_key: str, tier: str, cost: int = 1) -> Tuple[bool, int, int, int]:
+        """
+        Consume `cost` tokens (all or nothing).
+        Returns (allowed, limit, remaining, reset_ts).
+        """
         cfg = self.tier_limits.get(tier) or self.tier_limits["free"]
         limit = int(cfg["limit"])
         period = int(cfg["period"])
@@ -104,20 +136,6 @@ class TieredTokenBucketLimiter:
         period_start = now - (now % period)
         key = self._bucket_key(api_key, tier, period_start)
 
-        # Ensure bucket exists only once per period (nx=True)
-        # If it already exists, this is a no-op.
-        await r.set(key, limit, ex=period, nx=True)
-
-        # Atomically decrement; if we went below 0, revert and deny
-        new_val = await r.decr(key)
-        if new_val >= 0:
-            remaining = new_val
-            ttl = await r.ttl(key)
-            reset_ts = now + (ttl if ttl and ttl > 0 else period)
-            return True, limit, remaining, reset_ts
-
-        # We overshot (concurrent requests). Undo and reject.
-        await r.incr(key)
-        ttl = await r.ttl(key)
+        allowed, remaining, ttl = await self._script(keys=[key], args=[limit, period, cost])
         reset_ts = now + (ttl if ttl and ttl > 0 else period)
-        return False, limit, 0, reset_ts
+        return bool(allowed), limit, max(0, remaining), reset_ts
@@ -3,3 +3,6 @@ import os
 from .config import REDIS_URL
 
 r = redis.Redis.from_url(REDIS_URL, decode_responses=True)
+
+# Binary-safe client for compressed cache payloads (no response decoding)
+rb = redis.Redis.from_url(REDIS_URL, decode_responses=False)
@@ -1,75 +1,146 @@
+import time
+from typing import NamedTuple, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import select, update
+
 from .redis_client import r
-from .config import DEFAULT_TIER, VALID_TIERS, TEST_KEY_TIER_MAP
-from app.database import SessionLocal
-from app import models
+from .config import (
+    DEFAULT_TIER,
+    VALID_TIERS,
+    TEST_KEY_TIER_MAP,
+    PRINCIPAL_LOCAL_TTL,
+    PRINCIPAL_REDIS_TTL,
+    PRINCIPAL_NEGATIVE_TTL,
+    PRINCIPAL_LOCAL_MAX_ENTRIES,
+)
+from app.database import AsyncSessionLocal
+from app import metrics, models
+from app.services import invalidation
+from app.services.local_cache import LocalCache
+from app.logger import logger
+
+INVALIDATION_NAMESPACE = "principal"
+
+
+class Principal(NamedTuple):
+    """Who an API key belongs to, as needed on every request."""
+    user_id: int
+    tier: str
+
+
+# Cached marker for keys that don't exist, so bad keys don't hit Postgres on every request
+_INVALID = object()
+
+# Per-worker cache (each entry costs 1 "byte", so max_bytes is an entry cap)
+_local_principals = LocalCache(max_bytes=PRINCIPAL_LOCAL_MAX_ENTRIES, ttl_seconds=PRINCIPAL_LOCAL_TTL)
+invalidation.register(INVALIDATION_NAMESPACE, _local_principals.invalidate)
+
 
 def _tier_key(api_key: str) -> str:
     return f"user:{api_key}:tier"
 
-async def get_tier(api_key: str) -> str:
-    """
-    Returns the tier for a given api_key.
-    Order of precedence:
-      1) Database lookup (users table)
-      2) Redis key user:{api_key}:tier
-      3) TEST_KEY_TIER_MAP (from env RL_TEST_KEYS) for quick manual testing
-      4) DEFAULT_TIER
-    """
 
-    # 1) Database lookup
-    db = SessionLocal()
+def _principal_key(api_key: str) -> str:
+    return f"user:{api_key}:principal"
+
+
+async def _load_user(api_key: str):
+    """users-table lookup: (id, tier) or None."""
+    started = time.perf_counter()
     try:
-        user = db.query(models.User).filter(models.User.api_key == api_key).first()
-        if user and user.tier in VALID_TIERS:
-            return user.tier
+        async with AsyncSessionLocal() as db:
+            row = (await db.execute(
+                select(models.User.id, models.User.tier).where(models.User.api_key == api_key)
+            )).first()
+        return (row.id, row.tier) if row else None
     finally:
-        db.close()
+        metrics.TIER_DB_SECONDS.observe(time.perf_counter() - started)
 
-    # 2) Redis lookup
+
+async def _resolve_tier(api_key: str, db_tier: Optional[str]) -> str:
+    # Precedence: users table, Redis override user:{api_key}:tier,
+    # TEST_KEY_TIER_MAP (env RL_TEST_KEYS, for manual testing), DEFAULT_TIER
+    if db_tier in VALID_TIERS:
+        return db_tier
     tier = await r.get(_tier_key(api_key))
     if tier in VALID_TIERS:
         return tier
-
-    # 3) Testing keys (from config)
     tier = TEST_KEY_TIER_MAP.get(api_key)
     if tier in VALID_TIERS:
         return tier
-
-    # 4) Default fallback
     return DEFAULT_TIER
 
 
-async def set_tier(api_key: str, tier: str) -> None:
+async def get_principal(api_key: str) -> Optional[Principal]:
     """
-    Manually set a user's tier in Redis (e.g., via admin task or script).
+    Resolve an API key to (user_id, tier) in one lookup, or None if the key is unknown.
+    Lookup order: per-worker cache -> Redis hash user:{api_key}:principal -> Postgres.
+    Unknown keys are cached too (with a shorter TTL).
     """
-    if tier not in VALID_TIERS:
-        raise ValueError(f"Invalid tier '{tier}'. Valid: {sorted(VALID_TIERS)}")
-    await r.set(_tier_key(api_key), tier)
+    cached = _local_principals.get(api_key)
+    if cached is not None:
+        return None if cached is _INVALID else cached
+
+    stored = await r.hgetall(_principal_key(api_key))
+    if stored:
+        if stored.get("invalid"):
+            _local_principals.set(api_key, _INVALID, 1, PRINCIPAL_NEGATIVE_TTL)
+            return None
+        principal = Principal(int(stored["user_id"]), stored["tier"])
+        _local_principals.set(api_key, principal, 1)
+        return principal
 
-def validate_api_key(api_key: str):
+    # Cold key: one users-table query on the async pool
+    user = await _load_user(api_key)
+    pipe = r.pipeline(transaction=False)
+    if user is None:
+        pipe.hset(_principal_key(api_key), mapping={"invalid": "1"})
+        pipe.expire(_principal_key(api_key), PRINCIPAL_NEGATIVE_TTL)
+        await pipe.execute()
+        _local_principals.set(api_key, _INVALID, 1, PRINCIPAL_NEGATIVE_TTL)
+        return None
+
+    user_id, db_tier = user
+    principal = Principal(user_id, await _resolve_tier(api_key, db_tier))
+    pipe.hset(_principal_key(api_key), mapping={"user_id": str(principal.user_id), "tier": principal.tier})
+    pipe.expire(_principal_key(api_key), PRINCIPAL_REDIS_TTL)
+    await pipe.execute()
+    _local_principals.set(api_key, principal, 1)
+    return principal
+
+
+async def authenticate(api_key: str) -> Principal:
     """
-    Check if API key exists in the database.
-    Raises 401 if not valid.
+    Resolve an API key or raise 401 if it doesn't belong to a user.
     """
-    db = SessionLocal()
-    user = db.query(User).filter(User.api_key == api_key).first()
-    db.close()
-    if not user:
-        from fastapi import HTTPException
+    principal = await get_principal(api_key)
+    if principal is None:
         raise HTTPException(status_code=401, detail="Invalid API key")
-    return user
+    return principal
+
 
+async def invalidate_principal(api_key: str) -> None:
+    """Drop a cached principal everywhere (Redis, this worker, other workers)."""
+    await r.delete(_principal_key(api_key))
+    _local_principals.invalidate(api_key)
+    await invalidation.publish(INVALIDATION_NAMESPACE, api_key)
 
-def validate_api_key(api_key: str):
+
+async def _update_user_tier(api_key: str, tier: str) -> None:
+    async with AsyncSessionLocal() as db:
+        await db.execute(update(models.User).where(models.User.api_key == api_key).values(tier=tier))
+        await db.commit()
+
+
+async def set_tier(api_key: str, tier: str) -> None:
     """
-    Check if API key exists in the database.
-    Raises 401 if not valid.
+    Manually set a user's tier (e.g., via admin task or script).
+    Updates the users table and the Redis override, then invalidates every cached principal.
     """
-    db = SessionLocal()
-    user = db.query(models.User).filter(models.User.api_key == api_key).first()
-    db.close()
-    if not user:
-        from fastapi import HTTPException
-        raise HTTPException(status_code=401, detail="Invalid API key")
-    return user
\ No newline at end of file
+    if tier not in VALID_TIERS:
+        raise ValueError(f"Invalid tier '{tier}'. Valid: {sorted(VALID_TIERS)}")
+    await _update_user_tier(api_key, tier)
+    await r.set(_tier_key(api_key), tier)
+    await invalidate_principal(api_key)
+    logger.info("Tier for api_key=...%s set to '%s'", api_key[-4:], tier)
@@ -1,6 +1,23 @@
+import atexit
+import contextvars
+import json
 import os
 import logging
-from logging.handlers import RotatingFileHandler
+import queue
+import random
+import uuid
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import (
+    LOG_LEVEL,
+    LOG_JSON,
+    LOG_CACHE_HIT_SAMPLE_RATE,
+    LOG_FILE_MAX_BYTES,
+    LOG_FILE_BACKUPS,
+)
 
 # Determine project root
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -12,26 +29,104 @@ os.makedirs(logs_dir, exist_ok=True)  # Create directory if missing
 # Full path to log file
 log_file_path = os.path.join(logs_dir, "api.log")
 
+# ID of the HTTP request being handled (set by RequestIdMiddleware), "-" outside requests
+request_id_var: contextvars.ContextVar[str] = contextvars.ContextVar("request_id", default="-")
+
+# Fraction of cache-hit lines that are logged (see sample_cache_hit); adjustable at runtime
+cache_hit_sample_rate = LOG_CACHE_HIT_SAMPLE_RATE
+
+
+def sample_cache_hit() -> bool:
+    """Whether to log this cache hit; hits are the bulk of traffic, so they can be sampled."""
+    return cache_hit_sample_rate >= 1 or random.random() < cache_hit_sample_rate
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, request_id (+ exception)."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", "-"),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """
+    Enqueues records unformatted: %-style arguments are merged (and the line written)
+    on the listener thread, not on the event loop. Only pass values that won't be
+    mutated after the call (strings, numbers, exceptions).
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.request_id = request_id_var.get()
+        return record
+
+
 # Create logger
 logger = logging.getLogger("yt_transcript_api")
-logger.setLevel(logging.INFO)
+logger.setLevel(LOG_LEVEL)
 
 # Console handler
 console_handler = logging.StreamHandler()
-console_handler.setLevel(logging.INFO)
 
 # File handler with rotation
-file_handler = RotatingFileHandler(log_file_path, maxBytes=5*1024*1024, backupCount=5)
-file_handler.setLevel(logging.INFO)
+file_handler = RotatingFileHandler(log_file_path, maxBytes=LOG_FILE_MAX_BYTES, backupCount=LOG_FILE_BACKUPS)
 
 # Formatter
-formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+formatter = JsonFormatter() if LOG_JSON else logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
 console_handler.setFormatter(formatter)
 file_handler.setFormatter(formatter)
 
+# Callers only enqueue; a background thread formats and writes (console, file, rotation)
+log_queue: queue.SimpleQueue = queue.SimpleQueue()
+queue_handler = _DeferredQueueHandler(log_queue)
+listener = QueueListener(log_queue, console_handler, file_handler)
+
 # Add handlers once
 if not logger.hasHandlers():
-    logger.addHandler(console_handler)
-    logger.addHandler(file_handler)
+    logger.addHandler(queue_handler)
+    listener.start()
+    atexit.register(listener.stop)  # drains the queue on shutdown
+
+
+class RequestIdMiddleware:
+    """
+    Pure ASGI middleware: takes the request ID from X-Request-ID (or generates one),
+    exposes it to log records via request_id_var, and echoes it on the response.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")[:128]
+                break
+        request_id = request_id or uuid.uuid4().hex
+        token = request_id_var.set(request_id)
+
+        async def send_with_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", ()), (b"x-request-id", request_id.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            request_id_var.reset(token)
+
 
-logger.info(f"Logger initialized. Log file: {log_file_path}")
+logger.info("Logger initialized. Log file: %s", log_file_path)
@@ -1,15 +1,27 @@
 from fastapi import FastAPI, Request
+from app.limiting.tier_service import authenticate
 from app.limiting.deps import (
+    leased_bucket,
     rate_limit_dependency,
     redis_rate_limit_dependency,
     token_bucket_dependency,
     tiered_token_bucket_dependency
 )
-from .database import Base, engine
-from fastapi.responses import JSONResponse
+from .database import Base, engine, async_engine
+from fastapi.responses import JSONResponse, Response
 from app.routes import users, transcripts
+from app.services.transcript_service import transcript_flight, refresh_stats
+from app.services.cache_service import CacheService
+from app.services.fetch_pool import fetch_pool
+from app.services.password_pool import password_pool
+from app.services import invalidation, job_queue
+from app.services.archive import archive_writer
+from app import metrics
+from app.logger import RequestIdMiddleware
 import os
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 # Create tables if not exist
 Base.metadata.create_all(bind=engine)
@@ -37,33 +49,96 @@ app.add_middleware(
 )
 
 # ===== Middleware to handle API keys + attach rate-limit headers =====
-@app.middleware("http")
-async def api_key_and_rate_limit_middleware(request: Request, call_next):
+PUBLIC_PATHS = frozenset({"/", "/users/register", "/users/login", "/healthz", "/metrics", "/docs", "/openapi.json"})
+
+
+class APIKeyRateLimitMiddleware:
     """
-    Middleware that:
+    Pure ASGI middleware that:
     - Skips API key check for public routes (register, healthz, docs).
     - Skips API key check for preflight OPTIONS requests.
-    - Requires API key for all other routes.
-    - Attaches rate-limit headers set by dependencies.
+    - Requires API key for all other routes (401 before routing).
+    - Attaches rate-limit headers set by dependencies to the response start,
+      so streaming responses pass through unbuffered.
     """
-    public_paths = ["/", "/users/register", "/users/login", "/healthz", "/docs", "/openapi.json"]
 
-    # Skip API key check for OPTIONS (CORS preflight) or public paths
-    if request.method != "OPTIONS" and request.url.path not in public_paths:
-        api_key = request.headers.get("x-api-key")
-        if not api_key:
-            return JSONResponse(status_code=401, content={"detail": "API key required"})
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.missing_key = JSONResponse(status_code=401, content={"detail": "API key required"})
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # Skip API key check for OPTIONS (CORS preflight) or public paths
+        if scope["method"] != "OPTIONS" and scope["path"] not in PUBLIC_PATHS:
+            if not any(name == b"x-api-key" and value for name, value in scope["headers"]):
+                await self.missing_key(scope, receive, send)
+                return
+
+        # Dependencies store rate_limit_headers on request.state, i.e. in this dict
+        state = scope.setdefault("state", {})
+
+        async def send_with_rate_limit_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                hdrs = state.get("rate_limit_headers")
+                if hdrs:
+                    headers = MutableHeaders(scope=message)
+                    for k, v in hdrs.items():
+                        headers[k] = v
+            await send(message)
+
+        await self.app(scope, receive, send_with_rate_limit_headers)
+
+
+app.add_middleware(APIKeyRateLimitMiddleware)
+
+# Outermost, so latency includes the API key check and requests it rejects
+app.add_middleware(metrics.RequestMetricsMiddleware)
+# Outside everything else, so every log line of a request carries its X-Request-ID
+app.add_middleware(RequestIdMiddleware)
 
-    # Process request
-    response = await call_next(request)
+# ===== Background tasks =====
+@app.on_event("startup")
+async def start_cache_invalidation_listener():
+    invalidation.start_listener()
 
-    # Attach rate limit headers if set by dependency
-    hdrs = getattr(request.state, "rate_limit_headers", None)
-    if hdrs:
-        for k, v in hdrs.items():
-            response.headers[k] = v
+@app.on_event("startup")
+async def start_token_lease_sweeper():
+    leased_bucket.start()
 
-    return response
+@app.on_event("startup")
+async def start_archive_writer():
+    archive_writer.start()
+
+@app.on_event("shutdown")
+async def stop_cache_invalidation_listener():
+    await invalidation.stop_listener()
+
+@app.on_event("shutdown")
+async def return_token_leases():
+    await leased_bucket.close()
+
+@app.on_event("shutdown")
+async def flush_archive_writer():
+    await archive_writer.close()
+
+@app.on_event("shutdown")
+def stop_fetch_pool():
+    fetch_pool.shutdown()
+
+@app.on_event("shutdown")
+def stop_password_pool():
+    password_pool.shutdown()
+
+@app.on_event("shutdown")
+async def close_database_pool():
+    await async_engine.dispose()
+
+@app.on_event("shutdown")
+def remove_worker_metrics():
+    metrics.mark_process_dead()
 
 # ===== Include routes =====
 app.include_router(users.router)       # User register + login
@@ -74,6 +149,37 @@ app.include_router(transcripts.router) # Transcript endpoints
 def health_check():
     return {"status": "ok", "message": "API is running fine! Go to /docs for API documentation."}
 
+# ===== Internal stats =====
+@app.get("/stats")
+async def stats(request: Request):
+    """Per-worker counters for the transcript hot path (plus the shared job queue depth)."""
+    # The middleware only checks that a key was sent; internals are for registered keys
+    await authenticate(request.headers.get("x-api-key", ""))
+    flight = transcript_flight.stats
+    return {
+        "cache": CacheService.stats(),
+        "token_leases": leased_bucket.stats,
+        "fetch_pool": fetch_pool.gauges(),
+        "password_pool": password_pool.gauges(),
+        "refresh": refresh_stats,
+        "archive": archive_writer.stats,
+        "jobs": await job_queue.depth(),
+        "singleflight": {
+            **flight,
+            "coalesced": flight["coalesced_local"] + flight["coalesced_remote"],
+        },
+    }
+
+# ===== Prometheus =====
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics(request: Request):
+    """Prometheus scrape endpoint (aggregated across workers in multiprocess mode)."""
+    # No API key (scrapers don't have one), but not open either: token or allowed networks
+    client_host = request.client.host if request.client else None
+    if not metrics.scrape_allowed(request.headers.get("authorization"), client_host):
+        return JSONResponse(status_code=403, content={"detail": "Metrics are not available to this client"})
+    return Response(metrics.render_latest(), media_type=metrics.CONTENT_TYPE_LATEST)
+
 # ===== Root =====
 @app.get("/")
 def root():
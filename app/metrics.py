@@ -0,0 +1,177 @@
+"""
+Prometheus metrics for the transcript hot path.
+
+With several uvicorn workers, set PROMETHEUS_MULTIPROC_DIR to an empty, writable
+directory before the processes start (wipe it on every deploy): each worker then
+writes its samples to memory-mapped files there and GET /metrics aggregates all
+of them. Without it, /metrics reports the current process only.
+
+Label values on the hot path are bound once here, so recording a sample is a
+plain inc()/observe() call (about a microsecond; see benchmarks/bench_metrics.py).
+"""
+import hmac
+import ipaddress
+import os
+import time
+from typing import Optional
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.limiting.config import VALID_TIERS
+from app.config import METRICS_ALLOWED_NETWORKS, METRICS_TOKEN
+
+MULTIPROCESS = bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
+_SCRAPE_NETWORKS = [ipaddress.ip_network(n, strict=False) for n in METRICS_ALLOWED_NETWORKS]
+
+# Sub-millisecond work (limiter decisions, local DB lookups) needs finer buckets than the defaults
+_FAST_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+_UPSTREAM_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0, 30.0)
+
+CACHE_LOOKUPS = Counter(
+    "transcript_cache_lookups_total",
+    "Transcript cache lookups by layer (l1, redis, archive, negative) and result (hit, miss)",
+    ["layer", "result"],
+)
+UPSTREAM_FETCH_SECONDS = Histogram(
+    "transcript_upstream_fetch_seconds",
+    "Time spent in YouTube calls per fetch, by outcome (ok or the API error class)",
+    ["outcome"],
+    buckets=_UPSTREAM_BUCKETS,
+)
+FETCH_POOL_QUEUED = Gauge(
+    "fetch_pool_queue_depth",
+    "Upstream fetches waiting for a pool thread",
+    multiprocess_mode="livesum",
+)
+FETCH_POOL_IN_FLIGHT = Gauge(
+    "fetch_pool_in_flight",
+    "Upstream fetches running on pool threads",
+    multiprocess_mode="livesum",
+)
+FETCH_POOL_REJECTED = Counter(
+    "fetch_pool_rejected_total",
+    "Fetches shed with 503 because the pool queue was full",
+)
+LIMITER_SECONDS = Histogram(
+    "rate_limiter_decision_seconds",
+    "Tiered token-bucket decision latency, by tier",
+    ["tier"],
+    buckets=_FAST_BUCKETS,
+)
+LIMITER_DENIALS = Counter(
+    "rate_limiter_denials_total",
+    "Requests rejected with 429 by the tiered token bucket, by tier",
+    ["tier"],
+)
+TIER_DB_SECONDS = Histogram(
+    "tier_service_db_lookup_seconds",
+    "users-table lookups behind the principal cache",
+    buckets=_FAST_BUCKETS,
+)
+SINGLEFLIGHT_CALLS = Counter(
+    "singleflight_calls_total",
+    "Single-flight calls by flight (lock namespace) and outcome: executed, coalesced_local, coalesced_remote",
+    ["flight", "outcome"],
+)
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "Request latency by method, route template and status code",
+    ["method", "route", "status"],
+)
+
+L1_HIT = CACHE_LOOKUPS.labels("l1", "hit")
+L1_MISS = CACHE_LOOKUPS.labels("l1", "miss")
+REDIS_HIT = CACHE_LOOKUPS.labels("redis", "hit")
+REDIS_MISS = CACHE_LOOKUPS.labels("redis", "miss")
+ARCHIVE_HIT = CACHE_LOOKUPS.labels("archive", "hit")
+ARCHIVE_MISS = CACHE_LOOKUPS.labels("archive", "miss")
+NEGATIVE_HIT = CACHE_LOOKUPS.labels("negative", "hit")
+NEGATIVE_MISS = CACHE_LOOKUPS.labels("negative", "miss")
+
+_limiter_seconds = {tier: LIMITER_SECONDS.labels(tier) for tier in VALID_TIERS}
+_limiter_denials = {tier: LIMITER_DENIALS.labels(tier) for tier in VALID_TIERS}
+# (method, route template, status) -> bound histogram; bounded by the route table
+_request_seconds: dict = {}
+
+
+def observe_upstream_fetch(outcome: str, seconds: float) -> None:
+    UPSTREAM_FETCH_SECONDS.labels(outcome).observe(seconds)
+
+
+def observe_limiter(tier: str, seconds: float, allowed: bool) -> None:
+    histogram = _limiter_seconds.get(tier) or LIMITER_SECONDS.labels(tier)
+    histogram.observe(seconds)
+    if not allowed:
+        (_limiter_denials.get(tier) or LIMITER_DENIALS.labels(tier)).inc()
+
+
+def render_latest() -> bytes:
+    """Exposition text for /metrics: every worker's samples in multiprocess mode."""
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest()
+
+
+def scrape_allowed(authorization: Optional[str], client_host: Optional[str]) -> bool:
+    """
+    Whether a /metrics request may see the metrics: it must carry METRICS_TOKEN as a
+    bearer token when one is set, else come from METRICS_ALLOWED_NETWORKS (loopback).
+    """
+    if METRICS_TOKEN:
+        return hmac.compare_digest((authorization or "").encode(), f"Bearer {METRICS_TOKEN}".encode())
+    try:
+        address = ipaddress.ip_address(client_host or "")
+    except ValueError:
+        return False
+    return any(address in network for network in _SCRAPE_NETWORKS)
+
+
+def mark_process_dead() -> None:
+    """Drop this worker's live gauges from the aggregate (call on shutdown)."""
+    if MULTIPROCESS:
+        multiprocess.mark_process_dead(os.getpid())
+
+
+class RequestMetricsMiddleware:
+    """
+    Pure ASGI middleware recording http_request_duration_seconds.
+    Labels use the matched route's path template (e.g. /v1/transcripts/jobs/{job_id})
+    so IDs in URLs don't create new series; unmatched paths share one label.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            labels = (scope["method"], getattr(scope.get("route"), "path", "unmatched"), status_code)
+            histogram = _request_seconds.get(labels)
+            if histogram is None:
+                histogram = _request_seconds[labels] = REQUEST_SECONDS.labels(*labels[:2], str(status_code))
+            histogram.observe(time.perf_counter() - started)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, TIMESTAMP
+from sqlalchemy import Column, Integer, String, TIMESTAMP, LargeBinary
 from sqlalchemy.sql import func
 from .database import Base
 
@@ -12,3 +12,15 @@ class User(Base):
     api_key = Column(String(64), unique=True, nullable=False)
     tier = Column(String(50), nullable=False, default="free")
     created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
+
+
+class Transcript(Base):
+    """Durable copy of fetched transcripts, consulted when Redis misses (see services/archive.py)."""
+    __tablename__ = "transcripts"
+
+    video_id = Column(String(32), primary_key=True)
+    language_code = Column(String(32), primary_key=True)
+    language = Column(String(255), nullable=False)
+    snippet_count = Column(Integer, nullable=False)
+    payload = Column(LargeBinary, nullable=False)  # transcript_codec binary record (zlib'd msgpack)
+    fetched_at = Column(TIMESTAMP(timezone=True), nullable=False, index=True)
@@ -0,0 +1,116 @@
+import re
+from typing import Callable, Dict, Iterable, Iterator, Tuple
+
+from app.logger import logger
+
+Snippet = Tuple[float, float, str]  # (start, duration, text) in seconds
+
+# Snippets per chunk when streaming; keeps per-chunk overhead low without buffering everything
+STREAM_CHUNK_SNIPPETS = 200
+
+SRT_MEDIA_TYPE = "application/x-subrip"
+VTT_MEDIA_TYPE = "text/vtt"
+TXT_MEDIA_TYPE = "text/plain"
+JSON_MEDIA_TYPE = "application/json"
+
+_NON_TEXT = re.compile(r"[^a-zA-Z\s.!?]")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def format_timestamp(seconds: float, separator: str = ",") -> str:
+    """
+    Converts seconds into an SRT-style timestamp (HH:MM:SS,mmm).
+    Pure integer arithmetic on milliseconds; use separator="." for WebVTT.
+    """
+    return _format_ms(round(seconds * 1000), separator)
+
+
+def _format_ms(ms: int, separator: str) -> str:
+    hours, ms = divmod(ms, 3_600_000)
+    minutes, ms = divmod(ms, 60_000)
+    secs, ms = divmod(ms, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}{separator}{ms:03d}"
+
+
+def format_transcript(snippets: Iterable[Snippet]) -> str:
+    """Builds the cleaned plain-text transcript from (start, duration, text) snippets."""
+    raw_text = " ".join(text for _, _, text in snippets)
+
+    # Remove all characters except letters, spaces, and punctuation, then normalize whitespace
+    cleaned_text = _WHITESPACE.sub(" ", _NON_TEXT.sub("", raw_text)).strip()
+
+    logger.debug("Transcript formatting complete. Cleaned text length: %s characters", len(cleaned_text))
+    return cleaned_text
+
+
+def iter_srt(snippets: Iterable[Snippet], chunk_size: int = STREAM_CHUNK_SNIPPETS) -> Iterator[str]:
+    """Yields an SRT document in chunks of `chunk_size` blocks."""
+    buf = []
+    for idx, (start, duration, text) in enumerate(snippets, start=1):
+        start_time = _format_ms(round(start * 1000), ",")
+        end_time = _format_ms(round((start + duration) * 1000), ",")
+        # Blocks are separated by a blank line (no trailing one after the last block)
+        sep = "\n" if idx > 1 else ""
+        buf.append(f"{sep}{idx}\n{start_time} --> {end_time}\n{text}\n")
+        if len(buf) >= chunk_size:
+            yield "".join(buf)
+            buf = []
+    if buf:
+        yield "".join(buf)
+
+
+def _escape_vtt(text: str) -> str:
+    # Cue text is parsed for tags and entities, so a literal & or < must be escaped
+    if "&" in text or "<" in text:
+        text = text.replace("&", "&amp;").replace("<", "&lt;")
+    return text
+
+
+def iter_vtt(snippets: Iterable[Snippet], chunk_size: int = STREAM_CHUNK_SNIPPETS) -> Iterator[str]:
+    """Yields a WebVTT document (header, then one cue per snippet) in chunks of `chunk_size` cues."""
+    buf = ["WEBVTT\n"]
+    for start, duration, text in snippets:
+        start_time = _format_ms(round(start * 1000), ".")
+        end_time = _format_ms(round((start + duration) * 1000), ".")
+        buf.append(f"\n{start_time} --> {end_time}\n{_escape_vtt(text)}\n")
+        if len(buf) >= chunk_size:
+            yield "".join(buf)
+            buf = []
+    if buf:
+        yield "".join(buf)
+
+
+def render_segments(record: dict) -> dict:
+    """Transcript metadata plus one {"start", "duration", "text"} object per snippet."""
+    return {
+        "video_id": record["video_id"],
+        "language": record["language"],
+        "language_code": record["language_code"],
+        "segments": [
+            {"start": start, "duration": duration, "text": text}
+            for start, duration, text in record["snippets"]
+        ],
+    }
+
+
+def render_srt(record: dict) -> str:
+    snippets = record["snippets"]
+    return "".join(iter_srt(snippets, chunk_size=len(snippets) or 1))
+
+
+def render_vtt(record: dict) -> str:
+    snippets = record["snippets"]
+    return "".join(iter_vtt(snippets, chunk_size=len(snippets) + 1))
+
+
+def render_txt(record: dict) -> str:
+    return format_transcript(record["snippets"])
+
+
+# ?format= values: (renderer, media type, streaming iterator or None)
+FORMATS: Dict[str, Tuple[Callable[[dict], object], str, Callable[..., Iterator[str]] | None]] = {
+    "srt": (render_srt, SRT_MEDIA_TYPE, iter_srt),
+    "vtt": (render_vtt, VTT_MEDIA_TYPE, iter_vtt),
+    "txt": (render_txt, TXT_MEDIA_TYPE, None),
+    "json": (render_segments, JSON_MEDIA_TYPE, None),
+}
@@ -0,0 +1,30 @@
+"""
+JSON responses encoded with orjson.
+
+Transcript payloads are large (cleaned text + SRT), so they are encoded once:
+`encode_success` builds the success envelope's bytes, which cache entries keep
+and cache hits send as they are (`JSONBytesResponse`). Everything else on the
+transcript routes goes through `ORJSONResponse`.
+"""
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse, Response
+
+
+def encode_success(data: Any, code: int = 200) -> bytes:
+    """The {"status": "success", "code": ..., "data": ...} envelope as JSON bytes."""
+    return orjson.dumps({"status": "success", "code": code, "data": data})
+
+
+class ORJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson (compact separators, UTF-8 instead of \\u escapes)."""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content)
+
+
+class JSONBytesResponse(Response):
+    """A body that is already JSON (e.g. a cached envelope), sent without re-encoding."""
+
+    media_type = "application/json"
@@ -1,57 +1,434 @@
+import asyncio
+from email.utils import formatdate
 from typing import Optional
-from fastapi import APIRouter, Query, Depends, status
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Query, Depends, HTTPException, Request, status
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
 
-from app.services.transcript_service import get_transcript
+from app.services.transcript_service import (
+    get_stored_transcript,
+    get_transcript_encoded,
+    get_transcript_entry,
+    get_transcript_record,
+    get_transcript_slice,
+    get_transcript_validator,
+    get_transcripts_batch,
+    record_validator_hit,
+    search_transcript,
+)
+from app.services import job_queue, webhooks
 from app.exceptions import TranscriptError
-from app.schemas import SuccessResponse, ErrorResponse
+from app.schemas import (
+    SuccessResponse,
+    ErrorResponse,
+    BatchTranscriptRequest,
+    BatchItemResult,
+    BatchTranscriptData,
+    BatchSuccessResponse,
+    TranscriptJobRequest,
+)
 from app.logger import logger
-from app.limiting.deps import tiered_token_bucket_dependency
+from app.compression import negotiate
+from app.responses import ORJSONResponse, JSONBytesResponse, encode_success
+from app.utils import iter_ndjson
+from app.renderer import FORMATS, SRT_MEDIA_TYPE, VTT_MEDIA_TYPE, TXT_MEDIA_TYPE
+from app.config import BATCH_MAX_ITEMS, NOT_MODIFIED_CONSUMES_TOKEN, TRANSCRIPT_CACHE_CONTROL
+from app.limiting.deps import tiered_token_bucket_dependency, charge_tiered_tokens
+from app.limiting.tier_service import authenticate
+
+router = APIRouter(prefix="/v1/transcripts", tags=["transcripts"], default_response_class=ORJSONResponse)
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+_TRUTHY = {"1", "true", "yes"}
+
+
+def _error_response(
+    code: int, message: str, error: Optional[str] = None, retry_after: Optional[int] = None
+) -> ORJSONResponse:
+    return ORJSONResponse(
+        status_code=code,
+        content=ErrorResponse(status="error", code=code, message=message, error=error).dict(),
+        headers={"Retry-After": str(retry_after)} if retry_after else None,
+    )
+
+
+def _success_response(
+    data: dict, code: int = status.HTTP_200_OK, headers: Optional[dict] = None
+) -> JSONBytesResponse:
+    """The SuccessResponse envelope, encoded in one orjson pass (no model round trip)."""
+    return JSONBytesResponse(encode_success(data, code), status_code=code, headers=headers)
+
+
+def _etag(content_hash: str, variant: str, encoding: Optional[str] = None) -> str:
+    """Strong ETag: the cached content hash, qualified by the representation and content coding served."""
+    return '"' + "-".join(part for part in (content_hash, variant, encoding) if part) + '"'
+
 
-router = APIRouter(prefix="/v1/transcripts", tags=["transcripts"])
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match uses weak comparison (W/ is ignored); "*" matches any cached transcript."""
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+def _cache_headers(
+    content_hash: str, cached_at: int, variant: str, encoding: Optional[str] = None, negotiated: bool = False
+) -> dict:
+    headers = {
+        "ETag": _etag(content_hash, variant, encoding),
+        "Cache-Control": TRANSCRIPT_CACHE_CONTROL,
+        "Last-Modified": formatdate(cached_at, usegmt=True),
+    }
+    if negotiated:
+        headers["Vary"] = "Accept-Encoding"
+    return headers
+
+
+def _not_modified(headers: dict) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
 
 @router.get(
     "",
     response_model=SuccessResponse,
     responses={
-        200: {"model": SuccessResponse, "description": "Transcript fetched successfully"},
+        200: {
+            "model": SuccessResponse,
+            "description": "Transcript fetched successfully",
+            "content": {NDJSON_MEDIA_TYPE: {}, SRT_MEDIA_TYPE: {}, VTT_MEDIA_TYPE: {}, TXT_MEDIA_TYPE: {}},
+        },
+        304: {"description": "Not modified: If-None-Match matches the current ETag"},
         403: {"model": ErrorResponse, "description": "Video is private or transcript disabled"},
         404: {"model": ErrorResponse, "description": "Video unavailable"},
         422: {"model": ErrorResponse, "description": "Validation error"},
         500: {"model": ErrorResponse, "description": "Internal server error"},
+        503: {"model": ErrorResponse, "description": "Upstream fetch queue full; see Retry-After"},
     },
     summary="Fetch transcript of a YouTube video",
-    description="Returns cleaned transcript, raw data, and SRT-formatted timestamps.",
-    dependencies=[Depends(tiered_token_bucket_dependency())],
+    description=(
+        "Returns cleaned transcript, raw data, and SRT-formatted timestamps. "
+        "Use `format=srt|vtt|txt|json` to get only that rendering (`json` = timed segments), "
+        "`stream=1` with `srt`/`vtt` for a chunked document, or `stream=ndjson` for one JSON line per snippet. "
+        "Responses carry a strong `ETag`; send it back in `If-None-Match` to get `304 Not Modified`. "
+        "Non-streamed responses are compressed (`br` or `gzip`) when `Accept-Encoding` allows it."
+    ),
 )
 async def fetch_transcript(
+    request: Request,
     video_id: str = Query(..., description="YouTube video ID, e.g., 'dQw4w9WgXcQ'"),
-    language: Optional[str] = Query(None, description="Optional language code, e.g., 'en'")
+    language: Optional[str] = Query(None, description="Optional language code, e.g., 'en'"),
+    format: Optional[str] = Query(None, description="Optional output format: 'srt', 'vtt', 'txt' or 'json'"),
+    stream: Optional[str] = Query(None, description="'ndjson', or '1' to stream the chosen format (srt/vtt)"),
 ):
-    logger.info(f"Received request: video_id={video_id}, language={language}")
+    logger.debug(
+        "Received request: video_id=%s, language=%s, format=%s, stream=%s", video_id, language, format, stream
+    )
+
+    stream_ndjson = stream == "ndjson"
+    stream_format = (
+        format in FORMATS and FORMATS[format][2] is not None
+        and stream is not None and stream.lower() in _TRUTHY
+    )
+    invalid = None
+    if format is not None and format not in FORMATS:
+        invalid = _error_response(
+            422, "Unsupported format", f"format must be one of {', '.join(FORMATS)}, got '{format}'"
+        )
+    elif stream is not None and not (stream_ndjson or stream_format):
+        invalid = _error_response(
+            422, "Unsupported stream mode", "Use stream=ndjson, or format=srt|vtt&stream=1"
+        )
+    # The representation served is part of its ETag: full JSON, one format, a streamed format, or NDJSON
+    variant = "ndjson" if stream_ndjson else f"{format}-stream" if stream_format else format or ""
+    # Streams go out uncompressed; whole bodies are compressed once and cached per encoding
+    negotiated = stream is None
+    encoding = negotiate(request.headers.get("accept-encoding")) if negotiated else None
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and invalid is None:
+        # Answered from cached metadata alone: the transcript is neither loaded nor rendered
+        validator = await get_transcript_validator(video_id, language)
+        if validator is not None and _etag_matches(if_none_match, _etag(validator.content_hash, variant, encoding)):
+            if NOT_MODIFIED_CONSUMES_TOKEN:
+                await charge_tiered_tokens(request)
+            else:
+                await authenticate(request.headers.get("x-api-key", ""))
+            record_validator_hit(video_id, validator)
+            return _not_modified(
+                _cache_headers(validator.content_hash, validator.cached_at, variant, encoding, negotiated)
+            )
+
+    await charge_tiered_tokens(request)
+    if invalid is not None:
+        return invalid
 
     try:
-        # ✅ Directly await async get_transcript
-        transcript = await get_transcript(video_id, language)
-        logger.info(f"Transcript fetched successfully for video_id={video_id}")
-
-        return JSONResponse(
-            status_code=status.HTTP_200_OK,
-            content=SuccessResponse(
-                status="success",
-                code=200,
-                data=transcript,
-            ).dict(),
+        if encoding is not None:
+            # Stored compressed body: no rendering or compression on hits
+            body, content_hash, cached_at = await get_transcript_encoded(video_id, language, variant, encoding)
+            logger.debug("Transcript fetched successfully for video_id=%s (%s)", video_id, encoding)
+            headers = _cache_headers(content_hash, cached_at, variant, encoding, negotiated)
+            if if_none_match and _etag_matches(if_none_match, headers["ETag"]):
+                return _not_modified(headers)
+            headers["Content-Encoding"] = encoding
+            media_type = FORMATS[format][1] if format else JSONBytesResponse.media_type
+            return Response(body, media_type=media_type, headers=headers)
+
+        if stream_ndjson or format is not None:
+            # Work from the raw snippets; only the requested format is rendered
+            record = await get_transcript_record(video_id, language)
+            logger.debug("Transcript fetched successfully for video_id=%s", video_id)
+            headers = _cache_headers(record["content_hash"], record["cached_at"], variant, negotiated=negotiated)
+            if if_none_match and _etag_matches(if_none_match, headers["ETag"]):
+                return _not_modified(headers)
+            if stream_ndjson:
+                return StreamingResponse(iter_ndjson(record), media_type=NDJSON_MEDIA_TYPE, headers=headers)
+            render, media_type, iter_chunks = FORMATS[format]
+            if stream_format:
+                return StreamingResponse(iter_chunks(record["snippets"]), media_type=media_type, headers=headers)
+            if format == "json":
+                return _success_response(render(record), headers=headers)
+            return PlainTextResponse(render(record), media_type=media_type, headers=headers)
+
+        # ✅ The cache entry keeps the encoded response; hits send it without parsing or re-encoding
+        entry = await get_transcript_entry(video_id, language)
+        logger.debug("Transcript fetched successfully for video_id=%s", video_id)
+        headers = _cache_headers(entry.content_hash, entry.record["cached_at"], variant, negotiated=negotiated)
+        if if_none_match and _etag_matches(if_none_match, headers["ETag"]):
+            return _not_modified(headers)
+
+        return JSONBytesResponse(entry.body, headers=headers)
+
+    except TranscriptError as e:
+        logger.error("Error fetching transcript for video_id=%s: %s", video_id, e)
+        return _error_response(e.code, e.message, str(e), getattr(e, "retry_after", None))
+
+
+@router.get(
+    "/slice",
+    response_model=SuccessResponse,
+    responses={
+        200: {
+            "model": SuccessResponse,
+            "description": "Snippets within the time range",
+            "content": {SRT_MEDIA_TYPE: {}, VTT_MEDIA_TYPE: {}, TXT_MEDIA_TYPE: {}},
+        },
+        403: {"model": ErrorResponse, "description": "Video is private or transcript disabled"},
+        404: {"model": ErrorResponse, "description": "Video unavailable"},
+        422: {"model": ErrorResponse, "description": "Validation error"},
+        503: {"model": ErrorResponse, "description": "Upstream fetch queue full; see Retry-After"},
+    },
+    summary="Fetch part of a transcript by time range",
+    description=(
+        "Returns the snippets shown between `start` and `end` (seconds), including one already "
+        "on screen at `start`. `format` works as for the full transcript (default `json`)."
+    ),
+    dependencies=[Depends(tiered_token_bucket_dependency())],
+)
+async def fetch_transcript_slice(
+    video_id: str = Query(..., description="YouTube video ID, e.g., 'dQw4w9WgXcQ'"),
+    start: float = Query(..., ge=0, description="Range start in seconds"),
+    end: float = Query(..., gt=0, description="Range end in seconds (exclusive)"),
+    language: Optional[str] = Query(None, description="Optional language code, e.g., 'en'"),
+    format: str = Query("json", description="Output format: 'json', 'srt', 'vtt' or 'txt'"),
+):
+    logger.info("Received slice request: video_id=%s, start=%s, end=%s, format=%s", video_id, start, end, format)
+
+    if format not in FORMATS:
+        return _error_response(
+            422, "Unsupported format", f"format must be one of {', '.join(FORMATS)}, got '{format}'"
         )
+    if end <= start:
+        return _error_response(422, "Invalid time range", f"end ({end}) must be greater than start ({start})")
 
+    try:
+        record = await get_transcript_slice(video_id, language, start, end)
     except TranscriptError as e:
-        logger.error(f"Error fetching transcript for video_id={video_id}: {e}")
-        return JSONResponse(
-            status_code=e.code,
-            content=ErrorResponse(
-                status="error",
-                code=e.code,
-                message=e.message,
-                error=str(e),
-            ).dict(),
+        logger.error("Error fetching transcript slice for video_id=%s: %s", video_id, e)
+        return _error_response(e.code, e.message, str(e), getattr(e, "retry_after", None))
+
+    render, media_type, _ = FORMATS[format]
+    if format == "json":
+        return _success_response({**render(record), "start": start, "end": end})
+    return PlainTextResponse(render(record), media_type=media_type)
+
+
+@router.get(
+    "/search",
+    response_model=SuccessResponse,
+    responses={
+        200: {"model": SuccessResponse, "description": "Matching snippets with their timestamps"},
+        403: {"model": ErrorResponse, "description": "Video is private or transcript disabled"},
+        404: {"model": ErrorResponse, "description": "Video unavailable"},
+        422: {"model": ErrorResponse, "description": "Validation error"},
+        503: {"model": ErrorResponse, "description": "Upstream fetch queue full; see Retry-After"},
+    },
+    summary="Find where words are spoken in a transcript",
+    description=(
+        "Returns the snippets containing every word of `q` (case-insensitive, whole words), "
+        "in time order, with `total` counting all matches before `limit`."
+    ),
+    dependencies=[Depends(tiered_token_bucket_dependency())],
+)
+async def search_in_transcript(
+    video_id: str = Query(..., description="YouTube video ID, e.g., 'dQw4w9WgXcQ'"),
+    q: str = Query(..., min_length=1, description="Words to look for"),
+    language: Optional[str] = Query(None, description="Optional language code, e.g., 'en'"),
+    limit: int = Query(50, ge=1, le=500, description="Maximum number of matches returned"),
+):
+    logger.info("Received search request: video_id=%s, q=%r", video_id, q)
+
+    try:
+        data = await search_transcript(video_id, language, q, limit)
+    except TranscriptError as e:
+        logger.error("Error searching transcript for video_id=%s: %s", video_id, e)
+        return _error_response(e.code, e.message, str(e), getattr(e, "retry_after", None))
+
+    return _success_response(data)
+
+
+@router.post(
+    "/batch",
+    response_model=BatchSuccessResponse,
+    responses={
+        200: {"model": BatchSuccessResponse, "description": "Per-item results (each item succeeds or fails on its own)"},
+        401: {"model": ErrorResponse, "description": "Missing or invalid API key"},
+        422: {"model": ErrorResponse, "description": "Empty or oversized batch"},
+        429: {"model": ErrorResponse, "description": "Not enough tokens left for the whole batch"},
+    },
+    summary="Fetch transcripts for many YouTube videos",
+    description=(
+        "Looks up all cached transcripts in one round trip and fetches the rest concurrently. "
+        "Consumes one token per unique video ID, all or nothing."
+    ),
+)
+async def fetch_transcripts_batch(request: Request, payload: BatchTranscriptRequest):
+    # Preserve request order but only fetch (and charge for) each video once
+    video_ids = list(dict.fromkeys(v.strip() for v in payload.video_ids if v and v.strip()))
+    if not video_ids:
+        raise HTTPException(status_code=422, detail="video_ids must contain at least one video ID")
+    if len(video_ids) > BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Too many video IDs: {len(video_ids)} (max {BATCH_MAX_ITEMS})",
         )
+
+    await charge_tiered_tokens(request, cost=len(video_ids))
+    logger.info("Received batch request: %s videos, language=%s", len(video_ids), payload.language)
+
+    outcomes = await get_transcripts_batch(video_ids, payload.language)
+
+    results = []
+    for video_id in video_ids:
+        outcome = outcomes[video_id]
+        if isinstance(outcome, TranscriptError):
+            results.append(BatchItemResult(
+                video_id=video_id,
+                status="error",
+                code=outcome.code,
+                message=outcome.message,
+                error=str(outcome),
+            ))
+        else:
+            results.append(BatchItemResult(video_id=video_id, status="success", code=200, data=outcome))
+
+    succeeded = sum(1 for item in results if item.status == "success")
+    return ORJSONResponse(
+        status_code=status.HTTP_200_OK,
+        content=BatchSuccessResponse(
+            status="success",
+            code=200,
+            data=BatchTranscriptData(
+                requested=len(video_ids),
+                succeeded=succeeded,
+                failed=len(results) - succeeded,
+                results=results,
+            ),
+        ).dict(),
+    )
+
+
+@router.post(
+    "/jobs",
+    status_code=status.HTTP_202_ACCEPTED,
+    response_model=SuccessResponse,
+    responses={
+        202: {"model": SuccessResponse, "description": "Job queued; poll it or wait for the webhook"},
+        401: {"model": ErrorResponse, "description": "Missing or invalid API key"},
+        422: {"model": ErrorResponse, "description": "Empty video_id, or a webhook_url that isn't publicly reachable"},
+        429: {"model": ErrorResponse, "description": "No tokens left"},
+    },
+    summary="Queue a transcript fetch",
+    description=(
+        "Returns a job ID immediately; a background worker fetches the transcript. "
+        "Poll `GET /v1/transcripts/jobs/{job_id}` or pass `webhook_url` to get the result POSTed to you. "
+        "Consumes one token."
+    ),
+)
+async def create_transcript_job(request: Request, payload: TranscriptJobRequest):
+    video_id = payload.video_id.strip()
+    if not video_id:
+        raise HTTPException(status_code=422, detail="video_id must not be empty")
+    webhook_url = str(payload.webhook_url) if payload.webhook_url else None
+    if webhook_url:
+        try:
+            await asyncio.to_thread(webhooks.check_url, webhook_url)
+        except webhooks.UnsafeWebhookError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+
+    await charge_tiered_tokens(request)
+    job = await job_queue.create_job(
+        video_id,
+        payload.language,
+        request.state.user_id,
+        webhook_url,
+    )
+    logger.info("Queued transcript job %s for video_id=%s, language=%s", job["id"], video_id, payload.language)
+
+    return _success_response(
+        {"job_id": job["id"], "status": job["status"], "poll_url": f"{router.prefix}/jobs/{job['id']}"},
+        status.HTTP_202_ACCEPTED,
+    )
+
+
+@router.get(
+    "/jobs/{job_id}",
+    response_model=SuccessResponse,
+    responses={
+        200: {"model": SuccessResponse, "description": "Job status; includes the transcript once succeeded"},
+        401: {"model": ErrorResponse, "description": "Missing or invalid API key"},
+        404: {"model": ErrorResponse, "description": "Unknown or expired job"},
+        410: {"model": ErrorResponse, "description": "Job succeeded, but its transcript is no longer stored"},
+    },
+    summary="Poll a transcript job",
+    description="Polling is free; it doesn't consume tokens.",
+)
+async def get_transcript_job(request: Request, job_id: str):
+    principal = await authenticate(request.headers.get("x-api-key", ""))
+    job = await job_queue.get_job(job_id)
+    if job is None or job.get("user_id") != str(principal.user_id):
+        return _error_response(404, "Job not found", f"No job '{job_id}' for this API key (jobs expire)")
+
+    data = {
+        "job_id": job_id,
+        "status": job["status"],
+        "video_id": job["video_id"],
+        "language": job["language"] or None,
+        "attempts": int(job.get("attempts", 0)),
+        "created_at": int(job["created_at"]),
+        "updated_at": int(job["updated_at"]),
+    }
+    if job.get("webhook_url"):
+        data["webhook"] = job.get("webhook", "pending")
+
+    if job["status"] == "succeeded":
+        # The worker left the transcript in the shared cache (and the archive). Polling is
+        # free, so it's never fetched again from here: once both have dropped it, it's gone.
+        transcript = await get_stored_transcript(job["video_id"], job["language_code"])
+        if transcript is None:
+            return _error_response(
+                410, "Job result expired", "The transcript is no longer stored; create a new job or call GET /v1/transcripts"
+            )
+        data["transcript"] = transcript
+    elif job["status"] == "failed":
+        data["error"] = {"code": int(job["error_code"]), "message": job["error_message"]}
+
+    return _success_response(data)
@@ -1,25 +1,22 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.database import SessionLocal
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_db
 from app import models, schemas, auth
+from app.services.password_pool import password_pool
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
-# Dependency to get DB session
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+_BUSY = {503: {"description": "Password hashing pool saturated; see Retry-After"}}
 
-@router.post("/register", response_model=schemas.UserOut)
-def register(user: schemas.UserRegister, db: Session = Depends(get_db)):
-    existing = db.query(models.User).filter(models.User.email == user.email).first()
+@router.post("/register", response_model=schemas.UserOut, responses=_BUSY)
+async def register(user: schemas.UserRegister, db: AsyncSession = Depends(get_db)):
+    existing = await db.scalar(select(models.User.id).where(models.User.email == user.email))
     if existing:
         raise HTTPException(status_code=400, detail="Email already registered")
 
-    hashed_password = auth.hash_password(user.password)
+    # bcrypt is deliberately slow; it runs on the bounded process pool
+    hashed_password = await password_pool.hash(user.password)
     api_key = auth.generate_api_key()
 
     new_user = models.User(
@@ -30,14 +27,21 @@ def register(user: schemas.UserRegister, db: Session = Depends(get_db)):
         tier="free"
     )
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
     return new_user
 
-@router.post("/login")
-def login(credentials: schemas.UserLogin, db: Session = Depends(get_db)):
-    user = db.query(models.User).filter(models.User.email == credentials.email).first()
-    if not user or not auth.verify_password(credentials.password, user.password):
+@router.post("/login", responses=_BUSY)
+async def login(credentials: schemas.UserLogin, db: AsyncSession = Depends(get_db)):
+    user = await db.scalar(select(models.User).where(models.User.email == credentials.email))
+    if not user:
         raise HTTPException(status_code=401, detail="Invalid email or password")
+    valid, new_hash = await password_pool.verify_and_update(credentials.password, user.password)
+    if not valid:
+        raise HTTPException(status_code=401, detail="Invalid email or password")
+    if new_hash:
+        # Stored hash predates the current BCRYPT_ROUNDS
+        user.password = new_hash
+        await db.commit()
 
     return {"api_key": user.api_key, "tier": user.tier}
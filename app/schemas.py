@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr
-from typing import Any, Dict, Optional
+from pydantic import BaseModel, EmailStr, HttpUrl
+from typing import Any, Dict, List, Optional
 
 class SuccessResponse(BaseModel):
     status: str = "success"
@@ -12,6 +12,34 @@ class ErrorResponse(BaseModel):
     message: str
     error: Optional[str] = None
 
+class BatchTranscriptRequest(BaseModel):
+    video_ids: List[str]
+    language: Optional[str] = None
+
+class BatchItemResult(BaseModel):
+    video_id: str
+    status: str
+    code: int
+    data: Optional[Dict[str, Any]] = None
+    message: Optional[str] = None
+    error: Optional[str] = None
+
+class BatchTranscriptData(BaseModel):
+    requested: int
+    succeeded: int
+    failed: int
+    results: List[BatchItemResult]
+
+class BatchSuccessResponse(BaseModel):
+    status: str = "success"
+    code: int = 200
+    data: BatchTranscriptData
+
+class TranscriptJobRequest(BaseModel):
+    video_id: str
+    language: Optional[str] = None
+    webhook_url: Optional[HttpUrl] = None
+
 from pydantic import BaseModel, EmailStr
 
 class UserRegister(BaseModel):
@@ -0,0 +1,229 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app import metrics, models
+from app.database import AsyncSessionLocal, SessionLocal, async_engine
+from app.services import transcript_codec
+from app.config import (
+    ARCHIVE_ENABLED,
+    ARCHIVE_BATCH_SIZE,
+    ARCHIVE_FLUSH_INTERVAL,
+    ARCHIVE_MAX_PENDING,
+    ARCHIVE_MAX_ATTEMPTS,
+)
+from app.logger import logger
+
+_UPDATE_COLUMNS = ("language", "snippet_count", "payload", "fetched_at")
+
+
+async def _load(video_id: str, language_codes: Sequence[str]) -> Optional[bytes]:
+    """Payload for the first of `language_codes` that is archived (async pool, no thread hop)."""
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(
+            select(models.Transcript.language_code, models.Transcript.payload).where(
+                models.Transcript.video_id == video_id,
+                models.Transcript.language_code.in_(language_codes),
+            )
+        )).all()
+    payloads = dict(rows)
+    for code in language_codes:
+        if code in payloads:
+            return payloads[code]
+    return None
+
+
+async def load(video_id: str, language_codes: Sequence[str]) -> Optional[dict]:
+    """
+    Archived transcript record for the first matching language code, or None.
+    Best effort: a database error is logged and treated as a miss.
+    """
+    if not ARCHIVE_ENABLED or not language_codes:
+        return None
+    try:
+        payload = await _load(video_id, list(language_codes))
+    except Exception as e:
+        logger.error("Archive lookup failed for video_id=%s: %s", video_id, e)
+        return None
+    if payload is None:
+        archive_writer.stats["misses"] += 1
+        metrics.ARCHIVE_MISS.inc()
+        return None
+    try:
+        record = transcript_codec.decode(payload)
+    except (transcript_codec.CacheFormatError, ValueError, KeyError) as e:
+        logger.error("Ignoring unreadable archived transcript for video_id=%s: %s", video_id, e)
+        return None
+    archive_writer.stats["hits"] += 1
+    metrics.ARCHIVE_HIT.inc()
+    return record
+
+
+def _row(record: dict) -> dict:
+    return {
+        "video_id": record["video_id"],
+        "language_code": record["language_code"],
+        "language": record["language"],
+        "snippet_count": len(record["snippets"]),
+        "payload": transcript_codec.encode(record),
+        "fetched_at": datetime.fromtimestamp(record.get("cached_at") or time.time(), tz=timezone.utc),
+    }
+
+
+async def _upsert(records: List[dict]) -> None:
+    """Multi-row INSERT ... ON CONFLICT DO UPDATE (Postgres; SQLite for local runs)."""
+    dialect = postgresql if async_engine.dialect.name == "postgresql" else sqlite
+    stmt = dialect.insert(models.Transcript.__table__)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["video_id", "language_code"],
+        set_={column: stmt.excluded[column] for column in _UPDATE_COLUMNS},
+    )
+    rows = [_row(record) for record in records]
+    async with async_engine.begin() as conn:
+        await conn.execute(stmt, rows)
+
+
+class ArchiveWriter:
+    """
+    Buffers freshly fetched transcripts and upserts them in batches from a
+    background task, so the request path never waits on Postgres.
+
+    - Pending writes are keyed by (video_id, language_code); a newer record replaces an older one.
+    - Flushes every `flush_interval` seconds, or sooner once `batch_size` records are waiting.
+    - Beyond `max_pending` buffered records new ones are dropped (the archive is best effort).
+    - A failed batch goes back in the buffer (unless a newer record for the key arrived)
+      and is retried on later flushes, up to `max_attempts` times before it is dropped.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = ARCHIVE_BATCH_SIZE,
+        flush_interval: float = ARCHIVE_FLUSH_INTERVAL,
+        max_pending: int = ARCHIVE_MAX_PENDING,
+        max_attempts: int = ARCHIVE_MAX_ATTEMPTS,
+    ):
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.max_attempts = max(1, max_attempts)
+        self._pending: Dict[Tuple[str, str], dict] = {}
+        self._failures: Dict[Tuple[str, str], int] = {}  # failed upserts per pending key
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {
+            "hits": 0, "misses": 0, "queued": 0, "written": 0, "dropped": 0, "errors": 0, "retried": 0,
+        }
+
+    def enqueue(self, record: dict) -> None:
+        if not ARCHIVE_ENABLED:
+            return
+        key = (record["video_id"], record["language_code"])
+        if key not in self._pending and len(self._pending) >= self.max_pending:
+            self.stats["dropped"] += 1
+            return
+        self._pending[key] = record
+        self._failures.pop(key, None)  # a new record starts its own attempts
+        self.stats["queued"] += 1
+        if self._wakeup is not None and len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+
+    async def flush(self) -> None:
+        """Write everything pending, `batch_size` rows per statement; stops at the first failure."""
+        while self._pending:
+            keys = list(self._pending)[: self.batch_size]
+            batch = [self._pending.pop(key) for key in keys]
+            try:
+                await _upsert(batch)
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.error("Archive upsert of %s transcripts failed: %s", len(batch), e)
+                self._requeue(keys, batch)
+                return
+            self.stats["written"] += len(batch)
+            for key in keys:
+                self._failures.pop(key, None)
+
+    def _requeue(self, keys: List[Tuple[str, str]], batch: List[dict]) -> None:
+        """Put a failed batch back for the next flush, dropping records out of attempts."""
+        given_up = 0
+        for key, record in zip(keys, batch):
+            if key in self._pending:
+                continue  # a newer record for this key arrived during the upsert
+            failures = self._failures.get(key, 0) + 1
+            if failures >= self.max_attempts:
+                self._failures.pop(key, None)
+                given_up += 1
+                continue
+            self._failures[key] = failures
+            self._pending[key] = record
+            self.stats["retried"] += 1
+        if given_up:
+            self.stats["dropped"] += given_up
+            logger.error("Archive gave up on %s transcripts after %s attempts", given_up, self.max_attempts)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def start(self) -> None:
+        """Start the background flusher (once per process)."""
+        if ARCHIVE_ENABLED and (self._task is None or self._task.done()):
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.ensure_future(self._run())
+
+    async def close(self) -> None:
+        """Stop the flusher and write whatever is still buffered."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+
+# Shared per-process writer
+archive_writer = ArchiveWriter()
+
+
+def list_older_than(days: int, limit: Optional[int] = None) -> List[Tuple[str, str]]:
+    """(video_id, language_code) of archived transcripts fetched more than `days` days ago, oldest first."""
+    cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+    db = SessionLocal()
+    try:
+        query = (
+            db.query(models.Transcript.video_id, models.Transcript.language_code)
+            .filter(models.Transcript.fetched_at < cutoff)
+            .order_by(models.Transcript.fetched_at)
+        )
+        if limit:
+            query = query.limit(limit)
+        return [tuple(row) for row in query.all()]
+    finally:
+        db.close()
+
+
+def purge_older_than(days: int) -> int:
+    """Delete archived transcripts fetched more than `days` days ago. Returns the number removed."""
+    cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+    db = SessionLocal()
+    try:
+        deleted = (
+            db.query(models.Transcript)
+            .filter(models.Transcript.fetched_at < cutoff)
+            .delete(synchronize_session=False)
+        )
+        db.commit()
+        return deleted
+    finally:
+        db.close()
@@ -1,24 +1,544 @@
 import json
-from datetime import timedelta
-from app.limiting.redis_client import r
+import time
+from itertools import accumulate
+from typing import NamedTuple
+
+from app.limiting.redis_client import r, rb
+from app.config import (
+    L1_CACHE_MAX_BYTES,
+    L1_CACHE_TTL,
+    CACHE_HARD_TTL,
+    CACHE_SOFT_TTL,
+    REFRESH_AHEAD_SECONDS,
+    REFRESH_AHEAD_MIN_HITS,
+    REFRESH_RETRY_SECONDS,
+    NEGATIVE_CACHE_TTLS,
+    CATALOG_TTL,
+)
+from app.exceptions import (
+    TranscriptError,
+    VideoUnavailableError,
+    VideoPrivateError,
+    LanguageNotSupportedError,
+)
+from app import metrics
+from app.services import invalidation, transcript_codec, transcript_index
+from app.services.local_cache import LocalCache
+from app.utils import build_transcript_payload
+from app.responses import encode_success
+from app.logger import logger
+
+CACHE_EXPIRY = CACHE_HARD_TTL  # 24 hours in seconds by default
+INVALIDATION_NAMESPACE = "transcript"
+
+# Per-worker L1 in front of Redis; hot transcripts are served without a network hop
+l1_cache = LocalCache(max_bytes=L1_CACHE_MAX_BYTES, ttl_seconds=L1_CACHE_TTL)
+invalidation.register(INVALIDATION_NAMESPACE, l1_cache.invalidate)
+
+# Error classes that may be remembered in the negative cache (TTLs in NEGATIVE_CACHE_TTLS)
+_NEGATIVE_ERRORS = {
+    cls.__name__: cls for cls in (VideoUnavailableError, VideoPrivateError, LanguageNotSupportedError)
+}
+# ...of which these hold for the whole video, whatever language was asked for
+_VIDEO_LEVEL_ERRORS = {VideoUnavailableError.__name__, VideoPrivateError.__name__}
+
+
+class CachedTranscript:
+    """
+    A decoded transcript cache entry.
+    Keeps the raw record (metadata + snippets) for streaming; the full response
+    (cleaned text + SRT) is derived on first use and then reused: `body` holds it
+    as encoded JSON for the GET endpoint, `payload` as a dict for batch and jobs.
+
+    Freshness comes from the record's `cached_at`: the entry is fresh for
+    CACHE_SOFT_TTL, then stale (still served, refreshed in the background) until
+    Redis drops it at CACHE_HARD_TTL. `hits` counts lookups in this worker.
+
+    Slice and search requests use the snippet start and running end times and the
+    token index, all kept on the entry once computed/loaded.
+
+    `content_hash` (stored in the record) identifies the rendered content for ETags;
+    entries cached before it existed get it computed on load.
+    """
+
+    __slots__ = (
+        "record", "size", "hits", "fresh_until", "expires_at", "_next_refresh", "_payload",
+        "_body", "_starts", "_max_ends", "search_index",
+    )
+
+    def __init__(self, record: dict, search_index: dict | None = None):
+        if "content_hash" not in record:
+            record["content_hash"] = transcript_codec.content_hash(record)
+        self.record = record
+        self._payload = None
+        self._body = None
+        self._starts = None
+        self._max_ends = None
+        self.search_index = search_index
+        self.hits = 0
+        cached_at = record.get("cached_at", 0)
+        self.fresh_until = cached_at + CACHE_SOFT_TTL
+        self.expires_at = cached_at + CACHE_HARD_TTL
+        self._next_refresh = 0.0
+        # Approximate resident size: snippet text is held once in the record and
+        # roughly twice more in the derived body/payload, plus per-snippet overhead.
+        text_bytes = sum(len(text) for _, _, text in record["snippets"])
+        self.size = 3 * text_bytes + 64 * len(record["snippets"])
+
+    @property
+    def payload(self) -> dict:
+        if self._payload is None:
+            self._payload = build_transcript_payload(self.record)
+        return self._payload
+
+    @property
+    def body(self) -> bytes:
+        """The success envelope as JSON bytes, encoded once; cache hits send it as-is."""
+        if self._body is None:
+            # The payload dict is only an intermediate here; don't keep a second copy
+            payload = self._payload or build_transcript_payload(self.record)
+            self._body = encode_success(payload)
+        return self._body
+
+    @property
+    def content_hash(self) -> str:
+        return self.record["content_hash"]
+
+    @property
+    def starts(self) -> list[float]:
+        """Ascending snippet start times, for bisecting time ranges."""
+        if self._starts is None:
+            self._starts = [start for start, _, _ in self.record["snippets"]]
+        return self._starts
+
+    @property
+    def max_ends(self) -> list[float]:
+        """Running maximum of snippet end times, for finding overlapping snippets still on screen."""
+        if self._max_ends is None:
+            self._max_ends = list(accumulate((start + duration for start, duration, _ in self.record["snippets"]), max))
+        return self._max_ends
+
+    def is_stale(self, now: float | None = None) -> bool:
+        return (now or time.time()) >= self.fresh_until
+
+    def claim_refresh(self, now: float | None = None) -> bool:
+        """
+        True if this entry should be refreshed now: it is stale, or it is hot and
+        within REFRESH_AHEAD_SECONDS of going stale. A positive answer is not
+        repeated for REFRESH_RETRY_SECONDS, so only one hit triggers the refresh.
+        """
+        now = now or time.time()
+        if now < self._next_refresh:
+            return False
+        due = now >= self.fresh_until or (
+            self.hits >= REFRESH_AHEAD_MIN_HITS and now >= self.fresh_until - REFRESH_AHEAD_SECONDS
+        )
+        if due:
+            self._next_refresh = now + REFRESH_RETRY_SECONDS
+        return due
+
+
+class Validator(NamedTuple):
+    """What conditional and compressed-body hits need to know about a cached transcript."""
+
+    content_hash: str
+    cached_at: int
+    entry: CachedTranscript | None  # this worker's L1 entry, if it holds one
 
-CACHE_EXPIRY = 60 * 60 * 24  # 24 hours in seconds
 
 class CacheService:
+    redis_stats = {"hits": 0, "misses": 0}
+    negative_stats = {"hits": 0, "stores": 0}
+    encoded_stats = {"hits": 0, "misses": 0, "stores": 0}
+
     @staticmethod
     def _build_key(video_id: str, language: str) -> str:
         """Create a consistent cache key for transcripts."""
         return f"transcript:{video_id}:{language}"
 
     @staticmethod
-    async def get_transcript(video_id: str, language: str) -> dict | None:
-        """Retrieve transcript from Redis if it exists."""
+    def _build_negative_key(video_id: str, language: str | None = None) -> str:
+        """Per video/language, or (language=None) for failures of the whole video."""
+        return f"transcript:neg:{video_id}:{language}" if language else f"transcript:neg:{video_id}"
+
+    @staticmethod
+    def _build_index_key(video_id: str, language: str) -> str:
+        return f"transcript:index:{video_id}:{language}"
+
+    @staticmethod
+    def _build_meta_key(video_id: str, language: str) -> str:
+        return f"transcript:meta:{video_id}:{language}"
+
+    @staticmethod
+    def _build_encoded_key(content_hash: str, variant: str, encoding: str) -> str:
+        return f"transcript:enc:{content_hash}:{variant or 'full'}:{encoding}"
+
+    @staticmethod
+    def _build_catalog_key(video_id: str) -> str:
+        return f"transcript:catalog:{video_id}"
+
+    @staticmethod
+    def _remember_catalog(key: str, data: str) -> dict:
+        catalog = json.loads(data)
+        l1_cache.set(key, catalog, len(data), min(L1_CACHE_TTL, CATALOG_TTL))
+        return catalog
+
+    @staticmethod
+    async def get_catalog(video_id: str) -> dict | None:
+        """
+        Retrieve a video's transcript catalog ({"manual": {code: name}, "generated": {code: name}})
+        from L1, falling back to Redis. None if it isn't cached.
+        """
+        key = CacheService._build_catalog_key(video_id)
+        catalog = l1_cache.get(key)
+        if catalog is None:
+            data = await r.get(key)
+            if not data:
+                return None
+            catalog = CacheService._remember_catalog(key, data)
+        return catalog
+
+    @staticmethod
+    async def get_many_catalogs(video_ids: list[str]) -> dict[str, dict]:
+        """Catalogs for several videos: L1 first, then a single MGET. Returns hits only."""
+        found: dict[str, dict] = {}
+        pending: list[str] = []
+        for video_id in video_ids:
+            catalog = l1_cache.get(CacheService._build_catalog_key(video_id))
+            if catalog is not None:
+                found[video_id] = catalog
+            else:
+                pending.append(video_id)
+
+        if pending:
+            keys = [CacheService._build_catalog_key(video_id) for video_id in pending]
+            for video_id, key, data in zip(pending, keys, await r.mget(keys)):
+                if data:
+                    found[video_id] = CacheService._remember_catalog(key, data)
+        return found
+
+    @staticmethod
+    async def set_catalog(video_id: str, catalog: dict) -> None:
+        """Save a video's transcript catalog for CATALOG_TTL; other workers drop their copy."""
+        key = CacheService._build_catalog_key(video_id)
+        data = json.dumps(catalog)
+        await r.set(key, data, ex=CATALOG_TTL)
+        CacheService._remember_catalog(key, data)
+        await invalidation.publish(INVALIDATION_NAMESPACE, key)
+
+    @staticmethod
+    def _remember(key: str, entry: CachedTranscript) -> None:
+        """Keep an entry in L1, but never past its hard expiry."""
+        ttl = min(L1_CACHE_TTL, int(entry.expires_at - time.time()))
+        if ttl > 0:
+            l1_cache.set(key, entry, entry.size, ttl)
+
+    @staticmethod
+    async def _load_entry(key: str, data: bytes) -> CachedTranscript | None:
+        """Decode a Redis hit, migrate legacy entries, and populate L1."""
+        CacheService.redis_stats["hits"] += 1
+        metrics.REDIS_HIT.inc()
+        try:
+            record = transcript_codec.decode(data)
+        except (transcript_codec.CacheFormatError, ValueError, KeyError) as e:
+            logger.error("Discarding unreadable cache entry %s: %s", key, e)
+            await rb.delete(key)
+            return None
+
+        if "cached_at" not in record:
+            # Entries written before freshness tracking: recover their age from the
+            # remaining TTL, then migrate in place (legacy JSON becomes binary too)
+            ttl = await rb.ttl(key)
+            age = CACHE_HARD_TTL - ttl if ttl > 0 else CACHE_SOFT_TTL
+            record["cached_at"] = int(time.time()) - age
+            await rb.set(key, transcript_codec.encode(record), keepttl=True)
+
+        entry = CachedTranscript(record)
+        CacheService._remember(key, entry)
+        return entry
+
+    @staticmethod
+    async def get_entry(video_id: str, language: str) -> CachedTranscript | None:
+        """Retrieve a transcript entry from the local L1 cache, falling back to Redis."""
         key = CacheService._build_key(video_id, language)
-        data = await r.get(key)
-        return json.loads(data) if data else None
+        entry = l1_cache.get(key)
+        if entry is None:
+            metrics.L1_MISS.inc()
+            data = await rb.get(key)
+            if not data:
+                CacheService.redis_stats["misses"] += 1
+                metrics.REDIS_MISS.inc()
+                return None
+            entry = await CacheService._load_entry(key, data)
+            if entry is None:
+                return None
+        else:
+            metrics.L1_HIT.inc()
+        entry.hits += 1
+        return entry
+
+    @staticmethod
+    async def get_validator(video_id: str, language: str) -> Validator | None:
+        """
+        Validator of a cached transcript, for conditional requests: from the L1 entry,
+        else from the small meta key. The record itself is never fetched or decoded.
+        None if unknown. Not counted as a lookup; see count_validator_hit.
+        """
+        entry = l1_cache.get(CacheService._build_key(video_id, language))
+        if entry is not None:
+            return Validator(entry.content_hash, entry.record["cached_at"], entry)
+        data = await r.get(CacheService._build_meta_key(video_id, language))
+        if not data:
+            return None
+        content_hash, _, cached_at = data.partition(" ")
+        return Validator(content_hash, int(cached_at), None)
+
+    @staticmethod
+    def count_validator_hit(validator: Validator) -> None:
+        """Account a request answered from a validator like a get_entry hit on the same layer."""
+        if validator.entry is not None:
+            metrics.L1_HIT.inc()
+            validator.entry.hits += 1
+            return
+        metrics.L1_MISS.inc()
+        CacheService.redis_stats["hits"] += 1
+        metrics.REDIS_HIT.inc()
+
+    @staticmethod
+    async def get_transcript(video_id: str, language: str) -> dict | None:
+        """Retrieve the transcript response payload if it is cached."""
+        entry = await CacheService.get_entry(video_id, language)
+        return entry.payload if entry else None
+
+    @staticmethod
+    async def get_many_entries(candidates: dict[str, list[str]]) -> dict[str, CachedTranscript]:
+        """
+        Look up several transcripts ({video_id: language codes, preferred first}) at once:
+        L1 first, then a single MGET over the candidate keys of the rest. Each video gets
+        the entry of its first cached code. Returns {video_id: entry} for the hits only.
+        """
+        found: dict[str, CachedTranscript] = {}
+        pending: list[str] = []
+        for video_id, codes in candidates.items():
+            cached = l1_cache.get(CacheService._build_key(video_id, codes[0]))
+            if cached is not None:
+                metrics.L1_HIT.inc()
+                cached.hits += 1
+                found[video_id] = cached
+            else:
+                pending.append(video_id)
+
+        if not pending:
+            return found
+
+        keys = {
+            video_id: [CacheService._build_key(video_id, code) for code in candidates[video_id]]
+            for video_id in pending
+        }
+        all_keys = [key for video_keys in keys.values() for key in video_keys]
+        values = dict(zip(all_keys, await rb.mget(all_keys)))
+        for video_id in pending:
+            entry = None
+            for key in keys[video_id]:
+                # Preference order decides, whichever layer holds the code
+                entry = l1_cache.get(key)
+                if entry is not None:
+                    metrics.L1_HIT.inc()
+                    break
+                metrics.L1_MISS.inc()
+                if values[key]:
+                    entry = await CacheService._load_entry(key, values[key])
+                    break
+            else:
+                CacheService.redis_stats["misses"] += 1
+                metrics.REDIS_MISS.inc()
+            if entry is not None:
+                entry.hits += 1
+                found[video_id] = entry
+        return found
 
     @staticmethod
-    async def set_transcript(video_id: str, language: str, transcript_data: dict):
-        """Save transcript in Redis with 24h TTL."""
+    async def set_transcript(
+        video_id: str, language: str, record: dict, cached_at: int | None = None
+    ) -> CachedTranscript:
+        """
+        Save a transcript record (metadata + snippets) as a compressed binary entry
+        with 24h TTL and in L1; other workers drop their stale copy.
+        The token index for /search is built here, once, and stored alongside it,
+        as is the content hash + timestamp that answers conditional requests.
+        `cached_at` keeps the age of a record that is only being moved (default: now).
+        """
         key = CacheService._build_key(video_id, language)
-        await r.set(key, json.dumps(transcript_data), ex=CACHE_EXPIRY)
+        record["cached_at"] = cached_at or int(time.time())
+        # Same snippet times as a Redis read-back, so every worker renders identical bytes
+        record["snippets"] = transcript_codec.canonical_snippets(record["snippets"])
+        record["content_hash"] = transcript_codec.content_hash(record)
+        search_index = transcript_index.build_index(record["snippets"])
+        pipe = rb.pipeline(transaction=False)
+        pipe.set(key, transcript_codec.encode(record), ex=CACHE_EXPIRY)
+        pipe.set(
+            CacheService._build_meta_key(video_id, language),
+            f"{record['content_hash']} {record['cached_at']}",
+            ex=CACHE_EXPIRY,
+        )
+        pipe.set(
+            CacheService._build_index_key(video_id, language),
+            transcript_index.encode_index(search_index),
+            ex=CACHE_EXPIRY,
+        )
+        await pipe.execute()
+        entry = CachedTranscript(record, search_index)
+        CacheService._remember(key, entry)
+        await invalidation.publish(INVALIDATION_NAMESPACE, key)
+        return entry
+
+    @staticmethod
+    async def adopt_legacy_default(video_id: str) -> CachedTranscript | None:
+        """
+        A transcript cached under the pre-catalog "default" key, moved (with its age)
+        under its language_code so default and explicit requests share it. None if absent.
+        """
+        entry = await CacheService.get_entry(video_id, "default")
+        if entry is None:
+            return None
+        record = dict(entry.record)
+        migrated = await CacheService.set_transcript(
+            video_id, record["language_code"], record, cached_at=record["cached_at"]
+        )
+        legacy_key = CacheService._build_key(video_id, "default")
+        await rb.delete(legacy_key)
+        l1_cache.invalidate(legacy_key)
+        await invalidation.publish(INVALIDATION_NAMESPACE, legacy_key)
+        logger.info("Migrated legacy default cache entry for video_id=%s to %s", video_id, record["language_code"])
+        return migrated
+
+    @staticmethod
+    async def get_search_index(video_id: str, entry: CachedTranscript) -> dict:
+        """
+        The token index for a cached transcript: from the entry, else from Redis.
+        Entries cached before indexing existed get theirs built and stored on first use.
+        """
+        if entry.search_index is not None:
+            return entry.search_index
+
+        language_code = entry.record["language_code"]
+        key = CacheService._build_index_key(video_id, language_code)
+        data = await rb.get(key)
+        search_index = None
+        if data:
+            try:
+                search_index = transcript_index.decode_index(data)
+            except (ValueError, TypeError) as e:
+                logger.error("Rebuilding unreadable search index %s: %s", key, e)
+        if search_index is None:
+            search_index = transcript_index.build_index(entry.record["snippets"])
+            ttl = int(entry.expires_at - time.time())
+            if ttl > 0:
+                await rb.set(key, transcript_index.encode_index(search_index), ex=ttl)
+        entry.search_index = search_index
+        return search_index
+
+    @staticmethod
+    async def get_encoded(content_hash: str, variant: str, encoding: str) -> bytes | None:
+        """A compressed response body stored by set_encoded: from L1, else Redis. None if absent."""
+        key = CacheService._build_encoded_key(content_hash, variant, encoding)
+        body = l1_cache.get(key)
+        if body is None:
+            body = await rb.get(key)
+            if not body:
+                CacheService.encoded_stats["misses"] += 1
+                return None
+            l1_cache.set(key, body, len(body))
+        CacheService.encoded_stats["hits"] += 1
+        return body
+
+    @staticmethod
+    async def set_encoded(entry: CachedTranscript, variant: str, encoding: str, body: bytes) -> None:
+        """
+        Store a compressed response body next to its entry, until the entry expires.
+        Keys are content-addressed (hash + representation + encoding), so they never
+        need invalidating: a refetched transcript with new content gets new keys.
+        """
+        ttl = int(entry.expires_at - time.time())
+        if ttl <= 0:
+            return
+        key = CacheService._build_encoded_key(entry.content_hash, variant, encoding)
+        await rb.set(key, body, ex=ttl)
+        l1_cache.set(key, body, len(body), min(L1_CACHE_TTL, ttl))
+        CacheService.encoded_stats["stores"] += 1
+
+    @staticmethod
+    async def get_negative(video_id: str, language: str) -> TranscriptError | None:
+        """
+        Return a fresh copy of the remembered upstream failure for this video (any
+        language) or video/language, or None. Checked after a cache miss so dead IDs
+        don't go back to YouTube.
+        """
+        keys = [CacheService._build_negative_key(video_id), CacheService._build_negative_key(video_id, language)]
+        cached = l1_cache.get(keys[0]) or l1_cache.get(keys[1])
+        if cached is None:
+            for key, data in zip(keys, await r.mget(keys)):
+                if not data:
+                    continue
+                try:
+                    cached = json.loads(data)
+                except ValueError:
+                    continue
+                ttl = min(L1_CACHE_TTL, NEGATIVE_CACHE_TTLS.get(cached["error"], 0))
+                if ttl > 0:
+                    l1_cache.set(key, cached, len(data), ttl)
+                break
+            if cached is None:
+                metrics.NEGATIVE_MISS.inc()
+                return None
+
+        error_cls = _NEGATIVE_ERRORS.get(cached["error"])
+        if error_cls is None:
+            return None
+        CacheService.negative_stats["hits"] += 1
+        metrics.NEGATIVE_HIT.inc()
+        return error_cls(cached["message"])
+
+    @staticmethod
+    async def set_negative(video_id: str, language: str, error: TranscriptError) -> bool:
+        """
+        Remember a permanent-looking failure for its class TTL. Returns False if not cacheable.
+        Unavailable/private videos are remembered for the video, not just `language`.
+        """
+        error_name = type(error).__name__
+        ttl = NEGATIVE_CACHE_TTLS.get(error_name, 0)
+        if error_name not in _NEGATIVE_ERRORS or ttl <= 0:
+            return False
+
+        key = CacheService._build_negative_key(video_id, None if error_name in _VIDEO_LEVEL_ERRORS else language)
+        value = {"error": error_name, "message": error.message}
+        data = json.dumps(value)
+        await r.set(key, data, ex=ttl)
+        l1_cache.set(key, value, len(data), min(L1_CACHE_TTL, ttl))
+        CacheService.negative_stats["stores"] += 1
+        return True
+
+    @staticmethod
+    async def invalidate(video_id: str, language: str):
+        """Remove a transcript (and any remembered failure) from Redis and from every worker's L1."""
+        keys = [
+            CacheService._build_key(video_id, language),
+            CacheService._build_negative_key(video_id, language),
+            CacheService._build_negative_key(video_id),
+        ]
+        await rb.delete(
+            *keys, CacheService._build_index_key(video_id, language), CacheService._build_meta_key(video_id, language)
+        )
+        for key in keys:
+            l1_cache.invalidate(key)
+            await invalidation.publish(INVALIDATION_NAMESPACE, key)
+
+    @staticmethod
+    def stats() -> dict:
+        """Hit/miss/eviction counters per cache layer for this worker."""
+        return {
+            "l1": l1_cache.info(),
+            "redis": dict(CacheService.redis_stats),
+            "negative": dict(CacheService.negative_stats),
+            "encoded": dict(CacheService.encoded_stats),
+        }
@@ -0,0 +1,110 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, TypeVar
+
+from requests import Session
+from requests.adapters import HTTPAdapter
+from youtube_transcript_api import YouTubeTranscriptApi
+
+from app import metrics
+from app.exceptions import UpstreamBusyError
+from app.config import (
+    FETCH_POOL_WORKERS,
+    FETCH_POOL_MAX_QUEUE,
+    FETCH_POOL_RETRY_AFTER,
+    FETCH_HTTP_POOL_SIZE,
+)
+
+T = TypeVar("T")
+
+
+class FetchPool:
+    """
+    Dedicated, bounded executor for blocking YouTube fetches.
+
+    - Each thread keeps its own YouTubeTranscriptApi with a pooled requests.Session,
+      so keep-alive connections (and consent cookies) are reused across fetches.
+      The client isn't thread-safe, hence one per thread.
+    - At most `max_workers` fetches run at once and `max_queue` more may wait;
+      beyond that `run` fails fast with UpstreamBusyError (503 + Retry-After).
+    """
+
+    def __init__(
+        self,
+        max_workers: int = FETCH_POOL_WORKERS,
+        max_queue: int = FETCH_POOL_MAX_QUEUE,
+        retry_after: int = FETCH_POOL_RETRY_AFTER,
+        http_pool_size: int = FETCH_HTTP_POOL_SIZE,
+    ):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        self.http_pool_size = http_pool_size
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="yt-fetch")
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._pending = 0  # queued + running (event loop side)
+        self._in_flight = 0  # running (thread side)
+        self.stats = {"submitted": 0, "rejected": 0}
+
+    def _client(self) -> YouTubeTranscriptApi:
+        client = getattr(self._local, "client", None)
+        if client is None:
+            session = Session()
+            adapter = HTTPAdapter(pool_connections=self.http_pool_size, pool_maxsize=self.http_pool_size)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            client = YouTubeTranscriptApi(http_client=session)
+            self._local.client = client
+        return client
+
+    def _publish_gauges(self) -> None:
+        in_flight = self._in_flight
+        metrics.FETCH_POOL_IN_FLIGHT.set(in_flight)
+        metrics.FETCH_POOL_QUEUED.set(max(0, self._pending - in_flight))
+
+    def _call(self, fn: Callable[[YouTubeTranscriptApi], T]) -> T:
+        with self._lock:
+            self._in_flight += 1
+        self._publish_gauges()
+        try:
+            return fn(self._client())
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+            self._publish_gauges()
+
+    async def run(self, fn: Callable[[YouTubeTranscriptApi], T]) -> T:
+        """Run `fn(client)` on the pool, or raise UpstreamBusyError if the queue is full."""
+        if self._pending >= self.max_workers + self.max_queue:
+            self.stats["rejected"] += 1
+            metrics.FETCH_POOL_REJECTED.inc()
+            raise UpstreamBusyError(retry_after=self.retry_after)
+
+        self._pending += 1
+        self.stats["submitted"] += 1
+        self._publish_gauges()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, self._call, fn)
+        finally:
+            self._pending -= 1
+            self._publish_gauges()
+
+    def gauges(self) -> dict:
+        in_flight = self._in_flight
+        return {
+            **self.stats,
+            "in_flight": in_flight,
+            "queue_depth": max(0, self._pending - in_flight),
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+        }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Shared per-process pool for all upstream transcript fetches
+fetch_pool = FetchPool()
@@ -0,0 +1,85 @@
+import asyncio
+import json
+import uuid
+from typing import Callable, Dict, Optional
+
+from app.limiting.redis_client import r
+from app.logger import logger
+
+INVALIDATION_CHANNEL = "cache:invalidate"
+
+# Lets a worker ignore its own broadcasts (its local state is already up to date)
+WORKER_ID = uuid.uuid4().hex
+
+# namespace -> callback(key) that drops the key from a worker-local cache
+_handlers: Dict[str, Callable[[str], None]] = {}
+_listener_task: Optional[asyncio.Task] = None
+
+
+def register(namespace: str, handler: Callable[[str], None]) -> None:
+    """Register a worker-local cache to be invalidated by broadcasts for `namespace`."""
+    _handlers[namespace] = handler
+
+
+async def publish(namespace: str, key: str) -> None:
+    """Tell every other worker to drop `key` from its local `namespace` cache."""
+    message = json.dumps({"ns": namespace, "key": key, "origin": WORKER_ID})
+    try:
+        await r.publish(INVALIDATION_CHANNEL, message)
+    except Exception as e:
+        # Local caches still expire via their TTL
+        logger.error("Failed to publish invalidation for %s:%s: %s", namespace, key, e)
+
+
+def _dispatch(raw: str) -> None:
+    try:
+        message = json.loads(raw)
+    except ValueError:
+        return
+    if message.get("origin") == WORKER_ID:
+        return
+    handler = _handlers.get(message.get("ns"))
+    if handler:
+        handler(message.get("key"))
+
+
+async def _listen() -> None:
+    backoff = 1
+    while True:
+        pubsub = r.pubsub(ignore_subscribe_messages=True)
+        try:
+            await pubsub.subscribe(INVALIDATION_CHANNEL)
+            logger.info("Subscribed to cache invalidation channel '%s'", INVALIDATION_CHANNEL)
+            backoff = 1
+            async for message in pubsub.listen():
+                if message and message.get("type") == "message":
+                    _dispatch(message["data"])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error("Cache invalidation listener error: %s. Reconnecting in %ss", e, backoff)
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 30)
+        finally:
+            try:
+                await pubsub.aclose()
+            except Exception:
+                pass
+
+
+def start_listener() -> None:
+    """Start the background subscriber (call once per worker on startup)."""
+    global _listener_task
+    if _listener_task is None or _listener_task.done():
+        _listener_task = asyncio.ensure_future(_listen())
+
+
+async def stop_listener() -> None:
+    global _listener_task
+    if _listener_task is not None:
+        _listener_task.cancel()
+        try:
+            await _listener_task
+        except asyncio.CancelledError:
+            pass
+        _listener_task = None
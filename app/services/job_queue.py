@@ -0,0 +1,146 @@
+import time
+import uuid
+from typing import Optional
+
+from app.limiting.redis_client import r
+from app.config import JOB_TTL, JOB_VISIBILITY_TIMEOUT
+from app.logger import logger
+
+QUEUE_KEY = "jobs:queue"  # list of job ids; LPUSH to enqueue, RPOP to reserve (FIFO)
+INFLIGHT_KEY = "jobs:inflight"  # zset of reserved job ids scored by visibility deadline
+
+# Move the oldest queued job into the in-flight set with a visibility deadline.
+# KEYS = queue, inflight; ARGV = deadline (epoch seconds). Returns the job id or nil.
+RESERVE_LUA = """
+local job_id = redis.call("RPOP", KEYS[1])
+if job_id then
+    redis.call("ZADD", KEYS[2], ARGV[1], job_id)
+end
+return job_id
+"""
+
+# Put in-flight jobs whose deadline has passed back at the head of the queue
+# (their worker died, stalled, or asked for a delayed retry).
+# KEYS = queue, inflight; ARGV = now, max jobs. Returns how many were re-queued.
+REQUEUE_EXPIRED_LUA = """
+local expired = redis.call("ZRANGEBYSCORE", KEYS[2], "-inf", ARGV[1], "LIMIT", 0, tonumber(ARGV[2]))
+for _, job_id in ipairs(expired) do
+    redis.call("ZREM", KEYS[2], job_id)
+    redis.call("RPUSH", KEYS[1], job_id)
+end
+return #expired
+"""
+
+_reserve_script = r.register_script(RESERVE_LUA)
+_requeue_script = r.register_script(REQUEUE_EXPIRED_LUA)
+
+
+def _job_key(job_id: str) -> str:
+    return f"job:{job_id}"
+
+
+async def create_job(
+    video_id: str, language: Optional[str], user_id: int, webhook_url: Optional[str] = None
+) -> dict:
+    """Store a new job (status "queued") and push it onto the queue."""
+    job_id = uuid.uuid4().hex
+    now = str(int(time.time()))
+    job = {
+        "id": job_id,
+        "status": "queued",
+        "video_id": video_id,
+        "language": language or "",
+        "user_id": str(user_id),
+        "webhook_url": webhook_url or "",
+        "attempts": "0",
+        "created_at": now,
+        "updated_at": now,
+    }
+    pipe = r.pipeline(transaction=True)
+    pipe.hset(_job_key(job_id), mapping=job)
+    pipe.expire(_job_key(job_id), JOB_TTL)
+    pipe.lpush(QUEUE_KEY, job_id)
+    await pipe.execute()
+    return job
+
+
+async def get_job(job_id: str) -> Optional[dict]:
+    job = await r.hgetall(_job_key(job_id))
+    return job or None
+
+
+async def reserve(visibility: int = JOB_VISIBILITY_TIMEOUT) -> Optional[dict]:
+    """
+    Take the next job, hiding it from other workers for `visibility` seconds.
+    It must be acked (succeed/fail/retry) or extended before then, or it is re-queued.
+    Returns the job (status "running", attempts incremented) or None if the queue is empty.
+    """
+    while True:
+        job_id = await _reserve_script(keys=[QUEUE_KEY, INFLIGHT_KEY], args=[time.time() + visibility])
+        if job_id is None:
+            return None
+
+        key = _job_key(job_id)
+        if not await r.exists(key):
+            # Job record expired while queued: nothing to do
+            await r.zrem(INFLIGHT_KEY, job_id)
+            logger.warning("Dropping job %s: record expired", job_id)
+            continue
+
+        pipe = r.pipeline(transaction=True)
+        pipe.hincrby(key, "attempts", 1)
+        pipe.hset(key, mapping={"status": "running", "updated_at": str(int(time.time()))})
+        pipe.hgetall(key)
+        _, _, job = await pipe.execute()
+        return job
+
+
+async def extend(job_id: str, visibility: int = JOB_VISIBILITY_TIMEOUT) -> None:
+    """Push back a reserved job's visibility deadline (heartbeat for long jobs)."""
+    await r.zadd(INFLIGHT_KEY, {job_id: time.time() + visibility}, xx=True)
+
+
+async def _finish(job_id: str, fields: dict) -> None:
+    pipe = r.pipeline(transaction=True)
+    pipe.hset(_job_key(job_id), mapping={**fields, "updated_at": str(int(time.time()))})
+    pipe.expire(_job_key(job_id), JOB_TTL)
+    pipe.zrem(INFLIGHT_KEY, job_id)
+    await pipe.execute()
+
+
+async def succeed(job_id: str, language_code: str) -> None:
+    """Ack a job; the transcript itself stays in the transcript cache under `language_code`."""
+    await _finish(job_id, {"status": "succeeded", "language_code": language_code})
+
+
+async def fail(job_id: str, code: int, message: str) -> None:
+    """Ack a job that won't be retried."""
+    await _finish(job_id, {"status": "failed", "error_code": str(code), "error_message": message})
+
+
+async def retry(job_id: str, delay: float) -> None:
+    """
+    Nack a job: it stays in the in-flight set until `delay` seconds from now, then
+    the next requeue_expired pass puts it back on the queue.
+    """
+    pipe = r.pipeline(transaction=True)
+    pipe.hset(_job_key(job_id), mapping={"status": "queued", "updated_at": str(int(time.time()))})
+    pipe.zadd(INFLIGHT_KEY, {job_id: time.time() + delay}, xx=True)
+    await pipe.execute()
+
+
+async def set_fields(job_id: str, **fields: str) -> None:
+    await r.hset(_job_key(job_id), mapping=fields)
+
+
+async def requeue_expired(limit: int = 100) -> int:
+    """Re-queue jobs whose visibility deadline has passed. Safe to run from every worker."""
+    return int(await _requeue_script(keys=[QUEUE_KEY, INFLIGHT_KEY], args=[time.time(), limit]))
+
+
+async def depth() -> dict:
+    pipe = r.pipeline(transaction=False)
+    pipe.llen(QUEUE_KEY)
+    pipe.zcard(INFLIGHT_KEY)
+    queued, in_flight = await pipe.execute()
+    return {"queued": queued, "in_flight": in_flight}
@@ -0,0 +1,70 @@
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+
+class LocalCache:
+    """
+    Bounded in-process LRU cache with a per-entry TTL.
+    Capacity is measured in bytes (as reported by the caller), not entry count,
+    so a handful of multi-hour transcripts can't crowd out memory.
+    """
+
+    def __init__(self, max_bytes: int, ttl_seconds: int):
+        self.max_bytes = max_bytes
+        self.ttl = ttl_seconds
+        self._store: "OrderedDict[str, Tuple[float, int, Any]]" = OrderedDict()  # key -> (expires_at, size, value)
+        self._bytes = 0
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._store.get(key)
+        if entry is None:
+            self.stats["misses"] += 1
+            return None
+
+        expires_at, size, value = entry
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            self.stats["expirations"] += 1
+            self.stats["misses"] += 1
+            return None
+
+        self._store.move_to_end(key)
+        self.stats["hits"] += 1
+        return value
+
+    def set(self, key: str, value: Any, size: int, ttl_seconds: Optional[int] = None) -> None:
+        """Store `value` (costing `size` bytes); `ttl_seconds` overrides the default TTL."""
+        if key in self._store:
+            self._remove(key)
+
+        # Entries larger than the whole cache are simply not kept locally
+        if size > self.max_bytes:
+            return
+
+        ttl = self.ttl if ttl_seconds is None else ttl_seconds
+        self._store[key] = (time.monotonic() + ttl, size, value)
+        self._bytes += size
+
+        # Evict least recently used entries until we're back under budget
+        while self._bytes > self.max_bytes:
+            oldest = next(iter(self._store))
+            self._remove(oldest)
+            self.stats["evictions"] += 1
+
+    def invalidate(self, key: str) -> None:
+        if key in self._store:
+            self._remove(key)
+            self.stats["invalidations"] += 1
+
+    def clear(self) -> None:
+        self._store.clear()
+        self._bytes = 0
+
+    def info(self) -> Dict[str, int]:
+        return {**self.stats, "entries": len(self._store), "bytes": self._bytes, "max_bytes": self.max_bytes}
+
+    def _remove(self, key: str) -> None:
+        _, size, _ = self._store.pop(key)
+        self._bytes -= size
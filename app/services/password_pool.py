@@ -0,0 +1,89 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+
+from fastapi import HTTPException
+
+from app import auth
+from app.config import (
+    PASSWORD_POOL_WORKERS,
+    PASSWORD_POOL_MAX_QUEUE,
+    PASSWORD_POOL_RETRY_AFTER,
+)
+
+
+class PasswordPool:
+    """
+    Dedicated, bounded process pool for bcrypt.
+
+    - Hashing runs in separate processes, so a burst of logins neither blocks the
+      event loop nor holds this worker's GIL while transcript requests wait.
+    - At most `max_workers` hashes run at once and `max_queue` more may wait;
+      beyond that calls fail fast with 503 + Retry-After.
+    - Processes come from a fork server (not forked from this multi-threaded
+      process) and are started on first use.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = PASSWORD_POOL_WORKERS,
+        max_queue: int = PASSWORD_POOL_MAX_QUEUE,
+        retry_after: int = PASSWORD_POOL_RETRY_AFTER,
+    ):
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pending = 0  # queued + running
+        self.stats = {"submitted": 0, "rejected": 0}
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            if "forkserver" in multiprocessing.get_all_start_methods():
+                context = multiprocessing.get_context("forkserver")
+                context.set_forkserver_preload(["app.auth"])  # children start with passlib/bcrypt loaded
+            else:
+                context = multiprocessing.get_context("spawn")
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context)
+        return self._executor
+
+    async def _run(self, fn, *args):
+        if self._pending >= self.max_workers + self.max_queue:
+            self.stats["rejected"] += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Too many sign-ins in progress, try again shortly",
+                headers={"Retry-After": str(self.retry_after)},
+            )
+
+        self._pending += 1
+        self.stats["submitted"] += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), fn, *args)
+        finally:
+            self._pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(auth.hash_password, password)
+
+    async def verify_and_update(self, password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+        return await self._run(auth.verify_and_update, password, hashed)
+
+    def gauges(self) -> dict:
+        return {
+            **self.stats,
+            "pending": self._pending,
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# Shared per-process pool for register/login
+password_pool = PasswordPool()
@@ -0,0 +1,124 @@
+import asyncio
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app import metrics
+from app.limiting.redis_client import r
+from app.config import (
+    SINGLEFLIGHT_LOCK_TTL_MS,
+    SINGLEFLIGHT_POLL_INTERVAL,
+    SINGLEFLIGHT_WAIT_TIMEOUT,
+)
+from app.logger import logger
+
+# Delete the lock only if we still own it (another worker may have taken it over after expiry)
+_RELEASE_LUA = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls for the same key into a single execution.
+
+    - In-process: callers for a key already in flight await the same task.
+    - Cross-worker: a Redis lock (SET NX PX) elects one leader; the other
+      workers poll `load` until the leader's result shows up in the cache.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        lock_ttl_ms: int = SINGLEFLIGHT_LOCK_TTL_MS,
+        poll_interval: float = SINGLEFLIGHT_POLL_INTERVAL,
+        wait_timeout: float = SINGLEFLIGHT_WAIT_TIMEOUT,
+    ):
+        self.namespace = namespace
+        self.lock_ttl_ms = lock_ttl_ms
+        self.poll_interval = poll_interval
+        self.wait_timeout = wait_timeout
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._release_script = r.register_script(_RELEASE_LUA)
+        self.stats = {"executed": 0, "coalesced_local": 0, "coalesced_remote": 0}
+        self._counters = {outcome: metrics.SINGLEFLIGHT_CALLS.labels(namespace, outcome) for outcome in self.stats}
+
+    def _count(self, outcome: str) -> None:
+        self.stats[outcome] += 1
+        self._counters[outcome].inc()
+
+    def _lock_key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    async def do(
+        self,
+        key: str,
+        fn: Callable[[], Awaitable[Any]],
+        load: Callable[[], Awaitable[Optional[Any]]],
+    ) -> Any:
+        """
+        Run `fn` once per key across all concurrent callers and workers.
+        `load` reads the shared result (e.g. from cache) and returns None if absent.
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._run(key, fn, load))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t, k=key: self._forget(k, t))
+        else:
+            self._count("coalesced_local")
+
+        # Shield so one caller disconnecting doesn't cancel the fetch for everyone else
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+
+    async def _run(self, key, fn, load):
+        lock_key = self._lock_key(key)
+        token = uuid.uuid4().hex
+        loop = asyncio.get_event_loop()
+        deadline = loop.time() + self.wait_timeout
+        waited = False
+
+        while True:
+            if await r.set(lock_key, token, px=self.lock_ttl_ms, nx=True):
+                try:
+                    # Another worker may have filled the cache just before we got the lock
+                    if waited:
+                        result = await load()
+                        if result is not None:
+                            return result
+                    self._count("executed")
+                    return await fn()
+                finally:
+                    await self._release(lock_key, token)
+
+            if not waited:
+                waited = True
+                self._count("coalesced_remote")
+                logger.info("Single-flight: waiting on another worker for key=%s", key)
+
+            # Another worker is fetching: wait for its result to land
+            while True:
+                await asyncio.sleep(self.poll_interval)
+                result = await load()
+                if result is not None:
+                    return result
+                if not await r.exists(lock_key):
+                    # Leader finished without a result (error) or died: try to take over
+                    break
+                if loop.time() >= deadline:
+                    logger.warning("Single-flight: timed out waiting for key=%s, fetching directly", key)
+                    self._count("executed")
+                    return await fn()
+
+    async def _release(self, lock_key: str, token: str) -> None:
+        try:
+            await self._release_script(keys=[lock_key], args=[token])
+        except Exception as e:
+            # The lock still expires on its own via PX
+            logger.error("Single-flight: failed to release lock %s: %s", lock_key, e)
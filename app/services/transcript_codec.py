@@ -0,0 +1,113 @@
+import hashlib
+import json
+import re
+import zlib
+from typing import Any, Dict, List, Tuple
+
+import msgpack
+
+# Binary record layout: MAGIC + version byte + zlib(msgpack(columnar record))
+MAGIC = b"YTC"
+FORMAT_VERSION = 1
+_HEADER = MAGIC + bytes([FORMAT_VERSION])
+COMPRESSION_LEVEL = 6
+
+Snippet = Tuple[float, float, str]  # (start, duration, text) in seconds
+
+_SRT_BLOCK = re.compile(
+    r"\d+\n(\d+):(\d+):(\d+),(\d+) --> (\d+):(\d+):(\d+),(\d+)\n(.*?)(?:\n\n|\n?\Z)",
+    re.S,
+)
+
+
+class CacheFormatError(ValueError):
+    """Cached bytes are neither a known binary record nor a legacy JSON entry."""
+
+
+def encode(record: Dict[str, Any]) -> bytes:
+    """
+    Serialize a transcript record.
+    Snippets are stored once, column-wise, with times as integer milliseconds;
+    the cleaned text and SRT are derived on read.
+    """
+    snippets = record["snippets"]
+    body = {k: v for k, v in record.items() if k != "snippets"}
+    body["starts"] = [round(start * 1000) for start, _, _ in snippets]
+    body["durations"] = [round(duration * 1000) for _, duration, _ in snippets]
+    body["texts"] = [text for _, _, text in snippets]
+    packed = msgpack.packb(body, use_bin_type=True)
+    return _HEADER + zlib.compress(packed, COMPRESSION_LEVEL)
+
+
+def canonical_snippets(snippets: List[Snippet]) -> List[Snippet]:
+    """
+    Snippets with times rounded to the millisecond, exactly as `decode` returns them,
+    so a freshly fetched record renders the same bytes as one read back from Redis.
+    """
+    return [(round(start * 1000) / 1000, round(duration * 1000) / 1000, text) for start, duration, text in snippets]
+
+
+def content_hash(record: Dict[str, Any]) -> str:
+    """
+    Hash of everything responses are rendered from (metadata + millisecond snippets),
+    independent of `cached_at`: a refetch of unchanged content keeps its hash.
+    """
+    snippets = record["snippets"]
+    packed = msgpack.packb(
+        [
+            record["video_id"],
+            record["language"],
+            record["language_code"],
+            [round(start * 1000) for start, _, _ in snippets],
+            [round(duration * 1000) for _, duration, _ in snippets],
+            [text for _, _, text in snippets],
+        ],
+        use_bin_type=True,
+    )
+    return hashlib.blake2b(packed, digest_size=16).hexdigest()
+
+
+def decode(raw: bytes) -> Dict[str, Any]:
+    """
+    Deserialize a cached transcript into a record with a `snippets` list.
+    Legacy JSON entries (plain response payloads) are converted on the fly.
+    """
+    if raw[:3] == MAGIC:
+        version = raw[3]
+        if version != FORMAT_VERSION:
+            raise CacheFormatError(f"Unsupported cache format version {version}")
+        body = msgpack.unpackb(zlib.decompress(raw[4:]), raw=False)
+        starts = body.pop("starts")
+        durations = body.pop("durations")
+        texts = body.pop("texts")
+        body["snippets"] = [
+            (start / 1000, duration / 1000, text)
+            for start, duration, text in zip(starts, durations, texts)
+        ]
+        return body
+
+    if raw[:1] == b"{":
+        return _decode_legacy_json(raw)
+
+    raise CacheFormatError("Unrecognized cache entry")
+
+
+def _decode_legacy_json(raw: bytes) -> Dict[str, Any]:
+    """Rebuild snippets from the SRT string of a pre-v1 JSON cache entry."""
+    payload = json.loads(raw)
+    return {
+        "video_id": payload["video_id"],
+        "language": payload["language"],
+        "language_code": payload["language_code"],
+        "snippets": parse_srt(payload.get("transcript_with_timestamps", "")),
+    }
+
+
+def parse_srt(srt: str) -> List[Snippet]:
+    snippets = []
+    for m in _SRT_BLOCK.finditer(srt):
+        h1, m1, s1, ms1, h2, m2, s2, ms2 = (int(g) for g in m.groups()[:8])
+        start_ms = ((h1 * 60 + m1) * 60 + s1) * 1000 + ms1
+        end_ms = ((h2 * 60 + m2) * 60 + s2) * 1000 + ms2
+        snippets.append((start_ms / 1000, (end_ms - start_ms) / 1000, m.group(9)))
+    return snippets
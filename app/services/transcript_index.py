@@ -0,0 +1,68 @@
+import re
+import zlib
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, Sequence, Tuple
+
+import msgpack
+
+Snippet = Tuple[float, float, str]  # (start, duration, text) in seconds
+SearchIndex = Dict[str, List[int]]  # token -> ascending snippet positions
+
+_TOKEN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens (Unicode-aware, so non-English transcripts index too)."""
+    return _TOKEN.findall(text.lower())
+
+
+def build_index(snippets: Sequence[Snippet]) -> SearchIndex:
+    """Inverted index over snippet texts: each token maps to the snippets containing it."""
+    index: SearchIndex = {}
+    for position, (_, _, text) in enumerate(snippets):
+        for token in set(tokenize(text)):
+            index.setdefault(token, []).append(position)
+    return index
+
+
+def encode_index(index: SearchIndex) -> bytes:
+    return zlib.compress(msgpack.packb(index, use_bin_type=True), 6)
+
+
+def decode_index(raw: bytes) -> SearchIndex:
+    try:
+        return msgpack.unpackb(zlib.decompress(raw), raw=False)
+    except zlib.error as e:
+        raise ValueError(f"corrupt search index: {e}") from e
+
+
+def search(index: SearchIndex, query: str) -> List[int]:
+    """Positions of snippets containing every token of `query` (empty if it has no tokens)."""
+    tokens = set(tokenize(query))
+    if not tokens:
+        return []
+    # Intersect starting from the rarest token so the candidate set stays small
+    postings = sorted((index.get(token, []) for token in tokens), key=len)
+    matches = set(postings[0])
+    for posting in postings[1:]:
+        if not matches:
+            break
+        matches.intersection_update(posting)
+    return sorted(matches)
+
+
+def slice_snippets(
+    starts: Sequence[float], max_ends: Sequence[float], snippets: Sequence[Snippet], start: float, end: float
+) -> List[Snippet]:
+    """
+    The snippets shown between `start` and `end` seconds: those starting inside the
+    window, plus every earlier one still on screen at `start` (auto-captions overlap).
+    `starts` are the ascending snippet start times, `max_ends` the running maximum
+    of snippet end times (so it ascends too).
+    """
+    first = bisect_left(starts, start)
+    hi = bisect_left(starts, end, first)
+    # Nothing before `lo` ends after `start`; between `lo` and `first` some may not either
+    lo = bisect_right(max_ends, start, 0, first)
+    carried = [snippet for snippet in snippets[lo:first] if snippet[0] + snippet[1] > start]
+    return carried + list(snippets[first:hi])
@@ -1,81 +1,488 @@
 import asyncio
-from typing import Optional
-from app.services.cache_service import CacheService
-from youtube_transcript_api import YouTubeTranscriptApi
-from app.utils import format_transcript, format_timestamp
+import time
+from typing import Dict, List, Optional, Tuple, Union
+from app import compression, metrics
+from app.services.cache_service import CacheService, CachedTranscript, Validator
+from app.services.singleflight import SingleFlight
+from app.services.fetch_pool import fetch_pool
+from app.services import archive, transcript_index
+from app.services.archive import archive_writer
+from app.services.invalidation import WORKER_ID
+from youtube_transcript_api import (
+    YouTubeTranscriptApi,
+    AgeRestricted,
+    InvalidVideoId,
+    NoTranscriptFound,
+    TranscriptsDisabled,
+    VideoUnavailable,
+    VideoUnplayable,
+)
+from app.limiting.redis_client import r
+from app.config import (
+    BATCH_FETCH_CONCURRENCY,
+    CACHE_SOFT_TTL,
+    REFRESH_AHEAD_SECONDS,
+    REFRESH_RETRY_SECONDS,
+    TRANSCRIPT_DEFAULT_LANGUAGES,
+)
 from app.exceptions import (
+    TranscriptError,
     VideoUnavailableError,
     VideoPrivateError,
     LanguageNotSupportedError,
     TranscriptFetchError,
+    UpstreamBusyError,
+)
+from app.logger import logger, sample_cache_hit  # make sure this is imported
+from app.renderer import FORMATS
+from app.responses import encode_success
+
+LANGUAGE_NOT_AVAILABLE = "Transcript not available in requested language"
+
+# Coalesces concurrent cache misses so only one upstream fetch runs per video/language
+transcript_flight = SingleFlight("lock:transcript")
+# One compression per transcript/representation/encoding, however many requests want it
+encode_flight = SingleFlight("lock:transcript-encode")
+
+# Background refreshes of stale/hot entries (strong refs so tasks aren't garbage collected)
+_refresh_tasks: set = set()
+refresh_stats = {"scheduled": 0, "refreshed": 0, "skipped": 0, "failed": 0}
+
+# Upstream exception types -> API errors; anything else becomes a TranscriptFetchError
+_UPSTREAM_ERRORS = (
+    ((VideoUnavailable, InvalidVideoId), VideoUnavailableError, "Video unavailable or deleted"),
+    ((TranscriptsDisabled, VideoUnplayable, AgeRestricted), VideoPrivateError, "Transcript disabled or video private"),
+    ((NoTranscriptFound,), LanguageNotSupportedError, LANGUAGE_NOT_AVAILABLE),
 )
-from app.logger import logger  # make sure this is imported
 
 async def get_transcript(video_id: str, language: Optional[str] = None) -> dict:
     """
     Async transcript fetcher with Redis caching and detailed logging.
+    Concurrent misses for the same video/language share a single upstream fetch.
+    """
+    entry = await _get_entry(video_id, language)
+    return entry.payload
+
+
+async def get_transcript_entry(video_id: str, language: Optional[str] = None) -> CachedTranscript:
+    """
+    Same lookup as `get_transcript`, but returns the cache entry: its `body` is the
+    encoded success envelope ({"status", "code", "data"}), ready to send, and its
+    `content_hash`/`cached_at` the validators for ETag/Last-Modified.
+    """
+    return await _get_entry(video_id, language)
+
+
+async def get_transcript_validator(video_id: str, language: Optional[str] = None) -> Optional[Validator]:
+    """
+    Validator (content_hash, cached_at) of the transcript a request would get, without
+    loading it, or None if that takes the normal path: not cached, no such language,
+    stale (so the full lookup schedules the refresh), or due for refresh-ahead soon and
+    not in this worker's L1 (the full lookup loads it, so its hits count from then on).
+    Requests answered from it must call record_validator_hit.
+    """
+    try:
+        validator = await _lookup(video_id, language, CacheService.get_validator)
+    except LanguageNotSupportedError:
+        return None
+    if validator is None:
+        return None
+    fresh_until = validator.cached_at + CACHE_SOFT_TTL
+    if validator.entry is None:
+        fresh_until -= REFRESH_AHEAD_SECONDS
+    if time.time() >= fresh_until:
+        return None
+    return validator
+
+
+def record_validator_hit(video_id: str, validator: Validator) -> None:
+    """A request was answered from `validator`: count the hit and refresh a hot entry ahead of time."""
+    CacheService.count_validator_hit(validator)
+    entry = validator.entry
+    if entry is not None and entry.claim_refresh():
+        _schedule_refresh(video_id, entry.record["language_code"])
+
+
+async def get_transcript_encoded(
+    video_id: str, language: Optional[str], variant: str, encoding: str
+) -> Tuple[bytes, str, int]:
+    """
+    A representation of the transcript (`variant`: "" for the full JSON envelope, or a
+    format name) compressed with `encoding`, plus its (content_hash, cached_at).
+    Each version is compressed once and stored in the cache; later hits (any worker)
+    get the stored bytes back, found via the validator without loading the entry.
+    """
+    validator = await get_transcript_validator(video_id, language)
+    if validator is not None:
+        body = await CacheService.get_encoded(validator.content_hash, variant, encoding)
+        if body is not None:
+            record_validator_hit(video_id, validator)
+            return body, validator.content_hash, validator.cached_at
+
+    entry = await _get_entry(video_id, language)
+    content_hash = entry.content_hash
+    body = await encode_flight.do(
+        CacheService._build_encoded_key(content_hash, variant, encoding),
+        lambda: _encode_and_cache(entry, variant, encoding),
+        lambda: CacheService.get_encoded(content_hash, variant, encoding),
+    )
+    return body, content_hash, entry.record["cached_at"]
+
+
+def _render_variant(entry: CachedTranscript, variant: str) -> bytes:
+    """The uncompressed body of a representation, byte for byte what the identity response sends."""
+    if not variant:
+        return entry.body
+    render = FORMATS[variant][0]
+    if variant == "json":
+        return encode_success(render(entry.record))
+    return render(entry.record).encode()
+
+
+async def _encode_and_cache(entry: CachedTranscript, variant: str, encoding: str) -> bytes:
+    # Rendering + compressing a long transcript takes tens of ms: keep it off the event loop
+    body = await asyncio.to_thread(
+        lambda: compression.compress(_render_variant(entry, variant), encoding)
+    )
+    await CacheService.set_encoded(entry, variant, encoding, body)
+    return body
+
+
+async def get_stored_transcript(video_id: str, language_code: str) -> Optional[dict]:
+    """
+    Payload of a transcript that was fetched before, from the cache or the archive
+    (restored into the cache), or None. Never goes upstream: for read paths that
+    aren't charged, such as polling a finished job.
+    """
+    entry = await CacheService.get_entry(video_id, language_code)
+    if entry is None:
+        record = await archive.load(video_id, [language_code])
+        if record is None:
+            return None
+        entry = await CacheService.set_transcript(video_id, record["language_code"], record)
+    return entry.payload
+
+
+async def get_transcript_record(video_id: str, language: Optional[str] = None) -> dict:
+    """
+    Same lookup as `get_transcript`, but returns the raw record
+    (metadata + (start, duration, text) snippets) without deriving text/SRT.
+    Used by streaming responses.
+    """
+    entry = await _get_entry(video_id, language)
+    return entry.record
+
+
+async def get_transcript_slice(
+    video_id: str, language: Optional[str], start: float, end: float
+) -> dict:
+    """
+    The record restricted to the snippets on screen between `start` and `end` seconds.
+    Binary search over the entry's start times; nothing outside the window is rendered.
+    """
+    entry = await _get_entry(video_id, language)
+    record = entry.record
+    snippets = transcript_index.slice_snippets(entry.starts, entry.max_ends, record["snippets"], start, end)
+    return {**record, "snippets": snippets}
+
+
+async def search_transcript(
+    video_id: str, language: Optional[str], query: str, limit: int
+) -> dict:
+    """Snippets containing every word of `query`, in time order, via the cached token index."""
+    entry = await _get_entry(video_id, language)
+    search_index = await CacheService.get_search_index(video_id, entry)
+    positions = transcript_index.search(search_index, query)
+    snippets = entry.record["snippets"]
+    return {
+        "video_id": video_id,
+        "language": entry.record["language"],
+        "language_code": entry.record["language_code"],
+        "query": query,
+        "total": len(positions),
+        "matches": [
+            {"index": i, "start": snippets[i][0], "duration": snippets[i][1], "text": snippets[i][2]}
+            for i in positions[:limit]
+        ],
+    }
+
+
+async def refetch_transcript(video_id: str, language_code: str) -> CachedTranscript:
+    """Fetch from YouTube regardless of what is cached, then update the cache and the archive."""
+    return await _fetch_and_cache(video_id, language_code)
+
+
+def _build_catalog(video_id: str, transcript_list) -> dict:
+    """Cacheable summary of a TranscriptList: language code -> name, manual and generated."""
+    catalog = {"video_id": video_id, "manual": {}, "generated": {}}
+    for transcript in transcript_list:
+        kind = "generated" if transcript.is_generated else "manual"
+        catalog[kind][transcript.language_code] = transcript.language
+    return catalog
+
+
+def _resolve_language(catalog: dict, language: Optional[str]) -> Optional[str]:
     """
+    Canonical language_code for a request (None = default languages), or None if the
+    video has no such transcript. Same choice as YouTubeTranscriptApi.fetch: the first
+    requested code that exists, manual tracks winning over generated ones.
+    """
+    for code in ([language] if language else TRANSCRIPT_DEFAULT_LANGUAGES):
+        if code in catalog["manual"] or code in catalog["generated"]:
+            return code
+    return None
+
+
+async def _lookup(video_id: str, language: Optional[str], get=CacheService.get_entry):
+    """
+    Cached transcript for a request, resolved through the video's cached catalog.
+    Returns None if the transcript isn't cached; raises LanguageNotSupportedError
+    if the catalog says the language doesn't exist. `get(video_id, language_code)`
+    does the per-code lookup (the entry by default, or just its validator).
+    """
+    catalog = await CacheService.get_catalog(video_id)
+    if catalog is None:
+        # Catalog expired (it lives shorter than transcripts) or the entry came from
+        # the archive: try the requested/default codes directly
+        for code in ([language] if language else TRANSCRIPT_DEFAULT_LANGUAGES):
+            found = await get(video_id, code)
+            if found is not None:
+                return found
+        if language is None:
+            # Entries cached before catalogs still live under "default": move them over
+            legacy = await CacheService.adopt_legacy_default(video_id)
+            if legacy is not None:
+                return await get(video_id, legacy.record["language_code"])
+        return None
+    language_code = _resolve_language(catalog, language)
+    if language_code is None:
+        raise LanguageNotSupportedError(LANGUAGE_NOT_AVAILABLE)
+    return await get(video_id, language_code)
+
+
+async def _get_entry(video_id: str, language: Optional[str]) -> CachedTranscript:
     cache_key_lang = language or "default"
-    logger.info(f"Transcript request received: video_id={video_id}, language={cache_key_lang}")
+    logger.debug("Transcript request received: video_id=%s, language=%s", video_id, cache_key_lang)
 
-    # 1. Try cache first
-    cached = await CacheService.get_transcript(video_id, cache_key_lang)
+    # 1. Try cache first ("default" and explicit languages share one entry per language_code)
+    cached = await _lookup(video_id, language)
     if cached:
-        logger.info(
-            f"Cache HIT: transcript found for video_id={video_id}, language={cache_key_lang}"
-        )
+        language_code = cached.record["language_code"]
+        if sample_cache_hit():
+            logger.info(
+                "Cache HIT: transcript found for video_id=%s, language=%s -> %s%s",
+                video_id, cache_key_lang, language_code, " (stale)" if cached.is_stale() else "",
+            )
+        if cached.claim_refresh():
+            _schedule_refresh(video_id, language_code)
         return cached
 
     logger.info(
-        f"Cache MISS: no cached transcript for video_id={video_id}, "
-        f"language={cache_key_lang}. Fetching from YouTube API..."
+        "Cache MISS: no cached transcript for video_id=%s, language=%s. Fetching from YouTube API...",
+        video_id, cache_key_lang,
+    )
+
+    return await _fetch_coalesced(video_id, language)
+
+
+async def get_transcripts_batch(
+    video_ids: List[str],
+    language: Optional[str] = None,
+    concurrency: int = BATCH_FETCH_CONCURRENCY,
+) -> Dict[str, Union[dict, TranscriptError]]:
+    """
+    Fetch many transcripts at once.
+    Catalogs and cache hits each come from a single MGET; misses are fetched
+    concurrently, at most `concurrency` at a time.
+    Returns {video_id: payload or TranscriptError}.
+    """
+    cache_key_lang = language or "default"
+    results: Dict[str, Union[dict, TranscriptError]] = {}
+
+    catalogs = await CacheService.get_many_catalogs(video_ids)
+    candidates: Dict[str, List[str]] = {}
+    for video_id in video_ids:
+        catalog = catalogs.get(video_id)
+        if catalog is None:
+            # No catalog cached: try the requested/default codes, like _lookup
+            candidates[video_id] = [language] if language else TRANSCRIPT_DEFAULT_LANGUAGES
+            continue
+        language_code = _resolve_language(catalog, language)
+        if language_code is None:
+            results[video_id] = LanguageNotSupportedError(LANGUAGE_NOT_AVAILABLE)
+        else:
+            candidates[video_id] = [language_code]
+
+    for video_id, entry in (await CacheService.get_many_entries(candidates)).items():
+        if entry.claim_refresh():
+            _schedule_refresh(video_id, entry.record["language_code"])
+        results[video_id] = entry.payload
+    misses = [video_id for video_id in video_ids if video_id not in results]
+    logger.info(
+        "Batch transcript request: %s videos, language=%s, cache hits=%s, misses=%s",
+        len(video_ids), cache_key_lang, len(video_ids) - len(misses), len(misses),
     )
 
-    loop = asyncio.get_event_loop()
+    semaphore = asyncio.Semaphore(max(1, concurrency))
 
-    # 2. Run the blocking fetch in a thread executor
-    def _fetch():
-        ytt_api = YouTubeTranscriptApi()
-        if language:
-            return ytt_api.fetch(video_id, languages=[language])
-        return ytt_api.fetch(video_id)
+    async def _fetch_one(video_id: str):
+        async with semaphore:
+            try:
+                results[video_id] = (await _fetch_coalesced(video_id, language)).payload
+            except TranscriptError as e:
+                results[video_id] = e
 
+    await asyncio.gather(*(_fetch_one(video_id) for video_id in misses))
+    return results
+
+
+def _schedule_refresh(video_id: str, language_code: str) -> None:
+    """Refresh a cached transcript in the background; callers keep the current entry."""
+    refresh_stats["scheduled"] += 1
+    task = asyncio.ensure_future(_refresh(video_id, language_code))
+    _refresh_tasks.add(task)
+    task.add_done_callback(_refresh_tasks.discard)
+
+
+async def _refresh(video_id: str, language_code: str) -> None:
+    lock_key = f"lock:transcript-refresh:{CacheService._build_key(video_id, language_code)}"
     try:
-        transcript = await loop.run_in_executor(None, _fetch)
-        logger.info(f"Fetched transcript from YouTube API for video_id={video_id}")
+        # One refresh per key across workers. The lock is only released on success,
+        # so after a failure it doubles as a backoff before the next attempt.
+        if not await r.set(lock_key, WORKER_ID, ex=REFRESH_RETRY_SECONDS, nx=True):
+            refresh_stats["skipped"] += 1
+            return
+        await _fetch_and_cache(video_id, language_code)
+        await r.delete(lock_key)
+        refresh_stats["refreshed"] += 1
+        logger.info("Background refresh done for video_id=%s, language=%s", video_id, language_code)
     except Exception as e:
-        logger.error(f"Error fetching transcript from YouTube API for video_id={video_id}: {e}")
-        if "VideoUnavailable" in str(e):
-            raise VideoUnavailableError("Video unavailable or deleted")
-        elif "TranscriptsDisabled" in str(e):
-            raise VideoPrivateError("Transcript disabled or video private")
-        elif "NoTranscriptFound" in str(e):
-            raise LanguageNotSupportedError("Transcript not available in requested language")
-        else:
-            raise TranscriptFetchError(str(e))
+        # Keep serving the stale copy until it hard-expires
+        refresh_stats["failed"] += 1
+        logger.warning("Background refresh failed for video_id=%s, language=%s: %s", video_id, language_code, e)
+
+
+async def _fetch_coalesced(video_id: str, language: Optional[str]) -> CachedTranscript:
+    cache_key_lang = language or "default"
+
+    catalog = await CacheService.get_catalog(video_id)
+    if catalog is not None:
+        # Known languages: coalesce on the canonical entry, whatever alias was asked for
+        language = _resolve_language(catalog, language)
+        if language is None:
+            raise LanguageNotSupportedError(LANGUAGE_NOT_AVAILABLE)
+        cache_key_lang = language
+
+    # Known-dead video/language: answer from the negative cache, no upstream call
+    # (also with a cached catalog: the video may have gone away since it was listed)
+    negative = await CacheService.get_negative(video_id, cache_key_lang)
+    if negative is not None:
+        if sample_cache_hit():
+            logger.info(
+                "Negative cache HIT for video_id=%s, language=%s: %s", video_id, cache_key_lang, negative.message
+            )
+        raise negative
+    flight_key = CacheService._build_key(video_id, cache_key_lang)
+
+    return await transcript_flight.do(
+        flight_key,
+        lambda: _load_or_fetch(video_id, language),
+        lambda: _load_cached(video_id, language),
+    )
+
+
+async def _load_or_fetch(video_id: str, language: Optional[str]) -> CachedTranscript:
+    """Single-flight leader: try the Postgres archive first, YouTube only if it isn't there."""
+    record = await archive.load(video_id, [language] if language else TRANSCRIPT_DEFAULT_LANGUAGES)
+    if record is not None:
+        logger.info(
+            "Archive HIT: transcript for video_id=%s, language=%s restored to cache", video_id, record["language_code"]
+        )
+        return await CacheService.set_transcript(video_id, record["language_code"], record)
+    return await _fetch_and_cache(video_id, language)
+
+
+async def _load_cached(video_id: str, language: Optional[str]) -> Optional[CachedTranscript]:
+    """Single-flight `load`: the leader's result, or the failure it remembered."""
+    entry = await _lookup(video_id, language)
+    if entry is None:
+        negative = await CacheService.get_negative(video_id, language or "default")
+        if negative is not None:
+            raise negative
+    return entry
+
+
+def _map_upstream_error(e: Exception) -> TranscriptError:
+    for upstream_types, error_cls, message in _UPSTREAM_ERRORS:
+        if isinstance(e, upstream_types):
+            return error_cls(message)
+    return TranscriptFetchError(str(e))
+
+
+async def _fetch_and_cache(video_id: str, language: Optional[str]) -> CachedTranscript:
+    """
+    List the video's transcripts, resolve the language against that list, fetch it,
+    and cache both the catalog and the transcript (under its canonical language_code).
+    """
+    cache_key_lang = language or "default"
+
+    # 2. Run the blocking calls on the dedicated pool (reused HTTP sessions, bounded queue).
+    #    Listing first costs no extra request: YouTubeTranscriptApi.fetch lists internally too.
+    upstream = {"seconds": 0.0}  # time inside YouTube calls, excluding the pool queue
+
+    def _fetch(ytt_api: YouTubeTranscriptApi):
+        started = time.perf_counter()
+        try:
+            transcript_list = ytt_api.list(video_id)
+            catalog = _build_catalog(video_id, transcript_list)
+            language_code = _resolve_language(catalog, language)
+            if language_code is None:
+                return catalog, None
+            return catalog, transcript_list.find_transcript([language_code]).fetch()
+        finally:
+            upstream["seconds"] = time.perf_counter() - started
+
+    try:
+        catalog, transcript = await fetch_pool.run(_fetch)
+    except UpstreamBusyError:
+        logger.warning("Fetch queue full, shedding request for video_id=%s", video_id)
+        raise
+    except Exception as e:
+        logger.error(
+            "Error fetching transcript from YouTube API for video_id=%s: %s: %s", video_id, type(e).__name__, e
+        )
+        error = _map_upstream_error(e)
+        metrics.observe_upstream_fetch(type(error).__name__, upstream["seconds"])
+        if await CacheService.set_negative(video_id, cache_key_lang, error):
+            logger.info(
+                "Negative cached %s for video_id=%s, language=%s", type(error).__name__, video_id, cache_key_lang
+            )
+        raise error from e
 
-    # 3. Build transcript with timestamps
-    lines = []
-    for idx, snippet in enumerate(transcript.snippets, start=1):
-        start_time = format_timestamp(snippet.start)
-        end_time = format_timestamp(snippet.start + snippet.duration)
-        lines.append(f"{idx}\n{start_time} --> {end_time}\n{snippet.text}\n")
+    metrics.observe_upstream_fetch("ok", upstream["seconds"])
 
-    data = format_transcript(transcript)
+    # Later requests for unknown languages are answered from the catalog
+    await CacheService.set_catalog(video_id, catalog)
+    if transcript is None:
+        logger.info("No transcript for video_id=%s, language=%s in catalog", video_id, cache_key_lang)
+        raise LanguageNotSupportedError(LANGUAGE_NOT_AVAILABLE)
+    logger.info("Fetched transcript from YouTube API for video_id=%s", video_id)
 
-    result = {
+    # 3. Keep the raw snippets once; cleaned text and SRT are derived from them
+    record = {
         "video_id": video_id,
         "language": transcript.language,
         "language_code": transcript.language_code,
-        "transcript": data,
-        "transcript_with_timestamps": "\n".join(lines),
+        "snippets": [(s.start, s.duration, s.text) for s in transcript.snippets],
     }
 
-    # 4. Save into cache (async, doesn’t block)
-    await CacheService.set_transcript(video_id, cache_key_lang, result)
+    # 4. Save into cache (compressed record) under the canonical language code
+    entry = await CacheService.set_transcript(video_id, transcript.language_code, record)
+    # Durable copy, written in the background in batches
+    archive_writer.enqueue(entry.record)
     logger.info(
-        f"Transcript cached for video_id={video_id}, language={cache_key_lang}, "
-        f"expiry=24h"
+        "Transcript cached for video_id=%s, language=%s -> %s, expiry=24h",
+        video_id, cache_key_lang, transcript.language_code,
     )
 
-    return result
+    return entry
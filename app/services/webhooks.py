@@ -0,0 +1,70 @@
+"""
+Webhook delivery for transcript jobs.
+
+Webhook URLs come from API users, so the worker must not become a way into the
+deployment's own network: every resolved address of the host has to be public
+(no loopback, private, link-local such as 169.254.169.254, or reserved ranges),
+checked when the job is created and again before each POST, and redirects are
+not followed. Bodies are signed with JOB_WEBHOOK_SECRET when it is set.
+"""
+import hashlib
+import hmac
+import ipaddress
+import socket
+from typing import Optional
+from urllib.parse import urlsplit
+
+import orjson
+import requests
+
+from app.config import JOB_WEBHOOK_ALLOW_PRIVATE, JOB_WEBHOOK_SECRET, JOB_WEBHOOK_TIMEOUT
+
+SIGNATURE_HEADER = "X-Webhook-Signature"
+
+_session = requests.Session()
+
+
+class UnsafeWebhookError(ValueError):
+    """The webhook URL can't be used: unresolvable, or it points at a non-public address."""
+
+
+def _is_public(address: str) -> bool:
+    ip = ipaddress.ip_address(address.split("%", 1)[0])  # drop IPv6 zone ids
+    if isinstance(ip, ipaddress.IPv6Address) and ip.ipv4_mapped is not None:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+
+def check_url(url: str) -> None:
+    """Raise UnsafeWebhookError unless `url` is http(s) and its host resolves only to public addresses."""
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise UnsafeWebhookError("webhook_url must be an http(s) URL")
+    if JOB_WEBHOOK_ALLOW_PRIVATE:
+        return
+    try:
+        infos = socket.getaddrinfo(parts.hostname, parts.port or (443 if parts.scheme == "https" else 80))
+    except (socket.gaierror, UnicodeError) as e:
+        raise UnsafeWebhookError(f"webhook_url host can't be resolved: {parts.hostname}") from e
+    for *_, sockaddr in infos:
+        if not _is_public(sockaddr[0]):
+            raise UnsafeWebhookError(f"webhook_url must point at a public address, not {sockaddr[0]}")
+
+
+def sign(body: bytes) -> Optional[str]:
+    """The signature header value for `body`, or None without a JOB_WEBHOOK_SECRET."""
+    if not JOB_WEBHOOK_SECRET:
+        return None
+    return "sha256=" + hmac.new(JOB_WEBHOOK_SECRET.encode(), body, hashlib.sha256).hexdigest()
+
+
+def post(url: str, payload: dict) -> int:
+    """POST `payload` as JSON (blocking; run it in a thread). Returns the status code."""
+    check_url(url)
+    body = orjson.dumps(payload)
+    headers = {"Content-Type": "application/json"}
+    signature = sign(body)
+    if signature:
+        headers[SIGNATURE_HEADER] = signature
+    response = _session.post(url, data=body, headers=headers, timeout=JOB_WEBHOOK_TIMEOUT, allow_redirects=False)
+    return response.status_code
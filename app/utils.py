@@ -1,26 +1,46 @@
-from datetime import timedelta
-import re
-from app.logger import logger
+import json
 
-def format_timestamp(seconds: float) -> str:
-    """Converts seconds into SRT-style timestamp format."""
-    logger.debug(f"Formatting timestamp for {seconds} seconds")
-    ms = int((seconds - int(seconds)) * 1000)
-    t = str(timedelta(seconds=int(seconds)))
-    h, m, s = t.split(':')
-    formatted_timestamp = f"{int(h):02}:{int(m):02}:{int(s):02},{ms:03}"
-    logger.debug(f"Formatted timestamp: {formatted_timestamp}")
-    return formatted_timestamp
+# Text/SRT rendering lives in app.renderer; re-exported here for existing imports
+from app.renderer import (  # noqa: F401
+    STREAM_CHUNK_SNIPPETS,
+    format_timestamp,
+    format_transcript,
+    iter_srt,
+)
 
-def format_transcript(transcript) -> str:
-    logger.info("Starting transcript formatting")
-    raw_text = ' '.join(snippet.text for snippet in transcript.snippets)
-    logger.debug(f"Raw transcript text length: {len(raw_text)} characters")
+def format_srt(snippets) -> str:
+    """Builds an SRT document from (start, duration, text) snippets."""
+    return "".join(iter_srt(snippets, chunk_size=len(snippets) or 1))
 
-    # Remove all characters except letters, spaces, and punctuation
-    cleaned_text = re.sub(r'[^a-zA-Z\s.!?]', '', raw_text)
-    # Normalize whitespace
-    cleaned_text = re.sub(r'\s+', ' ', cleaned_text).strip()
-    
-    logger.info(f"Transcript formatting complete. Cleaned text length: {len(cleaned_text)} characters")
-    return cleaned_text
+def iter_ndjson(record: dict, chunk_size: int = STREAM_CHUNK_SNIPPETS):
+    """
+    Yields a transcript as NDJSON: one metadata line, then one line per snippet
+    ({"start", "duration", "text"}), grouped into chunks of `chunk_size` lines.
+    """
+    snippets = record["snippets"]
+    yield json.dumps({
+        "video_id": record["video_id"],
+        "language": record["language"],
+        "language_code": record["language_code"],
+        "snippet_count": len(snippets),
+    }) + "\n"
+
+    buf = []
+    for start, duration, text in snippets:
+        buf.append(json.dumps({"start": start, "duration": duration, "text": text}))
+        if len(buf) >= chunk_size:
+            yield "\n".join(buf) + "\n"
+            buf = []
+    if buf:
+        yield "\n".join(buf) + "\n"
+
+def build_transcript_payload(record: dict) -> dict:
+    """Derives the API response payload (cleaned text + SRT) from a cached transcript record."""
+    snippets = record["snippets"]
+    return {
+        "video_id": record["video_id"],
+        "language": record["language"],
+        "language_code": record["language_code"],
+        "transcript": format_transcript(snippets),
+        "transcript_with_timestamps": format_srt(snippets),
+    }
@@ -0,0 +1,201 @@
+"""
+Transcript job worker.
+
+Consumes jobs queued by POST /v1/transcripts/jobs from Redis, runs them through
+the same fetch/format/cache path as GET /v1/transcripts and delivers webhooks.
+Run as many of these as needed, independently of the API processes:
+
+    python -m app.worker [--concurrency 8]
+
+Jobs that aren't acked within JOB_VISIBILITY_TIMEOUT (e.g. the worker crashed)
+are put back on the queue by any running worker.
+"""
+import argparse
+import asyncio
+import signal
+import time
+from typing import Optional
+
+import requests
+
+from app.exceptions import TranscriptError
+from app.config import (
+    JOB_VISIBILITY_TIMEOUT,
+    JOB_MAX_ATTEMPTS,
+    JOB_WORKER_CONCURRENCY,
+    JOB_POLL_INTERVAL,
+    JOB_WEBHOOK_RETRIES,
+)
+from app.services import invalidation, job_queue, webhooks
+from app.services.fetch_pool import fetch_pool
+from app.services.archive import archive_writer
+from app.services.transcript_service import get_transcript
+from app.logger import logger
+
+# Upstream/transient failures are retried (with backoff); 4xx outcomes are final
+RETRYABLE_CODES = {500, 503}
+
+async def _notify(job: dict, body: dict) -> None:
+    """POST the job outcome to its webhook URL, retrying with backoff. Never fails the job."""
+    url = job.get("webhook_url")
+    if not url:
+        return
+    outcome = "failed"
+    for attempt in range(1, JOB_WEBHOOK_RETRIES + 1):
+        try:
+            status = await asyncio.to_thread(webhooks.post, url, body)
+            if status < 300:
+                outcome = "delivered"
+                break
+            logger.warning("Webhook for job %s returned %s (attempt %s)", job["id"], status, attempt)
+        except webhooks.UnsafeWebhookError as e:
+            # Checked at job creation too; DNS may have changed since. Not worth retrying.
+            logger.warning("Webhook for job %s refused: %s", job["id"], e)
+            break
+        except requests.RequestException as e:
+            logger.warning("Webhook for job %s failed (attempt %s): %s", job["id"], attempt, e)
+        await asyncio.sleep(2 ** (attempt - 1))
+    try:
+        await job_queue.set_fields(job["id"], webhook=outcome)
+    except Exception as e:
+        logger.error("Recording webhook outcome for job %s failed: %s", job["id"], e)
+
+
+async def _heartbeat(job_id: str) -> None:
+    # Keep long-running jobs hidden from other workers' requeue pass
+    # (a failed extend is retried on the next beat, well before the timeout runs out)
+    while True:
+        await asyncio.sleep(JOB_VISIBILITY_TIMEOUT / 3)
+        try:
+            await job_queue.extend(job_id)
+        except Exception as e:
+            logger.error("Heartbeat for job %s failed: %s", job_id, e)
+
+
+async def _fetch(job: dict) -> dict:
+    heartbeat = asyncio.ensure_future(_heartbeat(job["id"]))
+    try:
+        return await get_transcript(job["video_id"], job["language"] or None)
+    finally:
+        heartbeat.cancel()
+
+
+async def _fail(job: dict, code: int, message: str) -> None:
+    await job_queue.fail(job["id"], code, message)
+    logger.info("Job %s failed: %s %s", job["id"], code, message)
+    await _notify(job, {
+        "job_id": job["id"],
+        "status": "failed",
+        "video_id": job["video_id"],
+        "language": job["language"] or None,
+        "error": {"code": code, "message": message},
+    })
+
+
+async def process(job: dict) -> None:
+    job_id = job["id"]
+    attempts = int(job["attempts"])
+    if attempts > JOB_MAX_ATTEMPTS:
+        # Re-queued by visibility timeouts too often (e.g. it keeps crashing workers)
+        await _fail(job, 500, f"Job abandoned after {JOB_MAX_ATTEMPTS} attempts")
+        return
+
+    logger.info("Processing job %s: video_id=%s, attempt %s", job_id, job["video_id"], attempts)
+    try:
+        payload = await _fetch(job)
+    except TranscriptError as e:
+        if e.code in RETRYABLE_CODES and attempts < JOB_MAX_ATTEMPTS:
+            delay = getattr(e, "retry_after", None) or 2 ** attempts
+            logger.warning("Job %s will be retried in %ss: %s", job_id, delay, e.message)
+            await job_queue.retry(job_id, delay)
+            return
+        await _fail(job, e.code, e.message)
+        return
+    except Exception as e:
+        logger.error("Job %s crashed: %s", job_id, e)
+        if attempts < JOB_MAX_ATTEMPTS:
+            await job_queue.retry(job_id, 2 ** attempts)
+        else:
+            await _fail(job, 500, "Failed to fetch transcript")
+        return
+
+    await job_queue.succeed(job_id, payload["language_code"])
+    logger.info("Job %s succeeded", job_id)
+    await _notify(job, {
+        "job_id": job_id,
+        "status": "succeeded",
+        "video_id": job["video_id"],
+        "language": job["language"] or None,
+        "data": payload,
+    })
+
+
+async def _wait(stopping: asyncio.Event, seconds: float) -> None:
+    try:
+        await asyncio.wait_for(stopping.wait(), timeout=seconds)
+    except asyncio.TimeoutError:
+        pass
+
+
+async def _consume(stopping: asyncio.Event) -> None:
+    while not stopping.is_set():
+        try:
+            job: Optional[dict] = await job_queue.reserve()
+        except Exception as e:
+            logger.error("Job reserve failed: %s", e)
+            await _wait(stopping, 1)
+            continue
+        if job is None:
+            await _wait(stopping, JOB_POLL_INTERVAL)
+            continue
+        try:
+            await process(job)
+        except Exception as e:
+            # e.g. Redis down while recording the outcome: the job stays reserved and
+            # comes back after its visibility timeout; this consumer keeps going
+            logger.error("Job %s processing failed: %s: %s", job["id"], type(e).__name__, e)
+
+
+async def _requeue_expired(stopping: asyncio.Event) -> None:
+    while not stopping.is_set():
+        try:
+            count = await job_queue.requeue_expired()
+            if count:
+                logger.info("Re-queued %s jobs past their visibility timeout", count)
+        except Exception as e:
+            logger.error("Job requeue pass failed: %s", e)
+        await _wait(stopping, max(1.0, JOB_VISIBILITY_TIMEOUT / 4))
+
+
+async def run(concurrency: int = JOB_WORKER_CONCURRENCY) -> None:
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stopping.set)
+
+    invalidation.start_listener()
+    archive_writer.start()
+    logger.info("Job worker %s started with concurrency=%s", invalidation.WORKER_ID, concurrency)
+    started = time.monotonic()
+    try:
+        # In-flight jobs finish on shutdown; anything cut off is re-queued by visibility timeout
+        await asyncio.gather(
+            _requeue_expired(stopping),
+            *(_consume(stopping) for _ in range(max(1, concurrency))),
+        )
+    finally:
+        await invalidation.stop_listener()
+        await archive_writer.close()
+        fetch_pool.shutdown()
+        logger.info("Job worker stopped after %.0fs", time.monotonic() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Transcript job worker")
+    parser.add_argument("--concurrency", type=int, default=JOB_WORKER_CONCURRENCY)
+    args = parser.parse_args()
+    asyncio.run(run(args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
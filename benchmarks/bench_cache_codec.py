@@ -0,0 +1,80 @@
+"""
+Compare the legacy JSON cache entry with the compressed binary record.
+
+Usage:
+    python -m benchmarks.bench_cache_codec [--snippets 4000] [--repeat 50]
+"""
+import argparse
+import json
+import random
+import statistics
+import time
+
+from app.services import transcript_codec
+from app.utils import build_transcript_payload
+
+_WORDS = (
+    "the be to of and a in that have I it for not on with he as you do at this but his by "
+    "from they we say her she or an will my one all would there their what so up out if "
+    "about who get which go me when make can like time no just him know take people into "
+    "year your good some could them see other than then now look only come its over think "
+    "also back after use two how our work first well way even new want because any these "
+    "give day most us video today going really right thing here let's gonna okay actually"
+).split()
+
+
+def synthetic_record(n_snippets: int, seed: int = 42) -> dict:
+    """A transcript shaped like YouTube's: ~2-4s snippets of 6-12 Zipf-distributed words."""
+    rng = random.Random(seed)
+    weights = [1 / (i + 1) for i in range(len(_WORDS))]
+    snippets, t = [], 0.0
+    for _ in range(n_snippets):
+        duration = round(rng.uniform(1.5, 4.5), 3)
+        text = " ".join(rng.choices(_WORDS, weights, k=rng.randint(6, 12)))
+        snippets.append((round(t, 3), duration, text))
+        t += round(rng.uniform(1.0, duration), 3)
+    return {"video_id": "bench000000", "language": "English", "language_code": "en", "snippets": snippets}
+
+
+def _timeit(fn, repeat: int) -> dict:
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    samples.sort()
+    return {
+        "p50_ms": round(statistics.median(samples), 3),
+        "p95_ms": round(samples[int(len(samples) * 0.95) - 1], 3),
+    }
+
+
+def run(n_snippets: int, repeat: int) -> dict:
+    record = synthetic_record(n_snippets)
+    legacy = json.dumps(build_transcript_payload(record)).encode()
+    binary = transcript_codec.encode(record)
+
+    return {
+        "snippets": n_snippets,
+        "legacy_json_bytes": len(legacy),
+        "binary_bytes": len(binary),
+        "saved_pct": round(100 * (1 - len(binary) / len(legacy)), 1),
+        "decode_legacy_json": _timeit(lambda: json.loads(legacy), repeat),
+        "decode_binary": _timeit(lambda: transcript_codec.decode(binary), repeat),
+        "decode_binary_and_derive": _timeit(
+            lambda: build_transcript_payload(transcript_codec.decode(binary)), repeat
+        ),
+        "encode_binary": _timeit(lambda: transcript_codec.encode(record), repeat),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--snippets", type=int, default=4000, help="~4000 snippets is a 3h video")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    print(json.dumps(run(args.snippets, args.repeat), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Compressing GET /v1/transcripts bodies: what each cache hit would pay with a
+generic per-response middleware (Starlette's GZipMiddleware compresses at level 9
+on every response) vs. the stored body the API now serves, plus the one-off cost
+of producing that body (gzip at GZIP_LEVEL, brotli at BROTLI_QUALITY) and the
+sizes on the wire, for the full JSON envelope and format=srt.
+
+Usage:
+    python -m benchmarks.bench_compression [--snippets 1500,10000] [--repeat 20]
+"""
+import argparse
+import gzip
+import json
+
+from fastapi.responses import Response
+
+from app import compression
+from app.renderer import render_srt
+from app.services.cache_service import CachedTranscript
+from benchmarks.bench_cache_codec import synthetic_record, _timeit
+
+
+def _representation(body: bytes, repeat: int) -> dict:
+    result = {
+        "identity_bytes": len(body),
+        "per_hit_gzip9": _timeit(lambda: gzip.compress(body, compresslevel=9), repeat),
+    }
+    for encoding in compression.ENCODINGS:
+        stored = compression.compress(body, encoding)
+        result[encoding] = {
+            "bytes": len(stored),
+            "ratio": round(len(body) / len(stored), 2),
+            "compress_once": _timeit(lambda: compression.compress(body, encoding), repeat),
+            "hit_stored_body": _timeit(lambda: Response(stored, headers={"Content-Encoding": encoding}), repeat),
+        }
+    return result
+
+
+def run(sizes, repeat: int) -> dict:
+    results = {"encodings": list(compression.ENCODINGS)}
+    for n_snippets in sizes:
+        record = synthetic_record(n_snippets)
+        entry = CachedTranscript(record)
+        results[f"{n_snippets}_snippets"] = {
+            "full": _representation(entry.body, repeat),
+            "srt": _representation(render_srt(record).encode(), repeat),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--snippets", default="1500,10000", help="comma-separated transcript sizes (~1h, ~7h)")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    sizes = [int(n) for n in args.snippets.split(",") if n.strip()]
+    print(json.dumps(run(sizes, args.repeat), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Concurrent API key lookups against the users table: the previous path (sync
+Session in asyncio.to_thread, default pool) vs. the async engine (tier_service._load_user).
+
+Usage:
+    python -m benchmarks.bench_db_auth [--db-url postgresql://...] [--users 2000]
+        [--requests 5000] [--concurrency 100]
+
+Defaults to a temporary SQLite file (aiosqlite runs each connection on a thread,
+so the gap is far smaller there); point --db-url at Postgres for real numbers.
+The end-to-end equivalent is the `cold-auth` workload of benchmarks.loadtest.
+"""
+import argparse
+import asyncio
+import json
+import os
+import secrets
+import tempfile
+import time
+
+from benchmarks.bench_limiter import _percentiles
+
+
+async def _drive(lookup, keys, requests: int, concurrency: int) -> dict:
+    samples = []
+    queue = iter(range(requests))
+
+    async def worker():
+        for i in queue:
+            t0 = time.perf_counter()
+            await lookup(keys[i % len(keys)])
+            samples.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - t0
+    return {"requests": requests, "throughput_rps": round(requests / elapsed, 1), **_percentiles(samples)}
+
+
+async def run(n_users: int, requests: int, concurrency: int) -> dict:
+    from sqlalchemy import create_engine, insert
+    from sqlalchemy.orm import sessionmaker
+
+    from app import models
+    from app.database import POSTGRES_URL, Base, async_engine, engine
+    from app.limiting import tier_service
+
+    Base.metadata.create_all(bind=engine)
+    keys = [secrets.token_hex(16) for _ in range(n_users)]
+    with engine.begin() as conn:
+        conn.execute(insert(models.User.__table__), [
+            {"name": "bench", "email": f"{key}@bench.local", "password": "x", "api_key": key, "tier": "free"}
+            for key in keys
+        ])
+
+    # What tier_service did before: default-pooled sync engine, one thread per lookup
+    legacy_engine = create_engine(POSTGRES_URL)
+    LegacySession = sessionmaker(autocommit=False, autoflush=False, bind=legacy_engine)
+
+    def legacy_load_user(api_key):
+        db = LegacySession()
+        try:
+            user = db.query(models.User).filter(models.User.api_key == api_key).first()
+            return (user.id, user.tier) if user else None
+        finally:
+            db.close()
+
+    async def legacy_lookup(api_key):
+        return await asyncio.to_thread(legacy_load_user, api_key)
+
+    await tier_service._load_user(keys[0])  # open the async pool
+    results = {
+        "database": legacy_engine.dialect.name,
+        "users": n_users,
+        "concurrency": concurrency,
+        "sync_session_in_thread": await _drive(legacy_lookup, keys, requests, concurrency),
+        "async_engine": await _drive(tier_service._load_user, keys, requests, concurrency),
+    }
+    legacy_engine.dispose()
+    await async_engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db-url", default=None, help="SQLAlchemy URL; default: a fresh SQLite file")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    args = parser.parse_args()
+    os.environ["POSTGRES_URL"] = args.db_url or f"sqlite:///{tempfile.mkdtemp(prefix='yt-bench-')}/bench.db"
+    print(json.dumps(asyncio.run(run(args.users, args.requests, args.concurrency)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
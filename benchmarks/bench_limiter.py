@@ -0,0 +1,106 @@
+"""
+Tiered limiter latency: legacy multi-command sequence vs. the single Lua script.
+
+Usage:
+    python -m benchmarks.bench_limiter [--requests 5000] [--concurrency 50] [--rtt-ms 0.3] [--fake]
+
+By default this talks to REDIS_URL. With --fake it runs against fakeredis
+(pip install fakeredis lupa) and injects --rtt-ms of latency per Redis command,
+which models the network round trips that dominate limiter cost in production.
+"""
+import argparse
+import asyncio
+import json
+import time
+
+
+class LegacyTieredTokenBucketLimiter:
+    """The pre-Lua implementation: SET NX, DECR, TTL (+ INCR, TTL on denial)."""
+
+    def __init__(self, client, tier_limits):
+        self.r = client
+        self.tier_limits = tier_limits
+
+    async def check(self, api_key, tier):
+        cfg = self.tier_limits[tier]
+        limit, period = int(cfg["limit"]), int(cfg["period"])
+        now = int(time.time())
+        key = f"bench:legacy:{api_key}:{now - now % period}"
+        await self.r.set(key, limit, ex=period, nx=True)
+        new_val = await self.r.decr(key)
+        if new_val >= 0:
+            ttl = await self.r.ttl(key)
+            return True, limit, new_val, now + (ttl if ttl and ttl > 0 else period)
+        await self.r.incr(key)
+        ttl = await self.r.ttl(key)
+        return False, limit, 0, now + (ttl if ttl and ttl > 0 else period)
+
+
+def _install_fake_redis(rtt_ms: float):
+    import fakeredis
+    import redis.asyncio as redis
+
+    server = fakeredis.FakeServer()
+    original = fakeredis.aioredis.FakeRedis.execute_command
+
+    async def delayed(self, *args, **kwargs):
+        if rtt_ms:
+            await asyncio.sleep(rtt_ms / 1000)
+        return await original(self, *args, **kwargs)
+
+    fakeredis.aioredis.FakeRedis.execute_command = delayed
+    redis.Redis.from_url = staticmethod(lambda url, **kw: fakeredis.aioredis.FakeRedis(server=server, **kw))
+
+
+def _percentiles(samples):
+    samples = sorted(samples)
+    pick = lambda q: round(samples[min(len(samples) - 1, int(len(samples) * q))] * 1000, 3)
+    return {"p50_ms": pick(0.50), "p95_ms": pick(0.95), "p99_ms": pick(0.99)}
+
+
+async def _drive(check, requests: int, concurrency: int, n_keys: int):
+    samples = []
+    queue = iter(range(requests))
+
+    async def worker():
+        for i in queue:
+            t0 = time.perf_counter()
+            await check(f"key-{i % n_keys}", "enterprise")
+            samples.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - t0
+    return {"requests": requests, "throughput_rps": round(requests / elapsed, 1), **_percentiles(samples)}
+
+
+async def run(requests: int, concurrency: int, n_keys: int) -> dict:
+    from app.limiting.config import TIER_LIMITS
+    from app.limiting.persistent import TieredTokenBucketLimiter
+    from app.limiting.redis_client import r
+
+    legacy = LegacyTieredTokenBucketLimiter(r, TIER_LIMITS)
+    lua = TieredTokenBucketLimiter(TIER_LIMITS)
+    return {
+        "legacy_multi_command": await _drive(legacy.check, requests, concurrency, n_keys),
+        "lua_single_round_trip": await _drive(lua.check, requests, concurrency, n_keys),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--keys", type=int, default=100, help="distinct API keys")
+    parser.add_argument("--fake", action="store_true", help="use fakeredis instead of REDIS_URL")
+    parser.add_argument("--rtt-ms", type=float, default=0.3, help="injected per-command latency with --fake")
+    args = parser.parse_args()
+
+    if args.fake:
+        _install_fake_redis(args.rtt_ms)
+    result = asyncio.run(run(args.requests, args.concurrency, args.keys))
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+Per-request cost of logging on cache hits, through the whole app in-process
+(httpx ASGI transport, fakeredis, fake YouTube for the warm-up fetches):
+
+    off          logger at WARNING: no records at all (the floor)
+    sync         console + rotating file handlers on the logger itself (the previous
+                 setup: formatting and writes on the event loop)
+    queue        the QueueHandler/QueueListener pipeline, text lines
+    queue_json   the same with LOG_JSON output (request_id on every line)
+    sampled      queue, with LOG_CACHE_HIT_SAMPLE_RATE=--sample-rate
+
+Usage:
+    python -m benchmarks.bench_logging [--requests 3000] [--concurrency 50]
+        [--videos 50] [--rounds 3] [--level INFO] [--sample-rate 0.01] [--stall-ms 0]
+
+Console output goes to /dev/null and the log file to a temporary directory.
+--stall-ms makes every console write block for that long, like a slow disk or
+a log collector applying back-pressure to stderr: `sync` then stalls the event
+loop on each line, the queue modes only delay the listener thread.
+Hits log one INFO line each; --level DEBUG brings back the old per-request
+volume (request received, formatting, fetched successfully). overhead_us is
+the throughput difference to `off`, per request.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import logging.handlers
+import os
+import tempfile
+import time
+
+from benchmarks.loadtest import _configure_environment, _create_users, _drive, _lifespan
+
+MODES = ("off", "sync", "queue", "queue_json", "sampled")
+
+
+class _StallingStream:
+    """/dev/null that blocks `stall_s` per write."""
+
+    def __init__(self, stall_s: float):
+        self.stall_s = stall_s
+        self._devnull = open(os.devnull, "w")
+
+    def write(self, text: str) -> int:
+        if self.stall_s:
+            time.sleep(self.stall_s)
+        return self._devnull.write(text)
+
+    def flush(self) -> None:
+        self._devnull.flush()
+
+
+def _use_mode(mode: str, level: str, sample_rate: float, console, file_handler) -> None:
+    from app import logger as app_logger
+
+    text_formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    formatter = app_logger.JsonFormatter() if mode == "queue_json" else text_formatter
+    console.setFormatter(formatter)
+    file_handler.setFormatter(formatter)
+
+    logger = app_logger.logger
+    logger.setLevel("WARNING" if mode == "off" else level)
+    if mode == "sync":
+        logger.handlers = [console, file_handler]
+    else:
+        logger.handlers = [app_logger.queue_handler]
+        app_logger.listener.handlers = (console, file_handler)
+    app_logger.cache_hit_sample_rate = sample_rate if mode == "sampled" else 1.0
+
+
+async def _drain(log_queue) -> None:
+    """Let the listener catch up, so one mode's backlog doesn't slow the next."""
+    while not log_queue.empty():
+        await asyncio.sleep(0.01)
+
+
+async def run(args) -> dict:
+    import httpx
+
+    from app.logger import log_queue
+    from app.main import app
+    from app.services.fetch_pool import fetch_pool
+    from benchmarks.fake_youtube import FakeYouTube
+
+    FakeYouTube(latency_ms=1, jitter_ms=0, snippets=args.snippets).install()
+    log_dir = tempfile.mkdtemp(prefix="yt-bench-logs-")
+    console = logging.StreamHandler(_StallingStream(args.stall_ms / 1000))
+    file_handler = logging.handlers.RotatingFileHandler(
+        os.path.join(log_dir, "api.log"), maxBytes=5 * 1024 * 1024, backupCount=5
+    )
+
+    rounds = {mode: [] for mode in MODES}
+    async with _lifespan(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            (key,) = _create_users("enterprise", 1)
+            headers = {"x-api-key": key}
+            videos = [f"{args.run_id}-log-{i}" for i in range(args.videos)]
+            await _drive(client, lambda i: ({"video_id": videos[i]}, headers), len(videos), args.concurrency)
+
+            # Interleaved rounds, so drift (GC, cache warm-up) hits every mode alike
+            for _ in range(args.rounds):
+                for mode in MODES:
+                    _use_mode(mode, args.level, args.sample_rate, console, file_handler)
+                    result = await _drive(
+                        client,
+                        lambda i: ({"video_id": videos[i % len(videos)]}, headers),
+                        args.requests,
+                        args.concurrency,
+                    )
+                    result["queued_at_end"] = log_queue.qsize()
+                    rounds[mode].append(result)
+                    await _drain(log_queue)
+    fetch_pool.shutdown()
+
+    results = {}
+    for mode in MODES:
+        # The round with the median throughput
+        by_rps = sorted(rounds[mode], key=lambda r: r["throughput_rps"])
+        results[mode] = by_rps[len(by_rps) // 2]
+    floor_us = 1e6 / results["off"]["throughput_rps"]
+    for mode in MODES:
+        results[mode]["overhead_us"] = round(1e6 / results[mode]["throughput_rps"] - floor_us, 1)
+    return {
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "level": args.level,
+        "sample_rate": args.sample_rate,
+        "stall_ms": args.stall_ms,
+        "modes": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=3000, help="requests per mode and round")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--videos", type=int, default=50, help="distinct pre-warmed videos")
+    parser.add_argument("--snippets", type=int, default=300, help="snippets per transcript")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--level", default="INFO", help="app log level for every mode but `off`")
+    parser.add_argument("--sample-rate", type=float, default=0.01, help="cache-hit sample rate for `sampled`")
+    parser.add_argument("--stall-ms", type=float, default=0.0, help="blocking time per console write")
+    args = parser.parse_args()
+
+    args.run_id = "bench"
+    _configure_environment(argparse.Namespace(db_url=None, redis="fake", free_limit=10**9, redis_rtt_ms=0.0))
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Per-sample cost of the Prometheus instrumentation on the hot path.
+
+Usage:
+    python -m benchmarks.bench_metrics [--ops 200000] [--multiprocess]
+
+--multiprocess points PROMETHEUS_MULTIPROC_DIR at a temporary directory first,
+i.e. the mmap-backed values used with several uvicorn workers.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+
+def _per_op_us(fn, ops: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(ops):
+        fn()
+    return round((time.perf_counter() - t0) / ops * 1e6, 3)
+
+
+def run(ops: int) -> dict:
+    # Imported here so --multiprocess can set the environment first
+    from app import metrics
+
+    labels = ("GET", "/v1/transcripts", "200")
+    metrics._request_seconds[labels] = metrics.REQUEST_SECONDS.labels(*labels)
+    return {
+        "ops": ops,
+        "multiprocess": metrics.MULTIPROCESS,
+        "baseline_us": _per_op_us(lambda: None, ops),
+        "counter_inc_us": _per_op_us(metrics.L1_HIT.inc, ops),
+        "gauge_set_us": _per_op_us(lambda: metrics.FETCH_POOL_QUEUED.set(1), ops),
+        "limiter_observe_us": _per_op_us(lambda: metrics.observe_limiter("free", 0.0004, True), ops),
+        "request_labels_and_observe_us": _per_op_us(
+            lambda: metrics.REQUEST_SECONDS.labels("GET", "/v1/transcripts", "200").observe(0.002), ops
+        ),
+        "request_bound_observe_us": _per_op_us(
+            lambda: (metrics._request_seconds.get(labels) or metrics.REQUEST_SECONDS.labels(*labels)).observe(0.002),
+            ops,
+        ),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--ops", type=int, default=200000)
+    parser.add_argument("--multiprocess", action="store_true")
+    args = parser.parse_args()
+    if args.multiprocess:
+        os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="prom-bench-")
+    print(json.dumps(run(args.ops), indent=2))
+
+
+if __name__ == "__main__":
+    main()
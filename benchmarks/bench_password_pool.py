@@ -0,0 +1,96 @@
+"""
+Event-loop responsiveness during a burst of logins: bcrypt inline (as the old
+sync handlers effectively did, per thread), on the default thread pool, and on
+app.services.password_pool.
+
+A probe coroutine stands in for cheap transcript requests: it sleeps 1ms and
+then renders a small cached transcript. The probe latency (p50/p99) shows how
+much the hashing burst delays everything else on the worker.
+
+Usage:
+    python -m benchmarks.bench_password_pool [--logins 40] [--rounds 12]
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+from benchmarks.bench_cache_codec import synthetic_record
+from benchmarks.bench_limiter import _percentiles
+
+
+async def _probe(stop: asyncio.Event, samples: list, record: dict, render) -> None:
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        await asyncio.sleep(0.001)
+        render(record)
+        samples.append(time.perf_counter() - t0 - 0.001)
+
+
+async def _burst(name: str, verify, logins: int, concurrency: int, hashed: str, record: dict, render) -> dict:
+    stop, samples = asyncio.Event(), []
+    probe = asyncio.ensure_future(_probe(stop, samples, record, render))
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def login():
+        async with semaphore:
+            await verify("benchmark", hashed)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - t0
+    stop.set()
+    await probe
+    return {
+        "mode": name,
+        "logins_per_s": round(logins / elapsed, 1),
+        "probe": {"count": len(samples), **_percentiles(samples)},
+    }
+
+
+async def run(logins: int, concurrency: int) -> dict:
+    from app import auth
+    from app.renderer import render_segments
+    from app.services.password_pool import password_pool
+
+    record = synthetic_record(200)
+    hashed = auth.hash_password("benchmark")
+    await password_pool.verify_and_update("benchmark", hashed)  # start the processes
+
+    async def inline(password, hashed):
+        return auth.verify_password(password, hashed)
+
+    async def threaded(password, hashed):
+        return await asyncio.to_thread(auth.verify_password, password, hashed)
+
+    results = {
+        "rounds": auth.pwd_context.handler("bcrypt").default_rounds,
+        "logins": logins,
+        "concurrency": concurrency,
+        # Probe alone for one second: the baseline latency
+        "idle": await _burst("idle", lambda *_: asyncio.sleep(1), 1, 1, hashed, record, render_segments),
+        "runs": [
+            await _burst("inline", inline, logins, concurrency, hashed, record, render_segments),
+            await _burst("thread_pool", threaded, logins, concurrency, hashed, record, render_segments),
+            await _burst(
+                "process_pool", password_pool.verify_and_update, logins, concurrency, hashed, record, render_segments
+            ),
+        ],
+    }
+    password_pool.shutdown()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=8, help="logins in flight at once")
+    parser.add_argument("--rounds", type=int, default=12, help="bcrypt work factor")
+    args = parser.parse_args()
+    os.environ["BCRYPT_ROUNDS"] = str(args.rounds)
+    print(json.dumps(asyncio.run(run(args.logins, args.concurrency)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Transcript rendering: the legacy timedelta-based SRT path vs. app.renderer, per format.
+
+Usage:
+    python -m benchmarks.bench_renderer [--snippets 10000] [--repeat 30]
+"""
+import argparse
+import json
+import logging
+from datetime import timedelta
+
+from app import renderer
+from app.logger import logger
+from benchmarks.bench_cache_codec import synthetic_record, _timeit
+
+
+def legacy_format_timestamp(seconds: float) -> str:
+    """The pre-renderer implementation (including its per-call debug f-strings)."""
+    logger.debug(f"Formatting timestamp for {seconds} seconds")
+    ms = int((seconds - int(seconds)) * 1000)
+    t = str(timedelta(seconds=int(seconds)))
+    h, m, s = t.split(':')
+    formatted_timestamp = f"{int(h):02}:{int(m):02}:{int(s):02},{ms:03}"
+    logger.debug(f"Formatted timestamp: {formatted_timestamp}")
+    return formatted_timestamp
+
+
+def legacy_format_srt(snippets) -> str:
+    blocks = []
+    for idx, (start, duration, text) in enumerate(snippets, start=1):
+        start_time = legacy_format_timestamp(start)
+        end_time = legacy_format_timestamp(start + duration)
+        sep = "\n" if idx > 1 else ""
+        blocks.append(f"{sep}{idx}\n{start_time} --> {end_time}\n{text}\n")
+    return "".join(blocks)
+
+
+def run(n_snippets: int, repeat: int) -> dict:
+    record = synthetic_record(n_snippets)
+    snippets = record["snippets"]
+    # Production log level: debug calls are filtered, but their f-strings still get built
+    logger.setLevel(logging.INFO)
+    logger.disabled = True  # keep format_transcript's info line out of the output
+
+    results = {
+        "snippets": n_snippets,
+        "timestamp_legacy": _timeit(lambda: [legacy_format_timestamp(s) for s, _, _ in snippets], repeat),
+        "timestamp_integer": _timeit(lambda: [renderer.format_timestamp(s) for s, _, _ in snippets], repeat),
+        "srt_legacy": _timeit(lambda: legacy_format_srt(snippets), repeat),
+    }
+    for name, (render, _, _) in renderer.FORMATS.items():
+        results[name] = _timeit(lambda render=render: render(record), repeat)
+    # Old default path rendered text + SRT for every request; a format now renders just itself
+    results["legacy_text_and_srt"] = _timeit(
+        lambda: (renderer.format_transcript(snippets), legacy_format_srt(snippets)), repeat
+    )
+    results["srt_speedup"] = round(results["srt_legacy"]["p50_ms"] / results["srt"]["p50_ms"], 1)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--snippets", type=int, default=10000, help="~10k snippets is a 7-8h video")
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+    print(json.dumps(run(args.snippets, args.repeat), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Building the GET /v1/transcripts response on a cache hit: the previous path
+(payload dict -> SuccessResponse(...).dict() -> stdlib JSONResponse) vs. sending
+the entry's encoded body, plus the one-off encode on a miss (stdlib json vs. orjson).
+
+Usage:
+    python -m benchmarks.bench_response [--snippets 1500,10000] [--repeat 200]
+"""
+import argparse
+import json
+
+from fastapi.responses import JSONResponse
+
+from app.responses import JSONBytesResponse, encode_success
+from app.schemas import SuccessResponse
+from app.services.cache_service import CachedTranscript
+from app.utils import build_transcript_payload
+from benchmarks.bench_cache_codec import synthetic_record, _timeit
+
+
+def run(sizes, repeat: int) -> dict:
+    results = {}
+    for n_snippets in sizes:
+        record = synthetic_record(n_snippets)
+        payload = build_transcript_payload(record)
+        entry = CachedTranscript(record)
+        entry.body  # a hit finds it already encoded
+
+        legacy = _timeit(
+            lambda: JSONResponse(content=SuccessResponse(status="success", code=200, data=payload).dict()),
+            repeat,
+        )
+        cached = _timeit(lambda: JSONBytesResponse(entry.body), repeat)
+        results[f"{n_snippets}_snippets"] = {
+            "body_bytes": len(entry.body),
+            "hit_legacy": legacy,
+            "hit_cached_body": cached,
+            "hit_saved_ms": round(legacy["p50_ms"] - cached["p50_ms"], 3),
+            "miss_encode_stdlib": _timeit(
+                lambda: json.dumps({"status": "success", "code": 200, "data": payload}).encode(), repeat
+            ),
+            "miss_encode_orjson": _timeit(lambda: encode_success(payload), repeat),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--snippets", default="1500,10000", help="comma-separated transcript sizes (~1h, ~7h)")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    sizes = [int(n) for n in args.snippets.split(",") if n.strip()]
+    print(json.dumps(run(sizes, args.repeat), indent=2))
+
+
+if __name__ == "__main__":
+    main()
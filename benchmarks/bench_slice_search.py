@@ -0,0 +1,64 @@
+"""
+Partial transcript reads: a 5-minute slice and a phrase search vs. rendering the whole
+transcript, on an already-decoded entry (the L1-hit case).
+
+Usage:
+    python -m benchmarks.bench_slice_search [--snippets 5000] [--repeat 50]
+"""
+import argparse
+import json
+import logging
+from itertools import accumulate
+
+from app import renderer
+from app.logger import logger
+from app.services import transcript_index
+from app.utils import build_transcript_payload
+from benchmarks.bench_cache_codec import synthetic_record, _timeit
+
+
+def run(n_snippets: int, repeat: int) -> dict:
+    record = synthetic_record(n_snippets)
+    snippets = record["snippets"]
+    starts = [start for start, _, _ in snippets]
+    max_ends = list(accumulate((start + duration for start, duration, _ in snippets), max))
+    search_index = transcript_index.build_index(snippets)
+    encoded = transcript_index.encode_index(search_index)
+    middle = starts[len(starts) // 2]
+    logger.setLevel(logging.INFO)
+    logger.disabled = True
+
+    def _slice():
+        window = transcript_index.slice_snippets(starts, max_ends, snippets, middle, middle + 300)
+        return renderer.render_segments({**record, "snippets": window})
+
+    def _search():
+        return [snippets[i] for i in transcript_index.search(search_index, "people video")[:50]]
+
+    results = {
+        "snippets": n_snippets,
+        "duration_s": round(starts[-1]),
+        "index_tokens": len(search_index),
+        "index_bytes": len(encoded),
+        "build_index": _timeit(lambda: transcript_index.build_index(snippets), max(1, repeat // 5)),
+        "decode_index": _timeit(lambda: transcript_index.decode_index(encoded), repeat),
+        "full_payload": _timeit(lambda: build_transcript_payload(record), repeat),
+        "full_json": _timeit(lambda: renderer.render_segments(record), repeat),
+        "slice_5min": _timeit(_slice, repeat),
+        "search": _timeit(_search, repeat),
+    }
+    results["slice_fraction_of_full_json"] = round(results["slice_5min"]["p50_ms"] / results["full_json"]["p50_ms"], 4)
+    results["search_fraction_of_full_json"] = round(results["search"]["p50_ms"] / results["full_json"]["p50_ms"], 4)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--snippets", type=int, default=5000, help="~5k snippets is a 3-4h video")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    print(json.dumps(run(args.snippets, args.repeat), indent=2))
+
+
+if __name__ == "__main__":
+    main()
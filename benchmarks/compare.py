@@ -0,0 +1,67 @@
+"""
+Compare two benchmarks.loadtest result files (e.g. from the base commit and a branch).
+
+Usage:
+    python -m benchmarks.compare base.json new.json [--threshold 10]
+
+Prints per-workload relative changes as JSON. Exits with status 1 if any workload's
+throughput dropped, or its p50/p95/p99 rose, by more than --threshold percent.
+"""
+import argparse
+import json
+import sys
+
+LATENCY_KEYS = ("p50_ms", "p95_ms", "p99_ms")
+
+
+def _change(old: float, new: float) -> float | None:
+    if not old:
+        return None
+    return round((new - old) / old * 100, 1)
+
+
+def compare(base: dict, new: dict, threshold: float) -> dict:
+    workloads, regressions = {}, []
+    for name, old in base["workloads"].items():
+        current = new["workloads"].get(name)
+        if current is None:
+            continue
+        changes = {"throughput_rps": _change(old["throughput_rps"], current["throughput_rps"])}
+        changes.update({key: _change(old[key], current[key]) for key in LATENCY_KEYS})
+        workloads[name] = {
+            "base": {key: old[key] for key in changes},
+            "new": {key: current[key] for key in changes},
+            "change_pct": changes,
+        }
+        throughput = changes["throughput_rps"]
+        if throughput is not None and throughput < -threshold:
+            regressions.append(f"{name}: throughput {throughput}%")
+        for key in LATENCY_KEYS:
+            if changes[key] is not None and changes[key] > threshold:
+                regressions.append(f"{name}: {key} +{changes[key]}%")
+    return {
+        "base_commit": base["meta"].get("commit"),
+        "new_commit": new["meta"].get("commit"),
+        "threshold_pct": threshold,
+        "workloads": workloads,
+        "regressions": regressions,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("base")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=10.0, help="allowed change in percent")
+    args = parser.parse_args()
+    with open(args.base) as f:
+        base = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+    result = compare(base, new, args.threshold)
+    print(json.dumps(result, indent=2))
+    sys.exit(1 if result["regressions"] else 0)
+
+
+if __name__ == "__main__":
+    main()
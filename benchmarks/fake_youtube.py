@@ -0,0 +1,106 @@
+"""
+Offline stand-in for YouTube, patched into YouTubeTranscriptApi for benchmarks.
+
+Every upstream call (listing a video's transcripts, fetching one) sleeps for
+`latency_ms` ± `jitter_ms` on the calling pool thread, like a real HTTP round
+trip, and then fails with probability `error_rate`. Video IDs starting with
+"dead-" are always unavailable. Transcripts are synthetic and deterministic.
+"""
+import random
+import threading
+import time
+from typing import List
+
+from youtube_transcript_api import (
+    FetchedTranscript,
+    FetchedTranscriptSnippet,
+    NoTranscriptFound,
+    RequestBlocked,
+    TranscriptsDisabled,
+    VideoUnavailable,
+    YouTubeTranscriptApi,
+)
+
+from benchmarks.bench_cache_codec import synthetic_record
+
+# Failures drawn for error_rate, roughly in the proportions seen in production logs
+_RANDOM_ERRORS = (VideoUnavailable, VideoUnavailable, TranscriptsDisabled, RequestBlocked)
+
+
+class _Transcript:
+    def __init__(self, backend: "FakeYouTube", video_id: str, language_code: str):
+        self.backend = backend
+        self.video_id = video_id
+        self.language_code = language_code
+        self.language = "English" if language_code == "en" else language_code
+        self.is_generated = False
+
+    def fetch(self) -> FetchedTranscript:
+        self.backend._call(self.video_id)
+        return FetchedTranscript(
+            snippets=self.backend.snippets,
+            video_id=self.video_id,
+            language=self.language,
+            language_code=self.language_code,
+            is_generated=self.is_generated,
+        )
+
+
+class _TranscriptList:
+    def __init__(self, backend: "FakeYouTube", video_id: str):
+        self.video_id = video_id
+        self._transcripts = [_Transcript(backend, video_id, code) for code in backend.languages]
+
+    def __iter__(self):
+        return iter(self._transcripts)
+
+    def find_transcript(self, language_codes):
+        for code in language_codes:
+            for transcript in self._transcripts:
+                if transcript.language_code == code:
+                    return transcript
+        raise NoTranscriptFound(self.video_id, language_codes, self)
+
+
+class FakeYouTube:
+    def __init__(
+        self,
+        latency_ms: float = 200.0,
+        jitter_ms: float = 50.0,
+        error_rate: float = 0.0,
+        snippets: int = 1500,
+        languages: List[str] = ("en",),
+        seed: int = 42,
+    ):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.languages = list(languages)
+        self.snippets = [
+            FetchedTranscriptSnippet(text=text, start=start, duration=duration)
+            for start, duration, text in synthetic_record(snippets, seed)["snippets"]
+        ]
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "errors": 0}
+
+    def _call(self, video_id: str) -> None:
+        with self._lock:
+            self.stats["calls"] += 1
+            delay = max(0.0, self.latency_ms + self._rng.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+            fail = video_id.startswith("dead-") or self._rng.random() < self.error_rate
+            error_cls = VideoUnavailable if video_id.startswith("dead-") else self._rng.choice(_RANDOM_ERRORS)
+        time.sleep(delay)
+        if fail:
+            with self._lock:
+                self.stats["errors"] += 1
+            raise error_cls(video_id)
+
+    def list(self, video_id: str) -> _TranscriptList:
+        self._call(video_id)
+        return _TranscriptList(self, video_id)
+
+    def install(self) -> None:
+        """Route every YouTubeTranscriptApi client (including the fetch pool's) to this backend."""
+        backend = self
+        YouTubeTranscriptApi.list = lambda api, video_id: backend.list(video_id)
@@ -0,0 +1,292 @@
+"""
+End-to-end load test: the FastAPI app in-process (httpx ASGI transport, no sockets)
+against a fake YouTube backend, fakeredis or a local Redis, and SQLite or Postgres.
+
+Usage:
+    python -m benchmarks.loadtest [--workloads cache-hit,revalidate,cache-miss,stampede,limiter-heavy]
+        [--requests 2000] [--concurrency 50] [--redis fake|redis://localhost:6379/15]
+        [--redis-rtt-ms 0.2] [--db-url sqlite:///...] [--upstream-latency-ms 200]
+        [--upstream-jitter-ms 50] [--upstream-error-rate 0] [--snippets 1500]
+        [--output results.json]
+
+Workloads:
+    cache-hit      GET /v1/transcripts over a small set of pre-warmed videos
+    revalidate     the same, sending each video's ETag in If-None-Match (304s)
+    cache-miss     every request is a new video (upstream fetch, archive write)
+    stampede       waves of `concurrency` simultaneous requests for one cold video
+    limiter-heavy  free-tier keys with a small quota hammering a cached video (200s and 429s)
+    cold-auth      a new API key per request on a cached video: every request resolves its key in the DB
+
+Prints one JSON document (metadata + per-workload throughput, p50/p95/p99 and
+status counts); compare two of them with `python -m benchmarks.compare`.
+Needs: pip install -r benchmarks/requirements.txt
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import secrets
+import subprocess
+import tempfile
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+
+from benchmarks.bench_limiter import _install_fake_redis, _percentiles
+
+WORKLOADS = ("cache-hit", "revalidate", "cache-miss", "stampede", "limiter-heavy", "cold-auth")
+
+
+def _configure_environment(args) -> None:
+    """Settings the app reads at import time; must run before anything under app/ is imported."""
+    os.environ["POSTGRES_URL"] = args.db_url or f"sqlite:///{tempfile.mkdtemp(prefix='yt-bench-')}/bench.db"
+    if args.redis != "fake":
+        os.environ["REDIS_URL"] = args.redis
+    # Only limiter-heavy should ever see a 429
+    os.environ["RL_FREE_LIMIT"] = str(args.free_limit)
+    os.environ.setdefault("RL_ENT_LIMIT", str(10**9))
+    if args.redis == "fake":
+        _install_fake_redis(args.redis_rtt_ms)
+
+
+def _git_revision() -> dict:
+    def git(*cmd):
+        return subprocess.run(["git", *cmd], capture_output=True, text=True).stdout.strip()
+
+    try:
+        return {"commit": git("rev-parse", "HEAD"), "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+    except OSError:
+        return {"commit": None, "dirty": None}
+
+
+@asynccontextmanager
+async def _lifespan(app):
+    """Run the app's startup/shutdown handlers (httpx's ASGI transport doesn't)."""
+    receive_queue: asyncio.Queue = asyncio.Queue()
+    send_queue: asyncio.Queue = asyncio.Queue()
+    scope = {"type": "lifespan", "asgi": {"version": "3.0"}}
+    task = asyncio.ensure_future(app(scope, receive_queue.get, send_queue.put))
+    await receive_queue.put({"type": "lifespan.startup"})
+    message = await send_queue.get()
+    if message["type"] != "lifespan.startup.complete":
+        raise RuntimeError(f"App startup failed: {message}")
+    try:
+        yield
+    finally:
+        await receive_queue.put({"type": "lifespan.shutdown"})
+        await send_queue.get()
+        await task
+
+
+def _create_users(tier: str, count: int) -> list:
+    """Insert users directly (registering through the API would benchmark bcrypt)."""
+    from app import auth, models
+    from app.database import SessionLocal
+
+    password = auth.hash_password("benchmark")
+    keys = [secrets.token_hex(16) for _ in range(count)]
+    db = SessionLocal()
+    try:
+        for key in keys:
+            db.add(models.User(name="bench", email=f"{key}@bench.local", password=password, api_key=key, tier=tier))
+        db.commit()
+    finally:
+        db.close()
+    return keys
+
+
+async def _drive(client, make_request, requests: int, concurrency: int) -> dict:
+    """Send `requests` requests from `concurrency` concurrent clients; make_request(i) -> (params, headers)."""
+    samples, statuses = [], Counter()
+    queue = iter(range(requests))
+
+    async def worker():
+        for i in queue:
+            params, headers = make_request(i)
+            t0 = time.perf_counter()
+            response = await client.get("/v1/transcripts", params=params, headers=headers)
+            samples.append(time.perf_counter() - t0)
+            statuses[str(response.status_code)] += 1
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - t0
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(requests / elapsed, 1),
+        **_percentiles(samples),
+        "status": dict(sorted(statuses.items())),
+    }
+
+
+async def _cache_hit(client, backend, args) -> dict:
+    (key,) = _create_users("enterprise", 1)
+    headers = {"x-api-key": key}
+    videos = [f"{args.run_id}-hit-{i}" for i in range(args.videos)]
+    await _drive(client, lambda i: ({"video_id": videos[i]}, headers), len(videos), args.concurrency)
+    return await _drive(
+        client, lambda i: ({"video_id": videos[i % len(videos)]}, headers), args.requests, args.concurrency
+    )
+
+
+async def _revalidate(client, backend, args) -> dict:
+    (key,) = _create_users("enterprise", 1)
+    videos = [f"{args.run_id}-etag-{i}" for i in range(args.videos)]
+    etags = []
+    for video_id in videos:
+        response = await client.get("/v1/transcripts", params={"video_id": video_id}, headers={"x-api-key": key})
+        etags.append(response.headers["etag"])
+    return await _drive(
+        client,
+        lambda i: ({"video_id": videos[i % len(videos)]}, {"x-api-key": key, "if-none-match": etags[i % len(videos)]}),
+        args.requests,
+        args.concurrency,
+    )
+
+
+async def _cache_miss(client, backend, args) -> dict:
+    (key,) = _create_users("enterprise", 1)
+    headers = {"x-api-key": key}
+    return await _drive(
+        client, lambda i: ({"video_id": f"{args.run_id}-miss-{i}"}, headers), args.requests, args.concurrency
+    )
+
+
+async def _stampede(client, backend, args) -> dict:
+    (key,) = _create_users("enterprise", 1)
+    headers = {"x-api-key": key}
+    waves = max(1, args.requests // args.concurrency)
+    # One wave at a time: `concurrency` clients ask for the same cold video at once
+    results, calls_before = [], backend.stats["calls"]
+    for wave in range(waves):
+        params = {"video_id": f"{args.run_id}-stampede-{wave}"}
+        results.append(await _drive(client, lambda i: (params, headers), args.concurrency, args.concurrency))
+    # Two upstream calls (list + fetch) per video fetched
+    elapsed = sum(result["elapsed_s"] for result in results)
+    statuses = Counter()
+    for result in results:
+        statuses.update(result["status"])
+    return {
+        "requests": waves * args.concurrency,
+        "concurrency": args.concurrency,
+        "waves": waves,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(waves * args.concurrency / elapsed, 1),
+        "p50_ms": sorted(result["p50_ms"] for result in results)[len(results) // 2],
+        "p95_ms": max(result["p95_ms"] for result in results),
+        "p99_ms": max(result["p99_ms"] for result in results),
+        "status": dict(sorted(statuses.items())),
+        "upstream_fetches_per_wave": round((backend.stats["calls"] - calls_before) / 2 / waves, 2),
+    }
+
+
+async def _limiter_heavy(client, backend, args) -> dict:
+    keys = _create_users("free", args.limiter_keys)
+    video = {"video_id": f"{args.run_id}-limiter"}
+    await client.get("/v1/transcripts", params=video, headers={"x-api-key": _create_users("enterprise", 1)[0]})
+    result = await _drive(
+        client, lambda i: (video, {"x-api-key": keys[i % len(keys)]}), args.requests, args.concurrency
+    )
+    result["keys"] = len(keys)
+    result["quota_per_key"] = args.free_limit
+    return result
+
+
+async def _cold_auth(client, backend, args) -> dict:
+    keys = _create_users("enterprise", args.requests)
+    video = {"video_id": f"{args.run_id}-auth"}
+    await client.get("/v1/transcripts", params=video, headers={"x-api-key": keys[0]})
+    return await _drive(client, lambda i: (video, {"x-api-key": keys[i]}), args.requests, args.concurrency)
+
+
+_RUNNERS = {
+    "cache-hit": _cache_hit,
+    "revalidate": _revalidate,
+    "cache-miss": _cache_miss,
+    "stampede": _stampede,
+    "limiter-heavy": _limiter_heavy,
+    "cold-auth": _cold_auth,
+}
+
+
+async def run(args) -> dict:
+    import httpx
+
+    from app.main import app
+    from app.logger import logger
+    from app.services.fetch_pool import fetch_pool
+    from benchmarks.fake_youtube import FakeYouTube
+
+    logger.setLevel(args.log_level)
+    backend = FakeYouTube(
+        latency_ms=args.upstream_latency_ms,
+        jitter_ms=args.upstream_jitter_ms,
+        error_rate=args.upstream_error_rate,
+        snippets=args.snippets,
+    )
+    backend.install()
+
+    results = {}
+    async with _lifespan(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for name in args.workloads:
+                calls_before = backend.stats["calls"]
+                results[name] = await _RUNNERS[name](client, backend, args)
+                results[name]["upstream_calls"] = backend.stats["calls"] - calls_before
+    fetch_pool.shutdown()
+
+    return {
+        "meta": {
+            **_git_revision(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "config": {k: v for k, v in vars(args).items() if k != "output"},
+        },
+        "workloads": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workloads", default=",".join(WORKLOADS), help="comma-separated subset of the workloads")
+    parser.add_argument("--requests", type=int, default=2000, help="requests per workload")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--videos", type=int, default=100, help="distinct videos in cache-hit")
+    parser.add_argument("--limiter-keys", type=int, default=50, help="free-tier API keys in limiter-heavy")
+    parser.add_argument("--free-limit", type=int, default=20, help="free-tier quota per key")
+    parser.add_argument("--redis", default="fake", help="'fake' (fakeredis) or a Redis URL")
+    parser.add_argument("--redis-rtt-ms", type=float, default=0.2, help="injected per-command latency with fakeredis")
+    parser.add_argument("--db-url", default=None, help="SQLAlchemy URL; default: a fresh SQLite file")
+    parser.add_argument("--upstream-latency-ms", type=float, default=200.0, help="per upstream call (list, fetch)")
+    parser.add_argument("--upstream-jitter-ms", type=float, default=50.0)
+    parser.add_argument("--upstream-error-rate", type=float, default=0.0)
+    parser.add_argument("--snippets", type=int, default=1500, help="snippets per transcript (~1h video)")
+    parser.add_argument("--log-level", default="WARNING", help="app log level during the run")
+    parser.add_argument("--output", default=None, help="also write the JSON here")
+    args = parser.parse_args()
+
+    # Video IDs are unique per run, so a shared Redis/DB never turns misses into hits
+    args.run_id = secrets.token_hex(4)
+    args.workloads = [name.strip() for name in args.workloads.split(",") if name.strip()]
+    unknown = set(args.workloads) - set(WORKLOADS)
+    if unknown:
+        parser.error(f"unknown workloads: {', '.join(sorted(unknown))}")
+
+    _configure_environment(args)
+
+    result = asyncio.run(run(args))
+    text = json.dumps(result, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Shared test setup.
+
+fakeredis (with Lua via lupa) stands in for Redis and a throwaway SQLite file
+for Postgres. Both are wired up before `app` is imported, since the Redis
+clients and database engines are created at import time.
+"""
+import os
+import secrets
+import tempfile
+
+import fakeredis
+import httpx
+import pytest
+import redis.asyncio as redis
+
+os.environ.setdefault("POSTGRES_URL", f"sqlite:///{tempfile.mkdtemp(prefix='yt-test-')}/test.db")
+
+_server = fakeredis.FakeServer()
+redis.Redis.from_url = staticmethod(lambda url, **kw: fakeredis.aioredis.FakeRedis(server=_server, **kw))
+
+from youtube_transcript_api import YouTubeTranscriptApi  # noqa: E402
+
+from app import models  # noqa: E402
+from app.main import app  # noqa: E402  (also creates the tables)
+from app.database import SessionLocal  # noqa: E402
+from app.limiting.redis_client import r, rb  # noqa: E402
+from app.services.cache_service import l1_cache  # noqa: E402
+from benchmarks.fake_youtube import FakeYouTube  # noqa: E402
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture(autouse=True)
+def _clean_state():
+    """Every test starts with an empty Redis and L1 cache."""
+    fakeredis.FakeStrictRedis(server=_server).flushall()
+    # Pooled connections belong to the previous test's event loop
+    r.connection_pool.reset()
+    rb.connection_pool.reset()
+    l1_cache.clear()
+    yield
+    l1_cache.clear()
+
+
+@pytest.fixture
+def youtube(monkeypatch):
+    """Offline YouTube: instant, deterministic transcripts; "dead-*" videos are unavailable."""
+    backend = FakeYouTube(latency_ms=0, jitter_ms=0, snippets=20)
+    monkeypatch.setattr(YouTubeTranscriptApi, "list", lambda api, video_id: backend.list(video_id))
+    return backend
+
+
+@pytest.fixture
+def api_key():
+    """A pro-tier user inserted directly (registering through the API would run bcrypt)."""
+    key = secrets.token_hex(16)
+    db = SessionLocal()
+    try:
+        db.add(models.User(name="test", email=f"{key}@test.local", password="x", api_key=key, tier="pro"))
+        db.commit()
+    finally:
+        db.close()
+    return key
+
+
+@pytest.fixture
+async def client():
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as c:
+        yield c
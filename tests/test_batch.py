@@ -0,0 +1,67 @@
+import time
+
+import pytest
+
+from app.limiting.deps import tiered_bucket
+from app.limiting.redis_client import r
+from app.services import transcript_service
+from app.services.cache_service import CacheService, l1_cache
+from benchmarks.bench_cache_codec import synthetic_record
+
+pytestmark = pytest.mark.anyio
+
+
+async def _batch(client, api_key, video_ids):
+    return await client.post(
+        "/v1/transcripts/batch", json={"video_ids": video_ids}, headers={"x-api-key": api_key}
+    )
+
+
+def _bucket_key(api_key: str) -> str:
+    period = int(tiered_bucket.tier_limits["pro"]["period"])
+    now = int(time.time())
+    return tiered_bucket._bucket_key(api_key, "pro", now - now % period)
+
+
+def _record(video_id: str, language_code: str) -> dict:
+    return {**synthetic_record(10), "video_id": video_id, "language_code": language_code}
+
+
+@pytest.mark.parametrize("in_l1", [True, False])
+async def test_uncataloged_hits_are_found_under_any_default_code(youtube, monkeypatch, in_l1):
+    monkeypatch.setattr(transcript_service, "TRANSCRIPT_DEFAULT_LANGUAGES", ["en", "de"])
+    await CacheService.set_transcript("only-de", "de", _record("only-de", "de"))
+    await CacheService.set_transcript("both", "de", _record("both", "de"))
+    await CacheService.set_transcript("both", "en", _record("both", "en"))
+    if not in_l1:
+        l1_cache.clear()
+
+    results = await transcript_service.get_transcripts_batch(["only-de", "both"])
+
+    assert results["only-de"]["language_code"] == "de"
+    # The first default code wins, as for a single GET
+    assert results["both"]["language_code"] == "en"
+    assert youtube.stats["calls"] == 0
+
+
+async def test_batch_charges_one_token_per_unique_video(client, api_key, youtube):
+    response = await _batch(client, api_key, ["a", "b", "a", "c", " b "])
+
+    assert response.status_code == 200
+    limit = int(response.headers["x-ratelimit-limit"])
+    assert int(response.headers["x-ratelimit-remaining"]) == limit - 3
+    assert int(await r.get(_bucket_key(api_key))) == limit - 3
+    assert youtube.stats["calls"] == 6  # one list and one fetch per video
+
+
+async def test_batch_is_refused_whole_when_tokens_run_short(client, api_key, youtube):
+    await r.set(_bucket_key(api_key), 2, ex=3600)
+
+    response = await _batch(client, api_key, ["a", "b", "c"])
+
+    assert response.status_code == 429
+    assert int(await r.get(_bucket_key(api_key))) == 2  # nothing taken
+    assert youtube.stats["calls"] == 0
+
+    assert (await _batch(client, api_key, ["a", "b"])).status_code == 200
+    assert int(await r.get(_bucket_key(api_key))) == 0
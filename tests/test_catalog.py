@@ -0,0 +1,109 @@
+import asyncio
+import json
+import time
+
+import pytest
+from youtube_transcript_api import VideoUnavailable
+
+from app.config import CACHE_HARD_TTL
+from app.limiting.redis_client import rb
+from app.services import transcript_service
+from app.services.cache_service import CacheService
+from app.utils import build_transcript_payload
+from benchmarks.bench_cache_codec import synthetic_record
+
+pytestmark = pytest.mark.anyio
+
+
+def _gone(youtube, monkeypatch):
+    """The video disappears upstream; every call still counts."""
+
+    def call(video_id):
+        youtube.stats["calls"] += 1
+        raise VideoUnavailable(video_id)
+
+    monkeypatch.setattr(youtube, "_call", call)
+
+
+async def _get(client, api_key, video_id="vid", **params):
+    return await client.get(
+        "/v1/transcripts", params={"video_id": video_id, **params}, headers={"x-api-key": api_key}
+    )
+
+
+async def test_negative_cache_is_used_with_a_cached_catalog(client, api_key, youtube, monkeypatch):
+    youtube.languages = ["en", "de"]
+    assert (await _get(client, api_key, language="en")).status_code == 200
+    assert await CacheService.get_catalog("vid") is not None
+    _gone(youtube, monkeypatch)
+    calls = youtube.stats["calls"]
+
+    statuses = [(await _get(client, api_key, language="de")).status_code for _ in range(5)]
+
+    assert statuses == [404] * 5
+    assert youtube.stats["calls"] == calls + 1
+
+
+async def test_legacy_default_entry_is_served_and_moved(client, api_key, youtube):
+    record = synthetic_record(20)
+    record["video_id"] = "vid"
+    legacy = json.dumps(build_transcript_payload(record))
+    await rb.set("transcript:vid:default", legacy, ex=CACHE_HARD_TTL - 3600)  # an hour old
+
+    response = await _get(client, api_key)
+
+    assert response.status_code == 200
+    assert response.json()["data"]["transcript_with_timestamps"] == json.loads(legacy)["transcript_with_timestamps"]
+    assert not await rb.exists("transcript:vid:default")
+    assert await rb.exists("transcript:vid:en")
+    # Moved with its age (recovered from the legacy key's TTL), so it is refreshed on schedule
+    cached_at = (await CacheService.get_entry("vid", "en")).record["cached_at"]
+    assert cached_at == pytest.approx(time.time() - 3600, abs=5)
+    assert (await _get(client, api_key, language="en")).status_code == 200
+    assert youtube.stats["calls"] == 0
+
+
+async def test_default_and_explicit_language_share_one_entry(client, api_key, youtube):
+    default = await _get(client, api_key)
+    explicit = await _get(client, api_key, language="en")
+
+    assert default.status_code == explicit.status_code == 200
+    assert default.content == explicit.content
+    assert youtube.stats["calls"] == 2  # one list + one fetch
+    assert await rb.exists("transcript:vid:en")
+    assert not await rb.exists("transcript:vid:default")
+
+
+async def test_concurrent_aliases_share_one_fetch_once_the_catalog_is_known(client, api_key, youtube):
+    youtube.languages = ["en", "de"]
+    first = await asyncio.gather(*(_get(client, api_key) for _ in range(5)))
+    assert {response.status_code for response in first} == {200}
+    assert youtube.stats["calls"] == 2
+    await CacheService.invalidate("vid", "en")
+
+    again = await asyncio.gather(*(_get(client, api_key, **params) for params in ({}, {"language": "en"}) * 3))
+
+    assert {response.status_code for response in again} == {200}
+    assert youtube.stats["calls"] == 4
+
+
+async def test_unknown_language_is_answered_from_the_catalog(client, api_key, youtube):
+    youtube.languages = ["en", "de"]
+    await _get(client, api_key, language="de")
+    calls = youtube.stats["calls"]
+
+    responses = [await _get(client, api_key, language="fr") for _ in range(3)]
+
+    assert [response.status_code for response in responses] == [422] * 3
+    assert youtube.stats["calls"] == calls
+
+
+async def test_default_follows_the_configured_language_order(client, api_key, youtube, monkeypatch):
+    monkeypatch.setattr(transcript_service, "TRANSCRIPT_DEFAULT_LANGUAGES", ["de", "en"])
+    youtube.languages = ["en", "de"]
+
+    response = await _get(client, api_key)
+
+    assert response.json()["data"]["language_code"] == "de"
+    assert (await _get(client, api_key, language="de")).content == response.content
+    assert youtube.stats["calls"] == 2
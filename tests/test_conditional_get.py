@@ -0,0 +1,146 @@
+import gzip
+
+import brotli
+import pytest
+
+from app.routes import transcripts as routes
+from app.services import transcript_codec
+from app.services.cache_service import CacheService, l1_cache
+
+pytestmark = pytest.mark.anyio
+
+IDENTITY = "identity"
+
+
+async def _get(client, api_key, params=None, if_none_match=None, accept_encoding=IDENTITY):
+    headers = {"x-api-key": api_key, "accept-encoding": accept_encoding}
+    if if_none_match is not None:
+        headers["if-none-match"] = if_none_match
+    return await client.get("/v1/transcripts", params={"video_id": "vid", **(params or {})}, headers=headers)
+
+
+async def test_etag_round_trip(client, api_key, youtube):
+    first = await _get(client, api_key)
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert etag.startswith('"') and not etag.startswith('"W/')
+    assert first.headers["last-modified"]
+    assert "Accept-Encoding" in first.headers["vary"]
+
+    revalidated = await _get(client, api_key, if_none_match=etag)
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+    assert revalidated.headers["etag"] == etag
+    assert revalidated.headers["last-modified"] == first.headers["last-modified"]
+
+    assert (await _get(client, api_key, if_none_match=f'"other", W/{etag}')).status_code == 304
+    assert (await _get(client, api_key, if_none_match='"other"')).status_code == 200
+    assert youtube.stats["calls"] == 2  # list + fetch, once
+
+
+async def test_not_modified_is_answered_from_metadata(client, api_key, youtube, monkeypatch):
+    etag = (await _get(client, api_key)).headers["etag"]
+    l1_cache.clear()
+
+    def no_decode(raw):
+        raise AssertionError("304 must not load the transcript")
+
+    monkeypatch.setattr(transcript_codec, "decode", no_decode)
+
+    assert (await _get(client, api_key, if_none_match=etag)).status_code == 304
+
+
+async def test_unchanged_refetch_keeps_the_etag(client, api_key, youtube):
+    etag = (await _get(client, api_key)).headers["etag"]
+    await CacheService.invalidate("vid", "en")
+    l1_cache.clear()
+
+    refetched = await _get(client, api_key, if_none_match=etag)
+
+    assert refetched.status_code == 304
+    assert youtube.stats["calls"] == 4
+
+
+async def test_each_variant_and_encoding_has_its_own_etag(client, api_key, youtube):
+    cases = [
+        ({}, IDENTITY),
+        ({}, "gzip"),
+        ({}, "br"),
+        ({"format": "srt"}, IDENTITY),
+        ({"format": "srt"}, "gzip"),
+        ({"format": "srt", "stream": "1"}, IDENTITY),
+        ({"stream": "ndjson"}, IDENTITY),
+        ({"format": "json"}, IDENTITY),
+    ]
+    etags = []
+    for params, accept_encoding in cases:
+        response = await _get(client, api_key, params, accept_encoding=accept_encoding)
+        assert response.status_code == 200
+        etags.append(response.headers["etag"])
+        again = await _get(client, api_key, params, if_none_match=etags[-1], accept_encoding=accept_encoding)
+        assert again.status_code == 304, (params, accept_encoding)
+
+    assert len(set(etags)) == len(cases)
+    # A gzip ETag doesn't validate the identity representation
+    assert (await _get(client, api_key, if_none_match=etags[1])).status_code == 200
+
+
+async def test_compressed_bodies_match_identity(client, api_key, youtube):
+    identity = await _get(client, api_key)
+    assert "content-encoding" not in identity.headers
+
+    for encoding, decompress in (("gzip", gzip.decompress), ("br", brotli.decompress)):
+        for _ in range(2):  # compressed on the first request, from the cache on the second
+            async with client.stream(
+                "GET",
+                "/v1/transcripts",
+                params={"video_id": "vid"},
+                headers={"x-api-key": api_key, "accept-encoding": encoding},
+            ) as response:
+                raw = b"".join([chunk async for chunk in response.aiter_raw()])
+            assert response.headers["content-encoding"] == encoding
+            assert decompress(raw) == identity.content
+
+
+async def test_streams_are_never_compressed(client, api_key, youtube):
+    response = await _get(client, api_key, {"stream": "ndjson"}, accept_encoding="gzip, br")
+
+    assert "content-encoding" not in response.headers
+    assert "Accept-Encoding" not in response.headers.get("vary", "")
+
+
+async def test_star_matches_any_existing_transcript(client, api_key, youtube):
+    await _get(client, api_key)
+
+    assert (await _get(client, api_key, if_none_match="*")).status_code == 304
+    # Not cached yet: fetched first, then it exists
+    assert (await _get(client, api_key, {"video_id": "uncached"}, if_none_match="*")).status_code == 304
+    assert (await _get(client, api_key, {"video_id": "dead-1"}, if_none_match="*")).status_code == 404
+
+
+async def test_invalid_request_is_not_short_circuited(client, api_key, youtube):
+    etag = (await _get(client, api_key)).headers["etag"]
+
+    assert (await _get(client, api_key, {"format": "xml"}, if_none_match=etag)).status_code == 422
+    assert (await _get(client, api_key, {"stream": "yes"}, if_none_match=etag)).status_code == 422
+
+
+async def test_not_modified_charges_a_token_unless_disabled(client, api_key, youtube, monkeypatch):
+    first = await _get(client, api_key)
+    etag = first.headers["etag"]
+    remaining = int(first.headers["x-ratelimit-remaining"])
+
+    charged = await _get(client, api_key, if_none_match=etag)
+    assert int(charged.headers["x-ratelimit-remaining"]) == remaining - 1
+
+    monkeypatch.setattr(routes, "NOT_MODIFIED_CONSUMES_TOKEN", False)
+    assert (await _get(client, api_key, if_none_match=etag)).status_code == 304
+    assert int((await _get(client, api_key)).headers["x-ratelimit-remaining"]) == remaining - 2
+
+
+@pytest.mark.parametrize("consumes_token", [True, False])
+async def test_not_modified_requires_a_valid_key(client, api_key, youtube, monkeypatch, consumes_token):
+    monkeypatch.setattr(routes, "NOT_MODIFIED_CONSUMES_TOKEN", consumes_token)
+    etag = (await _get(client, api_key)).headers["etag"]
+
+    assert (await _get(client, "bogus", if_none_match=etag)).status_code == 401
@@ -0,0 +1,364 @@
+import asyncio
+import contextlib
+import hashlib
+import hmac
+import time
+
+import pytest
+import redis
+
+from app import worker
+from app.config import JOB_MAX_ATTEMPTS
+from app.exceptions import TranscriptFetchError, UpstreamBusyError, VideoUnavailableError
+from app.limiting.redis_client import r
+from app.services import job_queue, webhooks
+from app.services.cache_service import CacheService, l1_cache
+
+pytestmark = pytest.mark.anyio
+
+WEBHOOK = "https://hooks.example/job"
+
+
+class _Sent(list):
+    statuses: list
+
+
+@pytest.fixture
+def hooks(monkeypatch):
+    """Webhook POSTs recorded instead of sent; set `hooks.statuses` to script responses."""
+    sent = _Sent()
+
+    def post(url, payload):
+        sent.append((url, payload))
+        return sent.statuses.pop(0) if sent.statuses else 200
+
+    sent.statuses = []
+    monkeypatch.setattr(webhooks, "post", post)
+    return sent
+
+
+@pytest.fixture
+def no_backoff(monkeypatch):
+    """Webhook retry backoff without the wait."""
+    sleep = asyncio.sleep
+    monkeypatch.setattr(asyncio, "sleep", lambda seconds, *args: sleep(0, *args))
+
+
+def _upstream(monkeypatch, *outcomes):
+    """Make the worker's fetches return or raise `outcomes` in order."""
+    outcomes = list(outcomes)
+
+    async def get_transcript(video_id, language=None):
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    monkeypatch.setattr(worker, "get_transcript", get_transcript)
+
+
+async def _reserve(video_id="vid", webhook_url=None) -> dict:
+    await job_queue.create_job(video_id, None, 1, webhook_url)
+    return await job_queue.reserve()
+
+
+async def _deadline(job_id: str) -> float:
+    return await r.zscore(job_queue.INFLIGHT_KEY, job_id)
+
+
+async def test_success_is_acked_and_delivered(monkeypatch, hooks):
+    _upstream(monkeypatch, {"video_id": "vid", "language_code": "en"})
+    job = await _reserve(webhook_url=WEBHOOK)
+
+    await worker.process(job)
+
+    stored = await job_queue.get_job(job["id"])
+    assert stored["status"] == "succeeded"
+    assert stored["language_code"] == "en"
+    assert stored["webhook"] == "delivered"
+    assert await _deadline(job["id"]) is None
+    assert hooks == [(WEBHOOK, {
+        "job_id": job["id"],
+        "status": "succeeded",
+        "video_id": "vid",
+        "language": None,
+        "data": {"video_id": "vid", "language_code": "en"},
+    })]
+
+
+async def test_transient_failure_is_retried_with_backoff(monkeypatch):
+    _upstream(monkeypatch, TranscriptFetchError(), {"video_id": "vid", "language_code": "en"})
+    job = await _reserve()
+
+    await worker.process(job)
+
+    stored = await job_queue.get_job(job["id"])
+    assert stored["status"] == "queued"
+    assert await _deadline(job["id"]) == pytest.approx(time.time() + 2, abs=1)
+    # Not visible again until the backoff has passed
+    assert await job_queue.requeue_expired() == 0
+    assert await job_queue.reserve() is None
+
+    await r.zadd(job_queue.INFLIGHT_KEY, {job["id"]: 0})
+    assert await job_queue.requeue_expired() == 1
+    retried = await job_queue.reserve()
+    assert retried["id"] == job["id"]
+    assert retried["attempts"] == "2"
+
+    await worker.process(retried)
+    assert (await job_queue.get_job(job["id"]))["status"] == "succeeded"
+
+
+async def test_retry_after_from_upstream_is_honoured(monkeypatch):
+    _upstream(monkeypatch, UpstreamBusyError(retry_after=30))
+    job = await _reserve()
+
+    await worker.process(job)
+
+    assert await _deadline(job["id"]) == pytest.approx(time.time() + 30, abs=1)
+
+
+async def test_permanent_failure_is_final(monkeypatch, hooks):
+    _upstream(monkeypatch, VideoUnavailableError())
+    job = await _reserve(webhook_url=WEBHOOK)
+
+    await worker.process(job)
+
+    stored = await job_queue.get_job(job["id"])
+    assert stored["status"] == "failed"
+    assert (stored["error_code"], stored["error_message"]) == ("404", "Video unavailable")
+    assert await _deadline(job["id"]) is None
+    assert hooks[0][1]["error"] == {"code": 404, "message": "Video unavailable"}
+
+
+async def test_transient_failure_on_the_last_attempt_is_final(monkeypatch):
+    _upstream(monkeypatch, TranscriptFetchError())
+    job = await _reserve()
+    job["attempts"] = str(JOB_MAX_ATTEMPTS)
+
+    await worker.process(job)
+
+    stored = await job_queue.get_job(job["id"])
+    assert stored["status"] == "failed"
+    assert stored["error_code"] == "500"
+
+
+async def test_crash_is_retried_then_fails(monkeypatch):
+    _upstream(monkeypatch, RuntimeError("boom"), RuntimeError("boom"))
+    job = await _reserve()
+
+    await worker.process(job)
+    assert (await job_queue.get_job(job["id"]))["status"] == "queued"
+
+    job["attempts"] = str(JOB_MAX_ATTEMPTS)
+    await worker.process(job)
+    stored = await job_queue.get_job(job["id"])
+    assert stored["status"] == "failed"
+    assert stored["error_message"] == "Failed to fetch transcript"
+
+
+async def test_job_requeued_too_often_is_abandoned(monkeypatch):
+    _upstream(monkeypatch)  # must not be called
+    job = await _reserve()
+    job["attempts"] = str(JOB_MAX_ATTEMPTS + 1)
+
+    await worker.process(job)
+
+    stored = await job_queue.get_job(job["id"])
+    assert stored["status"] == "failed"
+    assert stored["error_message"] == f"Job abandoned after {JOB_MAX_ATTEMPTS} attempts"
+
+
+async def test_unacked_job_comes_back_after_visibility_timeout():
+    await job_queue.create_job("vid", None, 1)
+    crashed = await job_queue.reserve(visibility=-1)
+
+    assert await job_queue.reserve() is None
+    assert await job_queue.requeue_expired() == 1
+    again = await job_queue.reserve()
+    assert again["id"] == crashed["id"]
+    assert again["attempts"] == "2"
+
+
+async def test_expired_job_record_is_dropped():
+    job = await job_queue.create_job("vid", None, 1)
+    await r.delete(f"job:{job['id']}")
+
+    assert await job_queue.reserve() is None
+    assert await job_queue.depth() == {"queued": 0, "in_flight": 0}
+
+
+async def test_consumer_survives_a_failed_ack(monkeypatch):
+    _upstream(monkeypatch, {"video_id": "a", "language_code": "en"}, {"video_id": "b", "language_code": "en"})
+    acked = []
+
+    async def succeed(job_id, language_code):
+        if not acked:
+            acked.append(None)
+            raise redis.ConnectionError("Redis went away")
+        acked.append(job_id)
+
+    monkeypatch.setattr(job_queue, "succeed", succeed)
+    first = await job_queue.create_job("a", None, 1)
+    second = await job_queue.create_job("b", None, 1)
+    stopping = asyncio.Event()
+
+    consumer = asyncio.ensure_future(worker._consume(stopping))
+    for _ in range(100):
+        if len(acked) == 2:
+            break
+        await asyncio.sleep(0.01)
+    stopping.set()
+    await consumer
+
+    assert acked == [None, second["id"]]
+    # The un-acked job stays reserved and is re-queued by its visibility timeout
+    assert await _deadline(first["id"]) is not None
+
+
+async def test_heartbeat_survives_failed_extends(monkeypatch):
+    monkeypatch.setattr(worker, "JOB_VISIBILITY_TIMEOUT", 0.03)
+    calls = []
+
+    async def extend(job_id):
+        calls.append(job_id)
+        if len(calls) == 1:
+            raise redis.ConnectionError("Redis went away")
+
+    monkeypatch.setattr(job_queue, "extend", extend)
+
+    heartbeat = asyncio.ensure_future(worker._heartbeat("job"))
+    await asyncio.sleep(0.1)
+    heartbeat.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await heartbeat
+
+    assert len(calls) >= 2
+
+
+async def test_webhook_is_retried_until_delivered(hooks, no_backoff):
+    hooks.statuses = [500, 502, 204]
+    job = {"id": "job", "webhook_url": WEBHOOK}
+    await job_queue.set_fields("job", status="succeeded")
+
+    await worker._notify(job, {"status": "succeeded"})
+
+    assert len(hooks) == 3
+    assert (await job_queue.get_job("job"))["webhook"] == "delivered"
+
+
+async def test_unsafe_webhook_is_not_retried(monkeypatch, no_backoff):
+    calls = []
+
+    def post(url, payload):
+        calls.append(url)
+        raise webhooks.UnsafeWebhookError("private address")
+
+    monkeypatch.setattr(webhooks, "post", post)
+    await worker._notify({"id": "job", "webhook_url": "http://10.0.0.1/"}, {})
+
+    assert len(calls) == 1
+    assert (await job_queue.get_job("job"))["webhook"] == "failed"
+
+
+async def test_failing_to_record_the_webhook_outcome_is_not_fatal(monkeypatch, hooks):
+    async def set_fields(job_id, **fields):
+        raise redis.ConnectionError("Redis went away")
+
+    monkeypatch.setattr(job_queue, "set_fields", set_fields)
+
+    await worker._notify({"id": "job", "webhook_url": WEBHOOK}, {})
+
+    assert len(hooks) == 1
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "http://127.0.0.1/hook",
+        "http://10.1.2.3/hook",
+        "http://169.254.169.254/latest/meta-data",
+        "http://[::1]/hook",
+        "http://[::ffff:192.168.0.1]/hook",
+        "http://224.0.0.1/hook",
+        "http://localhost/hook",
+        "ftp://8.8.8.8/hook",
+        "http:///hook",
+    ],
+)
+def test_webhook_urls_must_be_public(url):
+    with pytest.raises(webhooks.UnsafeWebhookError):
+        webhooks.check_url(url)
+
+
+def test_public_webhook_url_is_accepted():
+    webhooks.check_url("https://8.8.8.8:8443/hook")
+
+
+def test_webhook_signature(monkeypatch):
+    monkeypatch.setattr(webhooks, "JOB_WEBHOOK_SECRET", "s3cret")
+    body = b'{"status":"succeeded"}'
+
+    expected = hmac.new(b"s3cret", body, hashlib.sha256).hexdigest()
+    assert webhooks.sign(body) == f"sha256={expected}"
+
+    monkeypatch.setattr(webhooks, "JOB_WEBHOOK_SECRET", "")
+    assert webhooks.sign(body) is None
+
+
+def test_webhook_post_is_signed_and_does_not_follow_redirects(monkeypatch):
+    monkeypatch.setattr(webhooks, "JOB_WEBHOOK_SECRET", "s3cret")
+    monkeypatch.setattr(webhooks, "check_url", lambda url: None)
+    sent = {}
+
+    class Response:
+        status_code = 302
+
+    def post(url, data, headers, timeout, allow_redirects):
+        sent.update(url=url, data=data, headers=headers, allow_redirects=allow_redirects)
+        return Response()
+
+    monkeypatch.setattr(webhooks._session, "post", post)
+
+    assert webhooks.post(WEBHOOK, {"status": "failed"}) == 302
+    assert sent["allow_redirects"] is False
+    assert sent["headers"][webhooks.SIGNATURE_HEADER] == webhooks.sign(sent["data"])
+
+
+async def test_create_job_rejects_private_webhook(client, api_key):
+    response = await client.post(
+        "/v1/transcripts/jobs",
+        json={"video_id": "vid", "webhook_url": "http://169.254.169.254/latest"},
+        headers={"x-api-key": api_key},
+    )
+
+    assert response.status_code == 422
+    assert await job_queue.depth() == {"queued": 0, "in_flight": 0}
+
+
+async def test_poll_never_fetches_upstream(client, api_key, youtube):
+    headers = {"x-api-key": api_key}
+    created = await client.post("/v1/transcripts/jobs", json={"video_id": "vid"}, headers=headers)
+    job_id = created.json()["data"]["job_id"]
+    assert (await client.get(f"/v1/transcripts/jobs/{job_id}", headers=headers)).json()["data"]["status"] == "queued"
+
+    await worker.process(await job_queue.reserve())
+    calls = youtube.stats["calls"]
+
+    done = (await client.get(f"/v1/transcripts/jobs/{job_id}", headers=headers)).json()["data"]
+    assert done["status"] == "succeeded"
+    assert done["transcript"]["video_id"] == "vid"
+
+    await CacheService.invalidate("vid", "en")
+    l1_cache.clear()
+    expired = await client.get(f"/v1/transcripts/jobs/{job_id}", headers=headers)
+    assert expired.status_code == 410
+    assert youtube.stats["calls"] == calls
+
+
+async def test_jobs_are_private_to_their_owner(client, api_key):
+    job = await job_queue.create_job("vid", None, user_id=-1)
+
+    response = await client.get(f"/v1/transcripts/jobs/{job['id']}", headers={"x-api-key": api_key})
+
+    assert response.status_code == 404
@@ -0,0 +1,91 @@
+import time
+
+import pytest
+
+from app.limiting.leasing import LeasingTokenBucketLimiter
+from app.limiting.persistent import TieredTokenBucketLimiter
+from app.limiting.redis_client import r
+
+pytestmark = pytest.mark.anyio
+
+TIERS = {
+    "free": {"limit": 5, "period": 60},
+    "leased": {"limit": 1000, "period": 60, "lease": 1},
+}
+
+
+def _limiter() -> LeasingTokenBucketLimiter:
+    return LeasingTokenBucketLimiter(TieredTokenBucketLimiter(TIERS))
+
+
+async def _tokens_in_redis(limiter, tier="leased") -> int:
+    now = int(time.time())
+    return int(await r.get(limiter.bucket._bucket_key("k", tier, now - now % 60)))
+
+
+async def test_requests_are_served_from_a_local_lease():
+    limiter = _limiter()
+
+    results = [await limiter.check("k", "leased") for _ in range(5)]
+
+    assert all(allowed for allowed, _, _, _ in results)
+    assert [remaining for _, _, remaining, _ in results] == [999, 998, 997, 996, 995]
+    assert limiter.stats["refills"] == 1
+    assert limiter.stats["local"] == 4
+
+
+async def test_idle_leases_return_unused_tokens():
+    limiter = _limiter()
+    await limiter.check("k", "leased")
+    leased = 1000 - await _tokens_in_redis(limiter)
+    assert leased > 1
+
+    await limiter.release_idle(idle_seconds=-1)
+
+    assert await _tokens_in_redis(limiter) == 999
+    assert limiter.stats["returned_tokens"] == leased - 1
+    assert not limiter._leases
+
+
+async def test_close_returns_every_lease():
+    limiter = _limiter()
+    for _ in range(3):
+        await limiter.check("k", "leased")
+
+    await limiter.close()
+
+    assert await _tokens_in_redis(limiter) == 997
+
+
+async def test_tokens_are_not_returned_to_an_expired_bucket():
+    limiter = _limiter()
+    await limiter.check("k", "leased")
+    await r.flushall()
+
+    await limiter.release_idle(idle_seconds=-1)
+
+    assert limiter.stats["returned_tokens"] == 0
+    assert not await r.keys("*")
+
+
+async def test_denial_hands_back_a_partial_grant():
+    limiter = _limiter()
+    now = int(time.time())
+    await r.set(limiter.bucket._bucket_key("k", "leased", now - now % 60), 2, ex=60)
+
+    allowed, _, remaining, _ = await limiter.check("k", "leased", cost=3)
+
+    assert not allowed
+    assert remaining == 2
+    assert await _tokens_in_redis(limiter) == 2
+    assert not limiter._leases
+
+
+async def test_tiers_without_leasing_go_straight_to_redis():
+    limiter = _limiter()
+
+    results = [await limiter.check("k", "free") for _ in range(6)]
+
+    assert [allowed for allowed, _, _, _ in results] == [True] * 5 + [False]
+    assert limiter.stats["refills"] == 0
+    assert await _tokens_in_redis(limiter, "free") == 0
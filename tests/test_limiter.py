@@ -0,0 +1,78 @@
+import time
+
+import pytest
+
+from app.limiting.persistent import RedisLimiter, TieredTokenBucketLimiter, TokenBucketLimiter
+from app.limiting.redis_client import r
+
+pytestmark = pytest.mark.anyio
+
+TIERS = {
+    "free": {"limit": 3, "period": 60},
+    "pro": {"limit": 10, "period": 60},
+}
+
+
+async def test_fixed_window_counts_and_arms_expiry_once():
+    limiter = RedisLimiter(limit=2, period_seconds=60)
+
+    results = [await limiter.check("k") for _ in range(3)]
+
+    assert [allowed for allowed, _, _, _ in results] == [True, True, False]
+    assert [remaining for _, _, remaining, _ in results] == [1, 0, 0]
+    assert await r.get("user:k:count") == "3"
+    assert 0 < await r.ttl("user:k:count") <= 60
+    _, _, _, reset_ts = results[-1]
+    assert reset_ts <= int(time.time()) + 60
+
+
+async def test_fixed_window_repairs_a_key_without_expiry():
+    await r.set("user:k:count", 5)
+    limiter = RedisLimiter(limit=10, period_seconds=60)
+
+    allowed, _, remaining, _ = await limiter.check("k")
+
+    assert allowed and remaining == 4
+    assert await r.ttl("user:k:count") > 0
+
+
+async def test_token_bucket_drains_then_denies():
+    limiter = TokenBucketLimiter(limit=2, period_seconds=60)
+    now = int(time.time())
+
+    results = [await limiter.check("k") for _ in range(3)]
+
+    assert [(allowed, remaining) for allowed, _, remaining, _ in results] == [(True, 1), (True, 0), (False, 0)]
+    _, _, _, reset_ts = results[0]
+    assert now < reset_ts <= now + 60
+
+
+async def test_tiered_bucket_cost_is_all_or_nothing():
+    limiter = TieredTokenBucketLimiter(TIERS)
+
+    assert (await limiter.check("k", "pro", cost=7))[:3] == (True, 10, 3)
+    # Not enough left for 4: nothing is taken
+    assert (await limiter.check("k", "pro", cost=4))[:3] == (False, 10, 3)
+    assert (await limiter.check("k", "pro", cost=3))[:3] == (True, 10, 0)
+    assert (await limiter.check("k", "pro"))[0] is False
+
+
+async def test_tiered_bucket_keeps_tiers_apart_and_expires_with_period():
+    limiter = TieredTokenBucketLimiter(TIERS)
+
+    for _ in range(3):
+        assert (await limiter.check("k", "free"))[0]
+    assert not (await limiter.check("k", "free"))[0]
+    # An upgraded key starts on a fresh bucket
+    assert (await limiter.check("k", "pro"))[:3] == (True, 10, 9)
+
+    now = int(time.time())
+    key = limiter._bucket_key("k", "free", now - now % 60)
+    assert await r.get(key) == "0"
+    assert 0 < await r.ttl(key) <= 60
+
+
+async def test_tiered_bucket_falls_back_to_free_limits():
+    limiter = TieredTokenBucketLimiter(TIERS)
+
+    assert (await limiter.check("k", "unknown"))[:3] == (True, 3, 2)
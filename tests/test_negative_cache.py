@@ -0,0 +1,80 @@
+import pytest
+from youtube_transcript_api import RequestBlocked, VideoUnavailable
+
+from app.exceptions import VideoUnavailableError
+from app.limiting.redis_client import r
+from app.services import transcript_service
+from app.services.cache_service import CacheService, l1_cache
+
+pytestmark = pytest.mark.anyio
+
+
+async def _get(client, api_key, video_id, **params):
+    return await client.get(
+        "/v1/transcripts", params={"video_id": video_id, **params}, headers={"x-api-key": api_key}
+    )
+
+
+def _fail_with(youtube, monkeypatch, error_cls):
+    def call(video_id):
+        youtube.stats["calls"] += 1
+        raise error_cls(video_id)
+
+    monkeypatch.setattr(youtube, "_call", call)
+
+
+async def test_dead_video_is_fetched_once(client, api_key, youtube):
+    statuses = [(await _get(client, api_key, "dead-1")).status_code for _ in range(5)]
+
+    assert statuses == [404] * 5
+    assert youtube.stats["calls"] == 1
+    assert CacheService.negative_stats["hits"] >= 4
+
+
+async def test_dead_video_is_remembered_for_every_language(client, api_key, youtube):
+    assert (await _get(client, api_key, "dead-1", language="en")).status_code == 404
+
+    for language in ("de", "fr", None):
+        params = {"language": language} if language else {}
+        assert (await _get(client, api_key, "dead-1", **params)).status_code == 404
+
+    assert youtube.stats["calls"] == 1
+    assert await r.exists("transcript:neg:dead-1")
+
+
+async def test_negative_entry_survives_l1_loss(client, api_key, youtube):
+    await _get(client, api_key, "dead-1")
+    l1_cache.clear()
+
+    assert (await _get(client, api_key, "dead-1")).status_code == 404
+    assert youtube.stats["calls"] == 1
+
+
+async def test_transient_failures_are_not_remembered(client, api_key, youtube, monkeypatch):
+    _fail_with(youtube, monkeypatch, RequestBlocked)
+
+    statuses = [(await _get(client, api_key, "vid")).status_code for _ in range(3)]
+
+    assert statuses == [500] * 3
+    assert youtube.stats["calls"] == 3
+    assert not await r.keys("transcript:neg:*")
+
+
+async def test_invalidate_forgets_the_failure(client, api_key, youtube, monkeypatch):
+    _fail_with(youtube, monkeypatch, VideoUnavailable)
+    assert (await _get(client, api_key, "vid")).status_code == 404
+    del youtube._call  # the video is back upstream
+    calls = youtube.stats["calls"]
+
+    await CacheService.invalidate("vid", "en")
+
+    assert (await _get(client, api_key, "vid")).status_code == 200
+    assert youtube.stats["calls"] == calls + 2
+
+
+async def test_batch_uses_the_negative_cache(youtube):
+    first = await transcript_service.get_transcripts_batch(["dead-1", "dead-2"])
+    again = await transcript_service.get_transcripts_batch(["dead-1", "dead-2"])
+
+    assert all(isinstance(result, VideoUnavailableError) for result in (*first.values(), *again.values()))
+    assert youtube.stats["calls"] == 2
@@ -0,0 +1,92 @@
+import asyncio
+import time
+
+import pytest
+from youtube_transcript_api import VideoUnavailable
+
+from app.config import CACHE_SOFT_TTL, REFRESH_AHEAD_MIN_HITS, REFRESH_AHEAD_SECONDS
+from app.limiting.redis_client import r
+from app.services import transcript_service
+from app.services.cache_service import CacheService
+from benchmarks.bench_cache_codec import synthetic_record
+
+pytestmark = pytest.mark.anyio
+
+
+async def _cache(age: float) -> None:
+    record = {**synthetic_record(5), "video_id": "vid", "language_code": "en"}
+    await CacheService.set_transcript("vid", "en", record, cached_at=int(time.time() - age))
+
+
+async def _refreshes_done() -> None:
+    await asyncio.gather(*list(transcript_service._refresh_tasks))
+
+
+async def test_stale_entry_is_served_and_refreshed_in_the_background(youtube):
+    await _cache(age=CACHE_SOFT_TTL + 60)
+    before = await CacheService.get_entry("vid", "en")
+
+    served = await transcript_service.get_transcript_entry("vid")
+    assert served.content_hash == before.content_hash  # the stale copy, without waiting
+    await _refreshes_done()
+
+    refreshed = await CacheService.get_entry("vid", "en")
+    assert not refreshed.is_stale()
+    assert refreshed.content_hash != before.content_hash
+    assert youtube.stats["calls"] == 2
+
+
+async def test_one_refresh_per_stale_entry(youtube):
+    await _cache(age=CACHE_SOFT_TTL + 60)
+    scheduled = transcript_service.refresh_stats["scheduled"]
+
+    await asyncio.gather(*(transcript_service.get_transcript_entry("vid") for _ in range(10)))
+    await _refreshes_done()
+
+    assert transcript_service.refresh_stats["scheduled"] == scheduled + 1
+    assert youtube.stats["calls"] == 2
+
+
+async def test_fresh_entry_is_not_refreshed(youtube):
+    await _cache(age=60)
+
+    for _ in range(REFRESH_AHEAD_MIN_HITS + 5):
+        await transcript_service.get_transcript_entry("vid")
+
+    assert not transcript_service._refresh_tasks
+    assert youtube.stats["calls"] == 0
+
+
+async def test_hot_entry_is_refreshed_ahead_of_going_stale(youtube):
+    await _cache(age=CACHE_SOFT_TTL - REFRESH_AHEAD_SECONDS / 2)
+
+    for _ in range(REFRESH_AHEAD_MIN_HITS - 1):
+        await transcript_service.get_transcript_entry("vid")
+    assert not transcript_service._refresh_tasks
+
+    await transcript_service.get_transcript_entry("vid")
+    await _refreshes_done()
+
+    assert youtube.stats["calls"] == 2
+
+
+async def test_failed_refresh_keeps_the_stale_copy_and_backs_off(youtube, monkeypatch):
+    def gone(video_id):
+        youtube.stats["calls"] += 1
+        raise VideoUnavailable(video_id)
+
+    monkeypatch.setattr(youtube, "_call", gone)
+    await _cache(age=CACHE_SOFT_TTL + 60)
+    failed = transcript_service.refresh_stats["failed"]
+
+    await transcript_service.get_transcript_entry("vid")
+    await _refreshes_done()
+
+    assert transcript_service.refresh_stats["failed"] == failed + 1
+    assert (await transcript_service.get_transcript_entry("vid")).is_stale()
+    # The lock stays until REFRESH_RETRY_SECONDS pass: no other worker retries before then
+    assert await r.exists("lock:transcript-refresh:transcript:vid:en")
+    skipped = transcript_service.refresh_stats["skipped"]
+    await transcript_service._refresh("vid", "en")
+    assert transcript_service.refresh_stats["skipped"] == skipped + 1
+    assert youtube.stats["calls"] == 1
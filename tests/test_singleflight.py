@@ -0,0 +1,156 @@
+import asyncio
+
+import pytest
+
+from app.limiting.redis_client import r
+from app.services.singleflight import SingleFlight
+
+pytestmark = pytest.mark.anyio
+
+
+def _flight(**kw) -> SingleFlight:
+    kw.setdefault("lock_ttl_ms", 5000)
+    kw.setdefault("poll_interval", 0.01)
+    kw.setdefault("wait_timeout", 2.0)
+    return SingleFlight("test:sf", **kw)
+
+
+async def _nothing():
+    return None
+
+
+async def test_concurrent_callers_share_one_execution():
+    flight = _flight()
+    calls = []
+
+    async def fn():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "value"
+
+    results = await asyncio.gather(*(flight.do("k", fn, _nothing) for _ in range(10)))
+
+    assert results == ["value"] * 10
+    assert len(calls) == 1
+    assert flight.stats == {"executed": 1, "coalesced_local": 9, "coalesced_remote": 0}
+    # Lock released and key forgotten: the next call runs again
+    assert not await r.exists("test:sf:k")
+    assert await flight.do("k", fn, _nothing) == "value"
+    assert len(calls) == 2
+
+
+async def test_distinct_keys_run_independently():
+    flight = _flight()
+
+    async def fn(value):
+        await asyncio.sleep(0.01)
+        return value
+
+    results = await asyncio.gather(
+        flight.do("a", lambda: fn("a"), _nothing),
+        flight.do("b", lambda: fn("b"), _nothing),
+    )
+
+    assert results == ["a", "b"]
+    assert flight.stats["executed"] == 2
+
+
+async def test_waits_for_result_of_another_worker():
+    flight = _flight()
+    await r.set("test:sf:k", "other-worker", px=5000)
+    shared = {}
+
+    async def load():
+        return shared.get("k")
+
+    async def fn():
+        raise AssertionError("must not run while another worker holds the lock")
+
+    async def other_worker_finishes():
+        await asyncio.sleep(0.05)
+        shared["k"] = "from-other"
+
+    results = await asyncio.gather(flight.do("k", fn, load), other_worker_finishes())
+
+    assert results[0] == "from-other"
+    assert flight.stats == {"executed": 0, "coalesced_local": 0, "coalesced_remote": 1}
+
+
+async def test_takes_over_when_other_worker_gives_up():
+    flight = _flight()
+    await r.set("test:sf:k", "other-worker", px=5000)
+    calls = []
+
+    async def fn():
+        calls.append(1)
+        return "mine"
+
+    async def other_worker_fails():
+        await asyncio.sleep(0.05)
+        await r.delete("test:sf:k")
+
+    results = await asyncio.gather(flight.do("k", fn, _nothing), other_worker_fails())
+
+    assert results[0] == "mine"
+    assert len(calls) == 1
+    assert flight.stats["coalesced_remote"] == 1
+    assert flight.stats["executed"] == 1
+
+
+async def test_fetches_directly_after_wait_timeout():
+    flight = _flight(wait_timeout=0.05)
+    await r.set("test:sf:k", "stuck-worker", px=5000)
+
+    async def fn():
+        return "direct"
+
+    assert await flight.do("k", fn, _nothing) == "direct"
+    # The stuck worker's lock is left alone
+    assert await r.get("test:sf:k") == "stuck-worker"
+
+
+async def test_errors_reach_every_caller_and_release_the_lock():
+    flight = _flight()
+    calls = []
+
+    async def fn():
+        calls.append(1)
+        await asyncio.sleep(0.02)
+        raise RuntimeError("upstream down")
+
+    results = await asyncio.gather(*(flight.do("k", fn, _nothing) for _ in range(3)), return_exceptions=True)
+
+    assert len(calls) == 1
+    assert all(isinstance(e, RuntimeError) for e in results)
+    assert not await r.exists("test:sf:k")
+    assert "k" not in flight._inflight
+
+
+async def test_does_not_release_a_lock_taken_over_by_another_worker():
+    flight = _flight()
+
+    async def fn():
+        # Our lock expired and another worker took it over mid-fetch
+        await r.set("test:sf:k", "new-owner", px=5000)
+        return "value"
+
+    assert await flight.do("k", fn, _nothing) == "value"
+    assert await r.get("test:sf:k") == "new-owner"
+
+
+async def test_cancelled_caller_does_not_cancel_the_flight():
+    flight = _flight()
+    done = asyncio.Event()
+
+    async def fn():
+        await asyncio.sleep(0.05)
+        done.set()
+        return "value"
+
+    first = asyncio.ensure_future(flight.do("k", fn, _nothing))
+    second = asyncio.ensure_future(flight.do("k", fn, _nothing))
+    await asyncio.sleep(0.01)
+    first.cancel()
+
+    assert await second == "value"
+    assert done.is_set()
@@ -0,0 +1,99 @@
+import json
+import zlib
+
+import msgpack
+import pytest
+
+from app.services import transcript_codec
+from app.services.transcript_codec import CacheFormatError
+from app.utils import build_transcript_payload
+from benchmarks.bench_cache_codec import synthetic_record
+
+
+def _record(**extra) -> dict:
+    record = synthetic_record(50)
+    record.update(extra)
+    return record
+
+
+def test_round_trip_keeps_metadata_and_snippets():
+    record = _record(cached_at=1700000000, is_generated=False)
+
+    decoded = transcript_codec.decode(transcript_codec.encode(record))
+
+    assert decoded == {**record, "snippets": transcript_codec.canonical_snippets(record["snippets"])}
+
+
+def test_round_trip_rounds_times_to_the_millisecond():
+    record = _record(snippets=[(1.23456, 2.00049, "a"), (3.0, 0.0006, "b")])
+
+    decoded = transcript_codec.decode(transcript_codec.encode(record))
+
+    assert decoded["snippets"] == [(1.235, 2.0, "a"), (3.0, 0.001, "b")]
+    assert decoded["snippets"] == transcript_codec.canonical_snippets(record["snippets"])
+
+
+def test_round_trip_keeps_unicode_and_empty_transcripts():
+    record = _record(snippets=[(0.0, 1.0, "héllo — 世界 🎵"), (1.0, 1.0, "")])
+    assert transcript_codec.decode(transcript_codec.encode(record))["snippets"] == record["snippets"]
+
+    empty = _record(snippets=[])
+    assert transcript_codec.decode(transcript_codec.encode(empty))["snippets"] == []
+
+
+def test_content_hash_ignores_cached_at_and_sub_millisecond_noise():
+    record = _record(cached_at=1)
+    same = _record(cached_at=2, snippets=[(s + 1e-5, d, t) for s, d, t in record["snippets"]])
+    changed = _record(snippets=record["snippets"][:-1])
+
+    assert transcript_codec.content_hash(record) == transcript_codec.content_hash(same)
+    assert transcript_codec.content_hash(record) != transcript_codec.content_hash(changed)
+    # A record read back from the cache hashes like the one that was stored
+    decoded = transcript_codec.decode(transcript_codec.encode(record))
+    assert transcript_codec.content_hash(decoded) == transcript_codec.content_hash(record)
+
+
+def test_legacy_json_entry_is_rebuilt_from_its_srt():
+    record = _record()
+    legacy = json.dumps(build_transcript_payload(record)).encode()
+
+    decoded = transcript_codec.decode(legacy)
+
+    assert decoded["video_id"] == record["video_id"]
+    assert decoded["language"] == record["language"]
+    assert decoded["language_code"] == record["language_code"]
+    assert decoded["snippets"] == transcript_codec.canonical_snippets(record["snippets"])
+
+
+def test_legacy_json_entry_without_srt_has_no_snippets():
+    legacy = json.dumps({"video_id": "v", "language": "English", "language_code": "en", "transcript": ""})
+
+    assert transcript_codec.decode(legacy.encode())["snippets"] == []
+
+
+def test_parse_srt():
+    srt = (
+        "1\n00:00:00,000 --> 00:00:01,500\nfirst line\n\n"
+        "2\n00:01:02,250 --> 00:01:05,000\nsecond\nspans two lines\n\n"
+        "3\n01:00:00,000 --> 01:00:00,001\nlast"
+    )
+
+    assert transcript_codec.parse_srt(srt) == [
+        (0.0, 1.5, "first line"),
+        (62.25, 2.75, "second\nspans two lines"),
+        (3600.0, 0.001, "last"),
+    ]
+    assert transcript_codec.parse_srt("") == []
+
+
+def test_unknown_bytes_are_rejected():
+    with pytest.raises(CacheFormatError):
+        transcript_codec.decode(b"garbage")
+
+
+def test_unsupported_version_is_rejected():
+    packed = msgpack.packb({"starts": [], "durations": [], "texts": []})
+    raw = transcript_codec.MAGIC + bytes([transcript_codec.FORMAT_VERSION + 1]) + zlib.compress(packed)
+
+    with pytest.raises(CacheFormatError, match="version"):
+        transcript_codec.decode(raw)
@@ -0,0 +1,49 @@
+from itertools import accumulate
+
+import pytest
+
+from app.services import transcript_index
+
+
+def _slice(snippets, start, end):
+    starts = [s for s, _, _ in snippets]
+    max_ends = list(accumulate((s + d for s, d, _ in snippets), max))
+    return transcript_index.slice_snippets(starts, max_ends, snippets, start, end)
+
+
+def test_overlapping_snippets_on_screen_at_start_are_kept():
+    snippets = [(0.0, 3.0, "a"), (3.559, 3.268, "b"), (4.658, 2.878, "c"), (7.6, 2.0, "d"), (9.0, 1.0, "e")]
+
+    assert _slice(snippets, 5, 8) == snippets[1:4]
+
+
+def test_a_long_earlier_snippet_is_kept_but_ended_ones_between_are_not():
+    snippets = [(0.0, 20.0, "long"), (1.0, 1.0, "short"), (2.0, 1.0, "short"), (10.0, 2.0, "in")]
+
+    assert _slice(snippets, 5, 11) == [snippets[0], snippets[3]]
+
+
+@pytest.mark.parametrize(
+    "start, end, expected",
+    [
+        (0, 100, ["a", "b", "c"]),
+        (2, 4, ["a", "b"]),  # "a" runs until 2.5
+        (2.5, 4, ["b"]),  # ...and is gone at 2.5 exactly
+        (5, 6, ["b"]),
+        (6, 9, ["c"]),
+        (20, 30, []),
+    ],
+)
+def test_window_bounds(start, end, expected):
+    snippets = [(0.0, 2.5, "a"), (3.0, 3.0, "b"), (6.0, 2.0, "c")]
+
+    assert [text for _, _, text in _slice(snippets, start, end)] == expected
+
+
+def test_search_needs_every_token():
+    snippets = [(0.0, 1.0, "Hello world"), (1.0, 1.0, "hello there"), (2.0, 1.0, "World, hello!")]
+    index = transcript_index.build_index(snippets)
+
+    assert transcript_index.search(index, "HELLO world") == [0, 2]
+    assert transcript_index.search(index, "missing") == []
+    assert transcript_index.search(transcript_index.decode_index(transcript_index.encode_index(index)), "there") == [1]